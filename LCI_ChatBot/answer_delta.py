@@ -0,0 +1,140 @@
+"""
+Delta-based rendering of a template's current answers across chat turns
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tracker Configuration
+ANSWER_DELTA_MAX_ENTRIES = int(os.getenv("ANSWER_DELTA_MAX_ENTRIES", "5000"))
+ANSWER_DELTA_TTL_SECONDS = float(os.getenv("ANSWER_DELTA_TTL_SECONDS", str(24 * 3600)))
+
+def snapshot_hash(template_key, answers):
+    """Short content hash naming one set of answers for a template."""
+    raw = json.dumps([template_key, sorted(answers.items())], ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+def _marker(template_key, digest):
+    return f"[{template_key} answers #{digest}"
+
+def _markers_in_history(history, template_key):
+    """
+    Answer markers for `template_key` in the resent history, newest first.
+
+    Returns:
+        list: (hash, base hash) pairs - base is None for a full snapshot
+    """
+    pattern = re.compile(re.escape(f"[{template_key} answers #") + r"([0-9a-f]{12})(?:, based on #([0-9a-f]{12}))?\]")
+    found = []
+    for message in history:
+        if message.get("role") == "user":
+            found.extend((m.group(1), m.group(2)) for m in pattern.finditer(message.get("content") or ""))
+    return found[::-1]
+
+def _answer_lines(answers):
+    return [f"  - {field}: {value}" for field, value in answers.items()]
+
+class AnswerDeltaTracker:
+    """
+    Send a template's currentAnswers in full once, then only what changed.
+
+    Every block is tagged with a content hash of the answers it describes, and
+    is stored with the user's turn in chat history. A delta is only built on a
+    full snapshot whose marker is still in the history being resent, so what
+    the model sees is always complete - whichever worker renders the turn.
+    Snapshots are kept here by hash; a worker that does not hold the base
+    snapshot (or holds an expired one) simply sends the full answers again.
+    """
+
+    def __init__(self, max_entries=ANSWER_DELTA_MAX_ENTRIES, ttl_seconds=ANSWER_DELTA_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._snapshots = OrderedDict()   # (template_key, hash) -> (answers, stored_at)
+        self._lock = threading.Lock()
+        self.full_sends = 0
+        self.delta_sends = 0
+        self.unchanged_sends = 0
+
+    def _snapshot(self, template_key, digest, now):
+        entry = self._snapshots.get((template_key, digest))
+        if entry is None or now - entry[1] > self.ttl_seconds:
+            return None
+        self._snapshots[(template_key, digest)] = (entry[0], now)
+        self._snapshots.move_to_end((template_key, digest))
+        return entry[0]
+
+    def render(self, template_key, answers, history):
+        """
+        Render the answers block for this turn.
+
+        Args:
+            template_key: Template the answers belong to
+            answers: The request's currentAnswers
+            history: Chat history messages resent with this turn
+
+        Returns:
+            tuple: (text, record) - the prompt block, and whether it carries new
+                   information that must be stored with the turn in history
+        """
+        template_key = template_key or "template"
+        filled = {field: value for field, value in (answers or {}).items() if value}
+        digest = snapshot_hash(template_key, filled)
+        markers = _markers_in_history(history, template_key)
+        full_in_history = [h for h, base in markers if base is None]
+        now = time.time()
+
+        with self._lock:
+            if markers:
+                latest, latest_base = markers[0]
+                if latest == digest and (latest_base is None or latest_base in full_in_history):
+                    self.unchanged_sends += 1
+                    return (f"✍️ USER'S CURRENT ANSWERS: unchanged since {_marker(template_key, digest)}] "
+                            f"earlier in this conversation ({len(filled)} answers)", False)
+
+            base, previous = None, None
+            for candidate in full_in_history:
+                previous = self._snapshot(template_key, candidate, now)
+                if previous is not None:
+                    base = candidate
+                    break
+
+            if base is not None:
+                changed = {f: v for f, v in filled.items() if previous.get(f) != v}
+                cleared = [f for f in previous if f not in filled]
+                lines = [f"✍️ USER'S ANSWER CHANGES {_marker(template_key, digest)}, based on #{base}]:"]
+                lines += _answer_lines(changed)
+                lines += [f"  - {field}: (cleared)" for field in cleared]
+                unchanged = len(filled) - len(changed)
+                if unchanged:
+                    lines.append(f"  ({unchanged} other answers unchanged since earlier in this conversation)")
+                self.delta_sends += 1
+                return "\n".join(lines), True
+
+            if not filled:
+                return "", False
+            self._snapshots[(template_key, digest)] = (filled, now)
+            self._snapshots.move_to_end((template_key, digest))
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+            self.full_sends += 1
+            lines = [f"✍️ USER'S CURRENT ANSWERS {_marker(template_key, digest)}]:"] + _answer_lines(filled)
+            return "\n".join(lines), True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "snapshots": len(self._snapshots),
+                "full_sends": self.full_sends,
+                "delta_sends": self.delta_sends,
+                "unchanged_sends": self.unchanged_sends,
+            }
+
+# Global instance
+answer_deltas = AnswerDeltaTracker()
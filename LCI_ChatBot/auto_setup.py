@@ -73,6 +73,29 @@ def auto_setup_embeddings():
         print(f"❌ Error during automatic setup: {e}")
         return False
 
+def verify_model_artifacts():
+    """Verify (or vendor) the local embedding model so the first search never downloads it"""
+    try:
+        from model_artifacts import ensure_model_artifact, verify_artifact, MODEL_ARTIFACT_DIR
+
+        # The ONNX backend only needs its own artifact - the PyTorch one is checked (or vendored)
+        # only when searches will fall back to it, so this process never touches torch otherwise
+        if os.getenv("EMBEDDING_BACKEND", "torch").lower() == "onnx":
+            from onnx_encoder import ONNX_MODEL_DIR
+            ok, problems = verify_artifact(ONNX_MODEL_DIR, full=True)
+            if ok:
+                print(f"✅ ONNX encoder artifact verified: {ONNX_MODEL_DIR}")
+                return True
+            print(f"⚠️ ONNX encoder artifact {ONNX_MODEL_DIR} not usable ({'; '.join(problems)}) - "
+                  f"searches will use the PyTorch encoder")
+
+        ensure_model_artifact(MODEL_ARTIFACT_DIR, full=True)
+        print(f"✅ Embedding model artifact verified: {MODEL_ARTIFACT_DIR}")
+        return True
+    except Exception as e:
+        print(f"❌ Embedding model artifact not usable: {e}")
+        return False
+
 def ensure_qdrant_running():
     """Ensure Qdrant server is running"""
     try:
@@ -97,7 +120,11 @@ def run_auto_setup():
     if not ensure_qdrant_running():
         return False
     
-    # Step 2: Set up embeddings if needed
+    # Step 2: Verify the local embedding model
+    if not verify_model_artifacts():
+        return False
+    
+    # Step 3: Set up embeddings if needed
     if not auto_setup_embeddings():
         return False
     
@@ -0,0 +1,144 @@
+"""
+Field-granular cache for autofill answers
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache Configuration
+AUTOFILL_CACHE_MAX_ENTRIES = int(os.getenv("AUTOFILL_CACHE_MAX_ENTRIES", "5000"))
+AUTOFILL_CACHE_TTL_SECONDS = float(os.getenv("AUTOFILL_CACHE_TTL_SECONDS", str(24 * 3600)))
+AUTOFILL_CACHE_PATH = os.getenv("AUTOFILL_CACHE_PATH", "")  # e.g. "cache/autofill_cache.sqlite3"; empty = memory only
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace so trivially different inputs share a key."""
+    return " ".join((text or "").lower().split())
+
+class AutofillCache:
+    """
+    Content-addressed LRU + TTL cache of generated autofill values, one entry per field.
+
+    Keys hash everything that determines a field's answer (idea, step, template,
+    field hint, model, prompt version), so a repeated autofill - a double click or
+    several users starting from the same sample idea - only asks the LLM for the
+    fields it has not answered before. Entries are optionally persisted to SQLite
+    so they survive restarts.
+    """
+
+    def __init__(self, max_entries=AUTOFILL_CACHE_MAX_ENTRIES, ttl_seconds=AUTOFILL_CACHE_TTL_SECONDS,
+                 path=AUTOFILL_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries = OrderedDict()   # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._open_db()
+
+    @staticmethod
+    def make_key(idea_description, step_description, template_key, field, hint, model, prompt_version):
+        raw = json.dumps([
+            normalize_text(idea_description),
+            normalize_text(step_description),
+            template_key,
+            field,
+            normalize_text(hint),
+            model,
+            prompt_version,
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _open_db(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS autofill_cache (key TEXT PRIMARY KEY, value TEXT, stored_at REAL)"
+            )
+            self._db.execute("DELETE FROM autofill_cache WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT key, value, stored_at FROM autofill_cache ORDER BY stored_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            for key, value, stored_at in reversed(rows):
+                self._entries[key] = (json.loads(value), stored_at)
+            print(f"✅ Autofill cache loaded {len(rows)} entries from {self.path}")
+        except Exception as e:
+            print(f"⚠️ Warning: Autofill cache persistence disabled ({self.path}): {e}")
+            self._db = None
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items):
+        """
+        Store several values at once, persisting them in a single SQLite transaction.
+
+        Args:
+            items: Dictionary of cache key -> value
+
+        Blocks on disk I/O when persistence is enabled; call it from a worker
+        thread in async code.
+        """
+        now = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, now)
+                self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            if self._db is not None and items:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO autofill_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                        [(key, json.dumps(value), now) for key, value in items.items()]
+                    )
+                    if evicted:
+                        self._db.executemany("DELETE FROM autofill_cache WHERE key = ?", [(k,) for k in evicted])
+                    self._db.commit()
+                except Exception as e:
+                    print(f"⚠️ Warning: Could not persist autofill cache entries: {e}")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "persistent": self._db is not None,
+            }
+
+# Global instance
+autofill_cache = AutofillCache()
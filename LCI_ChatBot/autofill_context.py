@@ -0,0 +1,93 @@
+"""
+Scoped store of previous autofill results, kept as ready-to-use prompt text
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Store Configuration
+AUTO_CONTEXT_MAX_ENTRIES = int(os.getenv("AUTO_CONTEXT_MAX_ENTRIES", "2000"))
+AUTO_CONTEXT_TTL_SECONDS = float(os.getenv("AUTO_CONTEXT_TTL_SECONDS", str(24 * 3600)))
+
+def render_autofill_context(template_key, answers):
+    """Render generated answers as compact prompt text (one line per filled field)."""
+    lines = [f"PREVIOUS AUTOFILL ANSWERS (template {template_key}):"]
+    for field, value in answers.items():
+        if isinstance(value, str):
+            value = " ".join(value.split())
+        if value not in (None, "", [], {}):
+            lines.append(f"- {field}: {value}")
+    return "\n".join(lines)
+
+class AutofillContextStore:
+    """
+    Previous autofill results, scoped per user and canvas, for later chat turns.
+
+    Entries are keyed by (user_id, canvas_id, template_key) so one user's
+    generated answers are never shown to another, rendered to prompt text once
+    when saved, and evicted least-recently-used beyond `max_entries` or after
+    the TTL.
+    """
+
+    def __init__(self, max_entries=AUTO_CONTEXT_MAX_ENTRIES, ttl_seconds=AUTO_CONTEXT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # (user_id, canvas_id, template_key) -> (text, stored_at)
+        self._latest = {}               # (user_id, canvas_id) -> template_key saved most recently
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scope(user_id, canvas_id):
+        return (user_id or "", canvas_id or "")
+
+    def put(self, user_id, canvas_id, template_key, answers):
+        scope = self._scope(user_id, canvas_id)
+        text = render_autofill_context(template_key, answers)
+        with self._lock:
+            key = scope + (template_key,)
+            self._entries[key] = (text, time.time())
+            self._entries.move_to_end(key)
+            self._latest[scope] = template_key
+            while len(self._entries) > self.max_entries:
+                self._drop(self._entries.popitem(last=False)[0])
+
+    def _drop(self, key):
+        scope, template_key = key[:2], key[2]
+        if self._latest.get(scope) == template_key:
+            del self._latest[scope]
+
+    def get(self, user_id, canvas_id, template_key=None):
+        """
+        Find the rendered context for a template, falling back to the most
+        recent autofill in the same user/canvas scope.
+
+        Returns:
+            tuple or None: (template_key, text)
+        """
+        scope = self._scope(user_id, canvas_id)
+        with self._lock:
+            for candidate in (template_key, self._latest.get(scope)):
+                if not candidate:
+                    continue
+                key = scope + (candidate,)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                text, stored_at = entry
+                if time.time() - stored_at > self.ttl_seconds:
+                    del self._entries[key]
+                    self._drop(key)
+                    continue
+                self._entries.move_to_end(key)
+                return candidate, text
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._entries)}
+
+# The global instance is created by state_backend (in-process or Redis)
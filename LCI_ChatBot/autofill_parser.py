@@ -0,0 +1,210 @@
+"""
+Parsing and validation of LLM autofill responses
+"""
+import re
+import json
+
+# Allowed one-word answers for intensity fields (see construct_autofill_prompt)
+INTENSITY_VALUES = ("high", "moderate", "low")
+
+class IncrementalJSONObjectParser:
+    """
+    Parse a flat JSON object as it arrives, one text chunk at a time.
+
+    Each top-level `"field": value` member is emitted as soon as its value is
+    complete, so callers can forward fields before the LLM finishes the whole
+    object. Anything before the opening brace (e.g. a ```json fence) and after
+    the closing brace is ignored; a value cut off by truncation is never emitted.
+
+    Example:
+        >>> parser = IncrementalJSONObjectParser()
+        >>> parser.feed('```json\\n{"why_0": "Slow')
+        []
+        >>> parser.feed(' onboarding", "why_1": "Cost"')
+        [('why_0', 'Slow onboarding'), ('why_1', 'Cost')]
+    """
+
+    def __init__(self):
+        self.result = {}
+        self.errors = []
+        self.started = False
+        self.done = False
+        self._state = "key"     # key -> colon -> value -> after_value -> key ...
+        self._buf = []          # raw text of the current key or value
+        self._key = None
+        self._in_string = False
+        self._escape = False
+        self._depth = 0         # bracket nesting inside the current value
+
+    def feed(self, text: str) -> list:
+        """
+        Consume a chunk of text.
+
+        Returns:
+            list: (field, value) pairs completed by this chunk, in order
+        """
+        completed = []
+        for ch in text:
+            if self.done:
+                break
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                continue
+
+            if self._state == "key":
+                if self._in_string:
+                    self._buf.append(ch)
+                    if self._consume_string_char(ch):
+                        self._key = self._decode("".join(self._buf))
+                        self._buf = []
+                        self._state = "colon"
+                elif ch == '"':
+                    self._buf = [ch]
+                    self._in_string = True
+                elif ch == "}":
+                    self.done = True
+
+            elif self._state == "colon":
+                if ch == ":":
+                    self._state = "value"
+
+            elif self._state == "value":
+                self._feed_value_char(ch, completed)
+
+            elif self._state == "after_value":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self.done = True
+
+        return completed
+
+    def _consume_string_char(self, ch):
+        """Track escapes inside a string; returns True when the string closes."""
+        if self._escape:
+            self._escape = False
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._in_string = False
+            return True
+        return False
+
+    def _feed_value_char(self, ch, completed):
+        if self._in_string:
+            self._buf.append(ch)
+            if self._consume_string_char(ch) and self._depth == 0:
+                self._emit(completed)
+                self._state = "after_value"
+            return
+
+        if not self._buf and ch.isspace():
+            return
+
+        if ch == '"':
+            self._buf.append(ch)
+            self._in_string = True
+        elif ch in "[{":
+            self._buf.append(ch)
+            self._depth += 1
+        elif ch in "]}" and self._depth > 0:
+            self._buf.append(ch)
+            self._depth -= 1
+            if self._depth == 0:
+                self._emit(completed)
+                self._state = "after_value"
+        elif ch == "," and self._depth == 0:
+            # End of a bare scalar (number / true / false / null)
+            self._emit(completed)
+            self._state = "key"
+        elif ch == "}" and self._depth == 0:
+            self._emit(completed)
+            self.done = True
+        else:
+            self._buf.append(ch)
+
+    def _emit(self, completed):
+        raw = "".join(self._buf).strip()
+        self._buf = []
+        if self._key is None or not raw:
+            return
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.errors.append((self._key, str(e)))
+            self._key = None
+            return
+        self.result[self._key] = value
+        completed.append((self._key, value))
+        self._key = None
+
+    def _decode(self, raw):
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.errors.append((raw, str(e)))
+            return None
+
+def parse_json_object(text: str) -> dict:
+    """
+    Tolerantly parse an LLM's JSON object reply in one go.
+
+    Ignores code fences and keeps every member that completed before any
+    truncation, instead of failing the whole object.
+    """
+    parser = IncrementalJSONObjectParser()
+    parser.feed(text)
+    return parser.result
+
+def expected_autofill_fields(field_hints: dict, repeated_fields: list) -> dict:
+    """
+    List every field an autofill response should contain, with its hint.
+
+    Args:
+        field_hints: Dictionary of field names and their hints
+        repeated_fields: Repeated field patterns, e.g. {"prefix": "why", "count": 4}
+            or {"prefix": "detail", "count": 8, "startIndex": 1}
+
+    Returns:
+        dict: field name -> hint, covering fieldHints plus expanded repeated fields
+
+    Only the rows fieldHints does not already name are expanded. Patterns whose
+    hints carry columns (row_0_deliverable, article_0_0) are never expanded, since
+    their rows are not single fields, and a pattern without a startIndex whose
+    hints begin at 1 (problem_1..5) is treated as 1-based.
+    """
+    expected = dict(field_hints or {})
+    for rf in repeated_fields or []:
+        if not isinstance(rf, dict) or not rf.get("prefix"):
+            continue
+        prefix = rf["prefix"]
+        row = re.compile(rf"{re.escape(prefix)}_(\d+)(_.*)?$")
+        matches = [row.match(name) for name in field_hints or {}]
+        matches = [m for m in matches if m]
+        if any(m.group(2) for m in matches):
+            continue
+        hinted = {int(m.group(1)) for m in matches}
+        if "startIndex" in rf:
+            start = int(rf["startIndex"])
+        else:
+            start = 1 if hinted and 0 not in hinted and 1 in hinted else 0
+        for i in range(start, start + int(rf.get("count", 0))):
+            if i not in hinted:
+                expected.setdefault(f"{prefix}_{i}", f"{prefix} ({i})")
+    return expected
+
+def is_valid_field_value(field: str, value) -> bool:
+    """Check one generated value: non-empty text, and a known level for intensity fields."""
+    if value is None or isinstance(value, (dict, list)):
+        return False
+    text = str(value).strip()
+    if not text:
+        return False
+    if field.startswith("intensity"):
+        return text.lower().strip(" .!") in INTENSITY_VALUES
+    return True
+
+def find_missing_fields(answers: dict, expected: dict) -> list:
+    """Return the expected fields that are absent or invalid in `answers`."""
+    return [field for field in expected if not is_valid_field_value(field, answers.get(field))]
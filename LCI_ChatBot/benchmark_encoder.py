@@ -0,0 +1,129 @@
+"""
+Benchmark the query encoder backends (PyTorch vs ONNX Runtime int8)
+
+Each backend runs in a fresh subprocess so cold-load time and RSS are not
+skewed by modules the other backend already imported.
+
+Usage:
+    python benchmark_encoder.py                       # both backends
+    python benchmark_encoder.py --backends onnx --queries 500
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import psutil
+
+# Only light modules are imported here, so each worker's load time and RSS include its whole backend
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Typical chat questions, also used by the recall check in export_onnx_encoder.py
+SAMPLE_QUERIES = [
+    "What is the Lean Canvas for Invention?",
+    "How do I identify the root cause of a problem?",
+    "What is the 5 whys technique?",
+    "How should I conduct a literature search?",
+    "How do I write a good research question?",
+    "What is a market landscape analysis?",
+    "How do I analyze existing solutions and competitors?",
+    "What makes a research idea novel?",
+    "What are the expected research outcomes?",
+    "Which research methodology should I choose?",
+    "What key resources does a research project need?",
+    "How do I estimate the funding required for my research?",
+    "What is a technology readiness level?",
+    "How do I assess the capacities of my team?",
+    "How do I interview stakeholders to validate a problem?",
+    "How do I rank problems by urgency and intensity?",
+    "What is the difference between invention and innovation?",
+    "How can I find industrial partners for my research?",
+]
+
+def _rss_mb():
+    return psutil.Process(os.getpid()).memory_info().rss / 1024**2
+
+def _percentile(ordered, percentile):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+def run_worker(backend, queries, batch_size):
+    """Measure one backend in this process and print the result as JSON."""
+    rss_start = _rss_mb()
+    started = time.perf_counter()
+    if backend == "onnx":
+        from onnx_encoder import OnnxSentenceEncoder
+        model = OnnxSentenceEncoder()
+    else:
+        from model_artifacts import load_sentence_transformer
+        model = load_sentence_transformer(device="cpu")
+    load_seconds = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+
+    started = time.perf_counter()
+    model.encode([SAMPLE_QUERIES[0]])
+    first_query_ms = (time.perf_counter() - started) * 1000
+
+    texts = [SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)] for i in range(queries)]
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        model.encode([text])
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    started = time.perf_counter()
+    model.encode(texts, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "backend": backend,
+        "cold_load_s": round(load_seconds, 2),
+        "rss_before_mb": round(rss_start, 1),
+        "rss_loaded_mb": round(rss_loaded, 1),
+        "rss_peak_mb": round(_rss_mb(), 1),
+        "first_query_ms": round(first_query_ms, 1),
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        f"batch{batch_size}_qps": round(len(texts) / batch_seconds, 1),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark query encoder backends")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    parser.add_argument("--queries", type=int, default=200, help="Single-query encodes per backend (default: 200)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Batch size for the throughput run (default: 32)")
+    parser.add_argument("--worker", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.queries, args.batch_size)
+        return True
+
+    print("=" * 80)
+    print(f"⏱️ Query encoder benchmark ({MODEL_NAME}, {args.queries} queries, batch {args.batch_size})")
+    print("=" * 80)
+    results = []
+    for backend in args.backends:
+        print(f"\n🔄 Running {backend} backend...")
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", backend,
+             "--queries", str(args.queries), "--batch-size", str(args.batch_size)],
+            capture_output=True, text=True,
+        )
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"❌ {backend} backend failed:\n{proc.stderr[-2000:]}")
+            continue
+        results.append(json.loads(lines[-1]))
+
+    if not results:
+        return False
+    columns = list(results[0].keys())
+    print("\n" + " | ".join(f"{c:>14}" for c in columns))
+    for result in results:
+        print(" | ".join(f"{str(result.get(c, '')):>14}" for c in columns))
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
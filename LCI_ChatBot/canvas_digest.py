@@ -0,0 +1,94 @@
+"""
+Compact text digest of a user's Lean Canvas for prompt context
+"""
+import os
+from dotenv import load_dotenv
+
+from context_assembler import count_tokens
+
+load_dotenv()
+
+CANVAS_DIGEST_TOKEN_BUDGET = int(os.getenv("CANVAS_DIGEST_TOKEN_BUDGET", "800"))
+
+# Lean Canvas components in checklist order (frontend/src/content/checklistData.js)
+CANVAS_COMPONENT_ORDER = [
+    "Problem Identification",
+    "Literature Search",
+    "Research Question",
+    "Market Landscape",
+    "Existing Solutions",
+    "Novelty",
+    "Research Outcome",
+    "Research Methodology",
+    "Key Resources",
+    "Funding",
+    "Team Capacities",
+]
+
+def _is_empty(value):
+    if isinstance(value, str):
+        return not value.strip()
+    return value is None or value == [] or value == {}
+
+def render_value(value) -> str:
+    """Flatten a saved field value to a single line."""
+    if isinstance(value, list):
+        return "; ".join(render_value(v) for v in value if not _is_empty(v))
+    if isinstance(value, dict):
+        return ", ".join(f"{k}: {render_value(v)}" for k, v in value.items() if not _is_empty(v))
+    return " ".join(str(value).split())
+
+def render_template_fields(content: dict) -> list:
+    """One "  - field: value" line per filled field of a template's saved content."""
+    return [f"  - {field}: {render_value(value)}" for field, value in (content or {}).items() if not _is_empty(value)]
+
+def _step_number(template):
+    try:
+        return int(template.get("checklistStep"))
+    except (TypeError, ValueError):
+        return 0
+
+def _component_rank(template):
+    name = template.get("componentName", "")
+    return CANVAS_COMPONENT_ORDER.index(name) if name in CANVAS_COMPONENT_ORDER else len(CANVAS_COMPONENT_ORDER)
+
+def build_canvas_digest(canvas: dict, templates: list, budget_tokens: int = CANVAS_DIGEST_TOKEN_BUDGET) -> str:
+    """
+    Render a canvas and its saved templates as compact, component-ordered text.
+
+    Only filled fields are included; steps are added in checklist order until
+    the token budget is spent and the rest are summarized as omitted.
+
+    Args:
+        canvas: Canvas document (researchTitle, authorName, completionStatus, components)
+        templates: Template documents of the canvas (componentName, checklistStep, content)
+        budget_tokens: Maximum size of the digest
+
+    Returns:
+        str: Digest text
+    """
+    status = {c.get("name"): c.get("status", "not started") for c in canvas.get("components") or []}
+    lines = [f"CANVAS DIGEST: {canvas.get('researchTitle', '')} by {canvas.get('authorName', '')} "
+             f"({canvas.get('completionStatus', 'ongoing')})"]
+    used = count_tokens(lines[0])
+
+    ordered = sorted(templates, key=lambda t: (_component_rank(t), _step_number(t)))
+    blocks = []
+    for template in ordered:
+        fields = render_template_fields(template.get("content"))
+        if fields:
+            component = template.get("componentName", "")
+            header = f"[{component} - Step {template.get('checklistStep', '')}] ({status.get(component, 'ongoing')})"
+            blocks.append("\n".join([header] + fields))
+
+    for index, block in enumerate(blocks):
+        tokens = count_tokens(block)
+        if used + tokens > budget_tokens:
+            lines.append(f"… {len(blocks) - index} more filled steps omitted")
+            break
+        lines.append(block)
+        used += tokens
+
+    if not blocks:
+        lines.append("(no template answers saved yet)")
+    return "\n".join(lines)
@@ -0,0 +1,155 @@
+"""
+Rolling summarization memory for long chat sessions
+"""
+import os
+import time
+import asyncio
+from dotenv import load_dotenv
+
+from context_assembler import count_tokens, truncate_to_tokens
+
+load_dotenv()
+
+# Summarization Configuration
+CHAT_SUMMARY_ENABLED = os.getenv("CHAT_SUMMARY_ENABLED", "true").lower() in ("1", "true", "yes")
+CHAT_SUMMARY_TRIGGER_TOKENS = int(os.getenv("CHAT_SUMMARY_TRIGGER_TOKENS", "2000"))       # raw history size that triggers folding
+CHAT_SUMMARY_KEEP_RECENT_TOKENS = int(os.getenv("CHAT_SUMMARY_KEEP_RECENT_TOKENS", "1000"))  # newest turns kept verbatim
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+CHAT_SUMMARY_MIN_INTERVAL_SECONDS = float(os.getenv("CHAT_SUMMARY_MIN_INTERVAL_SECONDS", "2"))  # spacing between summary calls
+
+SUMMARY_INSTRUCTION = f"""
+You maintain the memory of a conversation between a user and an assistant about the
+Lean Canvas for Invention (LCI) methodology.
+
+Merge the existing summary and the new conversation turns into one updated summary.
+Keep facts about the user's invention, decisions made, answers given and open questions.
+Drop greetings and repetition. Write plain prose or short bullets, under {CHAT_SUMMARY_MAX_TOKENS * 3 // 4} words.
+Return only the summary.
+"""
+
+def _fold_split_index(history, keep_recent_tokens):
+    """
+    Number of leading messages to fold so roughly `keep_recent_tokens` of the
+    newest history stays verbatim. Always cuts at a user turn so exchanges stay whole.
+    """
+    kept_tokens = 0
+    split = len(history)
+    for index in range(len(history) - 1, -1, -1):
+        kept_tokens += count_tokens(history[index]["content"])
+        if kept_tokens > keep_recent_tokens:
+            break
+        split = index
+    while split < len(history) and history[split]["role"] != "user":
+        split += 1
+    return split
+
+class ConversationSummarizer:
+    """
+    Fold older chat turns into a running per-user summary, off the request path.
+
+    After each turn the caller schedules the user; a single background worker
+    reads their history (in a thread - stores may block on Redis or SQLite) and,
+    once it exceeds CHAT_SUMMARY_TRIGGER_TOKENS, summarizes
+    everything but the newest turns in one LLM call (so several turns queued
+    while waiting are folded together) and replaces the folded turns with the
+    summary in the session store. Calls are spaced by
+    CHAT_SUMMARY_MIN_INTERVAL_SECONDS and go through the same LLM path as chat,
+    so they are rate limited with it.
+    """
+
+    def __init__(self):
+        self._store = None      # ChatSessionStore shared with the chat endpoints
+        self._summarize_fn = None
+        self._queue = None
+        self._pending = set()
+        self._worker = None
+        self._last_call = 0.0
+        self.summaries_made = 0
+        self.turns_folded = 0
+        self.failures = 0
+
+    def configure(self, session_store, summarize_fn):
+        """
+        Args:
+            session_store: ChatSessionStore the chat endpoints record turns in
+            summarize_fn: Coroutine function taking chat messages and returning the LLM answer
+        """
+        self._store = session_store
+        self._summarize_fn = summarize_fn
+
+    def schedule(self, user_id):
+        """Queue the user; the worker summarizes only if their history is over the threshold."""
+        if not CHAT_SUMMARY_ENABLED or self._summarize_fn is None or user_id in self._pending:
+            return
+        if self._worker is None or self._worker.done():
+            # Started lazily from the first request, inside the running event loop
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.ensure_future(self._run())
+        self._pending.add(user_id)
+        self._queue.put_nowait(user_id)
+
+    async def _run(self):
+        while True:
+            user_id = await self._queue.get()
+            try:
+                history = await asyncio.to_thread(self._store.get_messages, user_id)
+                if sum(count_tokens(m["content"]) for m in history) <= CHAT_SUMMARY_TRIGGER_TOKENS:
+                    continue
+                wait = self._last_call + CHAT_SUMMARY_MIN_INTERVAL_SECONDS - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_call = time.monotonic()
+                await self._fold(user_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️ Warning: Chat summarization failed for {user_id}: {e}")
+            finally:
+                self._pending.discard(user_id)
+
+    async def _fold(self, user_id):
+        history = await asyncio.to_thread(self._store.get_messages, user_id)
+        split = _fold_split_index(history, CHAT_SUMMARY_KEEP_RECENT_TOKENS)
+        if split == 0:
+            return
+        folded = history[:split]
+
+        transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in folded)
+        previous = await asyncio.to_thread(self._store.get_summary, user_id) or "(none yet)"
+        messages = [
+            {"role": "system", "content": SUMMARY_INSTRUCTION},
+            {"role": "user", "content": f"Existing summary:\n{previous}\n\nNew conversation turns:\n{transcript}"},
+        ]
+        summary = (await self._summarize_fn(messages)).strip()
+        if count_tokens(summary) > CHAT_SUMMARY_MAX_TOKENS:
+            summary = truncate_to_tokens(summary, CHAT_SUMMARY_MAX_TOKENS)
+
+        # Turns are only ever appended while we waited - the store checks the folded prefix is still there
+        if not await asyncio.to_thread(self._store.fold, user_id, folded, summary):
+            print(f"⚠️ Chat history for {user_id} changed during summarization - discarding summary")
+            return
+        self.summaries_made += 1
+        self.turns_folded += split // 2
+        print(f"🧾 Folded {split} messages into the chat summary for {user_id} ({count_tokens(summary)} tokens)")
+
+    async def stop(self):
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def stats(self):
+        return {
+            "enabled": CHAT_SUMMARY_ENABLED,
+            "summaries_made": self.summaries_made,
+            "turns_folded": self.turns_folded,
+            "pending": len(self._pending),
+            "failures": self.failures,
+        }
+
+# Global instance
+conversation_summarizer = ConversationSummarizer()
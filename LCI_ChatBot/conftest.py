@@ -0,0 +1,39 @@
+"""
+Shared pytest setup: keep the chatbot's state in memory and away from real services
+"""
+import os
+import json
+
+import pytest
+
+os.environ.setdefault("SESSION_STORE_PATH", "")
+os.environ.setdefault("AUTOFILL_CACHE_PATH", "")
+os.environ.setdefault("STATE_BACKEND", "memory")
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:1")
+os.environ.setdefault("MONGO_CHANGE_STREAM", "false")
+os.environ.setdefault("MISTRAL_API_KEY", "test-key")
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """
+    Route Mistral calls to `mock_llm.reply(messages) -> str` and record them in `mock_llm.calls`.
+
+    Returns:
+        The recorder; set `reply` to change what the fake provider answers.
+    """
+    httpx = pytest.importorskip("httpx")
+    import llm_client
+
+    class Recorder:
+        def __init__(self):
+            self.calls = []
+            self.reply = lambda messages: "answer"
+
+        async def handler(self, request):
+            messages = json.loads(request.content)["messages"]
+            self.calls.append(messages)
+            return httpx.Response(200, json={"choices": [{"message": {"content": self.reply(messages)}}]})
+
+    recorder = Recorder()
+    monkeypatch.setattr(llm_client, "_client_cache", httpx.AsyncClient(transport=httpx.MockTransport(recorder.handler)))
+    return recorder
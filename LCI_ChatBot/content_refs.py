@@ -0,0 +1,116 @@
+"""
+Content-addressed references for large request fields (step/idea descriptions, hints, answers)
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Content Store Configuration
+CONTENT_STORE_MAX_ENTRIES = int(os.getenv("CONTENT_STORE_MAX_ENTRIES", "5000"))
+CONTENT_STORE_MAX_BYTES = int(os.getenv("CONTENT_STORE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+def canonical_json(value) -> str:
+    """Serialize with sorted keys and no whitespace, so equal content always hashes the same."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def content_hash(value) -> str:
+    return "sha256:" + hashlib.sha256(canonical_json(value).encode("utf-8")).hexdigest()
+
+class ContentStore:
+    """
+    Bounded LRU of recently received field values, keyed by content hash.
+
+    Callers that have already sent a value (the Node backend) pass its hash in
+    `contentRefs` instead of the value itself. Stored values are shared between
+    requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=CONTENT_STORE_MAX_ENTRIES, max_bytes=CONTENT_STORE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # ref -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, value) -> str:
+        """Store `value` and return its reference."""
+        raw = canonical_json(value).encode("utf-8")
+        ref = "sha256:" + hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            if ref in self._entries:
+                self._entries.move_to_end(ref)
+                return ref
+            if len(raw) > self.max_bytes:
+                return ref
+            self._entries[ref] = (value, len(raw))
+            self._bytes += len(raw)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self._bytes -= size
+        return ref
+
+    def get(self, ref):
+        """Return (found, value) for a reference."""
+        with self._lock:
+            entry = self._entries.get(ref)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(ref)
+            self.hits += 1
+            return True, entry[0]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+# Global instance
+content_store = ContentStore()
+
+def resolve_content_refs(request, fields) -> dict:
+    """
+    Replace referenced fields of a request with their stored content.
+
+    Fields sent in full are stored so later requests can refer to them. If a
+    reference is unknown (evicted, restarted or another worker) the request is
+    rejected with 409 and `{"error": "need_full_content", "fields": [...]}` so
+    the caller can resend those fields in full.
+
+    Args:
+        request: Request model with an optional `contentRefs` dict (field -> ref)
+        fields: Names of the fields that may be sent by reference
+
+    Returns:
+        dict: field -> ref for every field that was sent in full
+    """
+    refs = getattr(request, "contentRefs", None) or {}
+    stored, missing = {}, []
+    for field in fields:
+        value = getattr(request, field)
+        if value not in (None, "", {}, []):
+            stored[field] = content_store.put(value)
+        elif refs.get(field):
+            found, value = content_store.get(refs[field])
+            if found:
+                setattr(request, field, value)
+            else:
+                missing.append(field)
+    if missing:
+        print(f"♻️ Unknown content refs for {missing} - asking for full content")
+        raise HTTPException(status_code=409, detail={"error": "need_full_content", "fields": missing})
+    return stored
@@ -0,0 +1,179 @@
+"""
+Token-budgeted assembly of chat prompt context
+"""
+import os
+import threading
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Assembler Configuration
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_MIN_TRUNCATED_TOKENS = int(os.getenv("CONTEXT_MIN_TRUNCATED_TOKENS", "60"))
+# cl100k_base is not Mistral's own tokenizer, but it is close enough for budgeting
+CONTEXT_TOKENIZER_ENCODING = os.getenv("CONTEXT_TOKENIZER_ENCODING", "cl100k_base")
+# Shorter lines (headings, separators, bullets like "- yes") are never treated as duplicates
+CONTEXT_DEDUP_MIN_CHARS = 20
+# Appended to a truncated section, inside its token allowance
+TRUNCATION_MARKER = " …"
+# Vendored BPE files (tiktoken's own cache layout); the server never downloads them
+TIKTOKEN_CACHE_DIR = os.getenv("TIKTOKEN_CACHE_DIR", "models/tiktoken")
+
+# Cache the tokenizer so it is loaded once per process
+_encoding_cache = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+def _vendored_marker(encoding_name):
+    return os.path.join(TIKTOKEN_CACHE_DIR, f"{encoding_name}.vendored")
+
+def vendor_encoding(encoding_name=CONTEXT_TOKENIZER_ENCODING):
+    """Download the tiktoken BPE file once into TIKTOKEN_CACHE_DIR (e.g. at docker build)."""
+    if not TIKTOKEN_AVAILABLE:
+        raise RuntimeError("tiktoken is not installed")
+    os.makedirs(TIKTOKEN_CACHE_DIR, exist_ok=True)
+    # tiktoken reads TIKTOKEN_CACHE_DIR at load time and stores the downloaded file there
+    os.environ["TIKTOKEN_CACHE_DIR"] = os.path.abspath(TIKTOKEN_CACHE_DIR)
+    tiktoken.get_encoding(encoding_name)
+    with open(_vendored_marker(encoding_name), "w", encoding="utf-8") as f:
+        f.write(encoding_name)
+    print(f"✅ Vendored tokenizer '{encoding_name}' to {TIKTOKEN_CACHE_DIR}")
+
+def get_encoding():
+    """
+    Get the tiktoken encoding (loaded once from TIKTOKEN_CACHE_DIR), or None to fall back to estimates.
+
+    Only a vendored encoding is loaded, so this never blocks on a network
+    fetch; the startup bootstrap calls it once before traffic arrives.
+    """
+    global _encoding_cache, _encoding_failed
+    if _encoding_cache is not None or _encoding_failed or not TIKTOKEN_AVAILABLE:
+        return _encoding_cache
+    with _encoding_lock:
+        if _encoding_cache is None and not _encoding_failed:
+            if not os.path.exists(_vendored_marker(CONTEXT_TOKENIZER_ENCODING)):
+                print(f"⚠️ Warning: Tokenizer '{CONTEXT_TOKENIZER_ENCODING}' not vendored in {TIKTOKEN_CACHE_DIR} - "
+                      f"estimating tokens (run 'python model_artifacts.py vendor')")
+                _encoding_failed = True
+                return None
+            try:
+                os.environ["TIKTOKEN_CACHE_DIR"] = os.path.abspath(TIKTOKEN_CACHE_DIR)
+                _encoding_cache = tiktoken.get_encoding(CONTEXT_TOKENIZER_ENCODING)
+            except Exception as e:
+                print(f"⚠️ Warning: Could not load tokenizer '{CONTEXT_TOKENIZER_ENCODING}', estimating tokens: {e}")
+                _encoding_failed = True
+    return _encoding_cache
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Count tokens in `text` (cached - the same sections recur across chat turns)."""
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+def _normalize_line(line: str) -> str:
+    return " ".join(line.lower().split())
+
+class ContextAssembler:
+    """
+    Collect prompt context sections and pack them into a token budget.
+
+    Each section has a priority (lower = more important). `assemble()` removes
+    lines already contributed by a more important section, then keeps
+    sections in priority order until the budget is spent - truncating the first
+    one that does not fit when enough room is left - and records what was dropped.
+    Kept sections are returned in the order they were added.
+    """
+
+    def __init__(self, budget_tokens: int = CHAT_CONTEXT_TOKEN_BUDGET):
+        self.budget_tokens = budget_tokens
+        self.sections = []
+
+    def add(self, name: str, text: str, priority: float, truncatable: bool = True):
+        if text and text.strip():
+            self.sections.append({
+                "name": name,
+                "text": text.strip(),
+                "priority": priority,
+                "truncatable": truncatable,
+                "order": len(self.sections),
+            })
+
+    @staticmethod
+    def _truncate(text, max_tokens):
+        """Cut `text` so that it plus TRUNCATION_MARKER fits in `max_tokens`; returns (text, tokens)."""
+        limit = max_tokens - count_tokens(TRUNCATION_MARKER)
+        while True:
+            truncated = truncate_to_tokens(text, limit) + TRUNCATION_MARKER
+            tokens = count_tokens(truncated)
+            # Tokens can merge differently across the cut - shrink until it really fits
+            if tokens <= max_tokens or limit <= 0:
+                return truncated, tokens
+            limit -= 1
+
+    def assemble(self):
+        """
+        Returns:
+            tuple: (texts, report) - the kept section texts and a dict with
+                   used/budget token counts, kept names and dropped entries
+        """
+        seen_lines = set()
+        remaining = self.budget_tokens
+        kept = []
+        dropped = []
+
+        for section in sorted(self.sections, key=lambda s: (s["priority"], s["order"])):
+            # Deduplicate overlapping content at line granularity
+            lines = []
+            new_keys = set()
+            duplicates = 0
+            for line in section["text"].split("\n"):
+                key = _normalize_line(line)
+                if len(key) >= CONTEXT_DEDUP_MIN_CHARS:
+                    if key in seen_lines or key in new_keys:
+                        duplicates += 1
+                        continue
+                    new_keys.add(key)
+                lines.append(line)
+            text = "\n".join(lines).strip()
+            # Nothing substantial left once repeated lines are removed
+            if duplicates and not new_keys:
+                dropped.append({"name": section["name"], "reason": "duplicate", "tokens": 0})
+                continue
+
+            tokens = count_tokens(text)
+            if tokens > remaining:
+                if section["truncatable"] and remaining >= CONTEXT_MIN_TRUNCATED_TOKENS:
+                    text, kept_tokens = self._truncate(text, remaining)
+                    dropped.append({"name": section["name"], "reason": "truncated", "tokens": tokens - kept_tokens})
+                    tokens = kept_tokens
+                else:
+                    dropped.append({"name": section["name"], "reason": "over_budget", "tokens": tokens})
+                    continue
+
+            seen_lines.update(new_keys)
+            remaining -= tokens
+            kept.append({**section, "text": text, "tokens": tokens})
+
+        kept.sort(key=lambda s: s["order"])
+        report = {
+            "budget_tokens": self.budget_tokens,
+            "used_tokens": self.budget_tokens - remaining,
+            "kept": [s["name"] for s in kept],
+            "dropped": dropped,
+        }
+        return [s["text"] for s in kept], report
@@ -0,0 +1,114 @@
+"""
+Concurrent fetching of chat context sources with per-source deadlines
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per-source deadlines (seconds) - a source that misses its deadline is left out of the prompt
+CONTEXT_TEMPLATE_TIMEOUT = float(os.getenv("CONTEXT_TEMPLATE_TIMEOUT", "1.5"))
+CONTEXT_CANVAS_TIMEOUT = float(os.getenv("CONTEXT_CANVAS_TIMEOUT", "1.5"))
+CONTEXT_SEARCH_TIMEOUT = float(os.getenv("CONTEXT_SEARCH_TIMEOUT", "3.0"))
+CONTEXT_METRICS_WINDOW = int(os.getenv("CONTEXT_METRICS_WINDOW", "500"))   # recent latencies kept per source
+# Threads for blocking sources - a call that missed its deadline keeps its thread until it returns
+CONTEXT_SOURCE_MAX_THREADS = int(os.getenv("CONTEXT_SOURCE_MAX_THREADS", "8"))
+
+class ContextSourceMetrics:
+    """Per-source call, timeout and error counts plus recent latency percentiles."""
+
+    def __init__(self, window=CONTEXT_METRICS_WINDOW):
+        self.window = window
+        self._sources = {}
+
+    def _source(self, name):
+        if name not in self._sources:
+            self._sources[name] = {"calls": 0, "timeouts": 0, "errors": 0, "latencies": deque(maxlen=self.window)}
+        return self._sources[name]
+
+    def record(self, name, latency, outcome):
+        """outcome is "ok", "timeout" or "error"."""
+        source = self._source(name)
+        source["calls"] += 1
+        if outcome == "timeout":
+            source["timeouts"] += 1
+        elif outcome == "error":
+            source["errors"] += 1
+        source["latencies"].append(latency)
+
+    @staticmethod
+    def _percentile(ordered, percentile):
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))] * 1000, 1)
+
+    def stats(self):
+        result = {}
+        for name, source in self._sources.items():
+            ordered = sorted(source["latencies"])
+            result[name] = {
+                "calls": source["calls"],
+                "timeouts": source["timeouts"],
+                "errors": source["errors"],
+                "p50_ms": self._percentile(ordered, 50),
+                "p95_ms": self._percentile(ordered, 95),
+            }
+        return result
+
+# Global instance
+context_source_metrics = ContextSourceMetrics()
+
+_source_executor = ThreadPoolExecutor(max_workers=CONTEXT_SOURCE_MAX_THREADS, thread_name_prefix="context-source")
+_source_slots = threading.BoundedSemaphore(CONTEXT_SOURCE_MAX_THREADS)
+
+async def run_blocking_source(fn, *args, **kwargs):
+    """
+    Run a blocking source call in the bounded context-source pool.
+
+    Abandoned calls can tie up at most CONTEXT_SOURCE_MAX_THREADS threads, and
+    never the shared threadpool the rest of the app runs on. While every slot
+    is busy a source fails at once instead of queueing behind stuck calls.
+    """
+    if not _source_slots.acquire(blocking=False):
+        raise RuntimeError(f"all {CONTEXT_SOURCE_MAX_THREADS} context source threads are busy")
+
+    def call():
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _source_slots.release()
+
+    return await asyncio.get_running_loop().run_in_executor(_source_executor, call)
+
+async def _fetch_one(name, fn, timeout):
+    started = time.monotonic()
+    try:
+        result = await asyncio.wait_for(fn(), timeout)
+        context_source_metrics.record(name, time.monotonic() - started, "ok")
+        return result
+    except asyncio.TimeoutError:
+        context_source_metrics.record(name, time.monotonic() - started, "timeout")
+        print(f"⏱️ [CHAT] Context source '{name}' missed its {timeout}s deadline - skipping it")
+    except Exception as e:
+        context_source_metrics.record(name, time.monotonic() - started, "error")
+        print(f"❌ [CHAT] Error fetching context source '{name}': {e}")
+    return None
+
+async def fetch_context_sources(sources):
+    """
+    Run context sources concurrently, each bounded by its own deadline.
+
+    Args:
+        sources: Dict of name -> (coroutine factory, timeout seconds)
+
+    Returns:
+        dict: name -> result, or None for sources that failed or timed out
+    """
+    names = list(sources)
+    results = await asyncio.gather(*(_fetch_one(name, *sources[name]) for name in names))
+    return dict(zip(names, results))
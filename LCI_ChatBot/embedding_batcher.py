@@ -0,0 +1,120 @@
+"""
+Dynamic micro-batching of query embeddings
+"""
+import os
+import time
+import bisect
+import threading
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Batcher Configuration
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))   # how long a batch stays open for more queries
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+QUEUE_WAIT_MS_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250]
+
+class Histogram:
+    """Cumulative-bucket histogram, reported like a Prometheus histogram (le -> count)."""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def stats(self):
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "le": cumulative,
+        }
+
+class EmbeddingBatcher:
+    """
+    Collect concurrent encode requests and run them as one batched forward pass.
+
+    Search runs in threadpool workers; each caller enqueues its text and blocks
+    on a future. A single background thread takes the first queued text, keeps
+    the batch open for up to `max_wait_ms` (or until `max_size` texts are
+    queued), encodes the batch once and resolves every caller's future.
+    """
+
+    def __init__(self, model_loader, max_size=EMBED_BATCH_MAX_SIZE, max_wait_ms=EMBED_BATCH_MAX_WAIT_MS):
+        self.model_loader = model_loader
+        self.max_size = max(1, max_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = []                # [(text, future, enqueued_at)]
+        self._cond = threading.Condition()
+        self._thread = None
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self.batches = 0
+        self.errors = 0
+
+    def submit(self, text) -> Future:
+        future = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+            self._queue.append((text, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def encode(self, text):
+        """Embed one text (blocking) - the returned vector is a numpy array like `model.encode([text])[0]`."""
+        return self.submit(text).result()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._queue = self._queue[:self.max_size], self._queue[self.max_size:]
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.monotonic()
+            for _, _, enqueued_at in batch:
+                self.queue_wait_ms.observe((started - enqueued_at) * 1000)
+            self.batch_sizes.observe(len(batch))
+            self.batches += 1
+            try:
+                vectors = self.model_loader().encode([text for text, _, _ in batch], batch_size=len(batch))
+                for (_, future, _), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                self.errors += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "errors": self.errors,
+            "queued": len(self._queue),
+            "batch_size": self.batch_sizes.stats(),
+            "queue_wait_ms": self.queue_wait_ms.stats(),
+        }
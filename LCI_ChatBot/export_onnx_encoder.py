@@ -0,0 +1,188 @@
+"""
+Export all-MiniLM-L6-v2 to ONNX with dynamic int8 quantization
+
+Writes model_int8.onnx, tokenizer.json and encoder_config.json to
+ONNX_MODEL_DIR (used when EMBEDDING_BACKEND=onnx), then checks that the
+int8 encoder retrieves the same chunks as the PyTorch model against the
+existing 384-d index.
+
+Usage:
+    python export_onnx_encoder.py                 # export + recall check
+    python export_onnx_encoder.py --check-only    # recall check of an existing export
+"""
+import os
+import sys
+import json
+import pickle
+import argparse
+import numpy as np
+
+from onnx_encoder import (
+    ONNX_MODEL_DIR,
+    ONNX_MODEL_FILE,
+    ONNX_TOKENIZER_FILE,
+    ONNX_CONFIG_FILE,
+)
+from benchmark_encoder import SAMPLE_QUERIES, MODEL_NAME
+from model_artifacts import load_sentence_transformer, write_manifest
+
+ONNX_OPSET = 14
+
+# Index the chatbot searches (built with the PyTorch model) and its chunk texts
+INDEX_EMBEDDINGS_FILE = "parsed_content/sentence_transformer_embeddings.npy"
+INDEX_METADATA_FILE = "parsed_content/sentence_transformer_metadata.pkl"
+
+def export_onnx(output_dir=ONNX_MODEL_DIR, keep_fp32=False):
+    """
+    Export the SentenceTransformer's transformer to ONNX and quantize its weights to int8.
+
+    Args:
+        output_dir: Directory for the exported files
+        keep_fp32: Keep the unquantized model.onnx next to the int8 model
+
+    Returns:
+        str: Path of the int8 model
+    """
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    print("=" * 80)
+    print(f"🚀 Exporting {MODEL_NAME} to ONNX (dynamic int8)")
+    print("=" * 80)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("\n🧠 Loading Sentence Transformer model...")
+    model = load_sentence_transformer(device="cpu")
+    tokenizer = model.tokenizer
+
+    class LastHiddenState(torch.nn.Module):
+        """Return only the token embeddings - pooling and normalization run in numpy."""
+
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.transformer(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            )[0]
+
+    wrapper = LastHiddenState(model[0].auto_model).eval()
+    dummy = tokenizer(["Lean Canvas for Invention", "a longer second example sentence"],
+                      padding=True, return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+
+    print(f"\n📦 Exporting ONNX graph (opset {ONNX_OPSET})...")
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            tuple(dummy[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True,
+        )
+
+    print("\n🔧 Quantizing weights to int8 (dynamic quantization)...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    if not keep_fp32:
+        os.remove(fp32_path)
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, ONNX_TOKENIZER_FILE))
+    config = {
+        "model_name": MODEL_NAME,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+        "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        "quantization": "dynamic-int8",
+        "opset": ONNX_OPSET,
+    }
+    with open(os.path.join(output_dir, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    write_manifest(output_dir, f"{MODEL_NAME} via export_onnx_encoder.py")
+
+    print(f"✅ Exported to {output_dir} ({os.path.getsize(int8_path) / 1024**2:.1f} MB int8 model)")
+    return int8_path
+
+def load_index():
+    """Return (embeddings, chunk texts) of the existing index, or (None, []) if it is not on disk."""
+    if not (os.path.exists(INDEX_EMBEDDINGS_FILE) and os.path.exists(INDEX_METADATA_FILE)):
+        return None, []
+    embeddings = np.load(INDEX_EMBEDDINGS_FILE)
+    with open(INDEX_METADATA_FILE, "rb") as f:
+        metadata = pickle.load(f)
+    return embeddings, [chunk.get("text", "") for chunk in metadata]
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+def check_recall(model_dir=ONNX_MODEL_DIR, k=5, min_recall=0.9, min_cosine=0.98):
+    """
+    Compare the ONNX int8 encoder with the PyTorch model on the existing index.
+
+    Queries are SAMPLE_QUERIES plus the opening words of every 5th chunk. For
+    each query the top-k chunks found with the int8 query vector are compared
+    with those found with the PyTorch vector.
+
+    Returns:
+        dict: recall@k, mean/min cosine between the two query vectors, and `passed`
+    """
+    from onnx_encoder import OnnxSentenceEncoder
+
+    print("\n🔍 Recall check: ONNX int8 vs PyTorch")
+    torch_model = load_sentence_transformer(device="cpu")
+    onnx_model = OnnxSentenceEncoder(model_dir)
+
+    index, texts = load_index()
+    if index is None:
+        print(f"⚠️ {INDEX_EMBEDDINGS_FILE} not found - encoding sample chunks with PyTorch instead")
+        texts = SAMPLE_QUERIES
+        index = torch_model.encode(texts)
+    index = _normalize(index)
+
+    queries = SAMPLE_QUERIES + [" ".join(text.split()[:12]) for text in texts[::5] if text.strip()]
+    torch_vectors = _normalize(torch_model.encode(queries))
+    onnx_vectors = _normalize(onnx_model.encode(queries))
+
+    cosines = (torch_vectors * onnx_vectors).sum(axis=1)
+    torch_top = np.argsort(-(torch_vectors @ index.T), axis=1)[:, :k]
+    onnx_top = np.argsort(-(onnx_vectors @ index.T), axis=1)[:, :k]
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(torch_top, onnx_top)])
+
+    result = {
+        "queries": len(queries),
+        "index_size": len(index),
+        f"recall@{k}": round(float(recall), 4),
+        "mean_cosine": round(float(cosines.mean()), 4),
+        "min_cosine": round(float(cosines.min()), 4),
+    }
+    result["passed"] = bool(recall >= min_recall and cosines.mean() >= min_cosine)
+    print(json.dumps(result, indent=2))
+    print("✅ ONNX encoder is compatible with the index" if result["passed"]
+          else f"❌ ONNX encoder below thresholds (recall@{k} >= {min_recall}, mean cosine >= {min_cosine})")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Export {MODEL_NAME} to ONNX int8 and check recall")
+    parser.add_argument("--output", default=ONNX_MODEL_DIR, help=f"Output directory (default: {ONNX_MODEL_DIR})")
+    parser.add_argument("--check-only", action="store_true", help="Only run the recall check on an existing export")
+    parser.add_argument("--keep-fp32", action="store_true", help="Keep the unquantized model.onnx")
+    parser.add_argument("--k", type=int, default=5, help="Top-k used for recall (default: 5)")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="Minimum recall@k (default: 0.9)")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Minimum mean cosine (default: 0.98)")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export_onnx(args.output, keep_fp32=args.keep_fp32)
+    result = check_recall(args.output, k=args.k, min_recall=args.min_recall, min_cosine=args.min_cosine)
+    return result["passed"]
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,208 @@
+"""
+Shared async HTTP client for LLM provider calls
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import deque
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connection pool configuration
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# Hedged requests configuration (off by default)
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))   # hedge after this latency percentile
+LLM_HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.05"))     # at most 5% of requests are hedged
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))   # latencies needed before hedging
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))            # recent latencies kept
+
+# Cache the client so every request reuses the same keep-alive pool
+_client_cache = None
+
+def _http2_supported():
+    """HTTP/2 needs the optional 'h2' package (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def get_llm_client():
+    """
+    Get or create the shared async HTTP client (lazy-loaded and cached).
+
+    The client keeps connections to the provider alive between calls and
+    multiplexes requests over HTTP/2 when available, so concurrent chats share
+    a small pool instead of opening a new TLS connection each.
+
+    Returns:
+        httpx.AsyncClient: Shared client
+    """
+    global _client_cache
+    if _client_cache is not None and not _client_cache.is_closed:
+        return _client_cache
+
+    http2 = LLM_HTTP2 and _http2_supported()
+    if LLM_HTTP2 and not http2:
+        print("⚠️ Warning: 'h2' not installed - LLM client falling back to HTTP/1.1")
+
+    _client_cache = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    )
+    print(f"✅ LLM client created (http2={http2}, max_connections={LLM_MAX_CONNECTIONS}, "
+          f"keepalive={LLM_MAX_KEEPALIVE_CONNECTIONS})")
+    return _client_cache
+
+async def close_llm_client():
+    """Close the shared client and release pooled connections - called on shutdown"""
+    global _client_cache
+    if _client_cache is not None and not _client_cache.is_closed:
+        await _client_cache.aclose()
+        print("🛑 LLM client closed")
+    _client_cache = None
+
+def request_fingerprint(payload: dict) -> str:
+    """Hash a provider request payload (messages + model parameters) into a coalescing key."""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical LLM requests into one upstream call.
+
+    The first caller for a key starts the upstream call as its own task; callers
+    arriving while it is in flight await that same task instead of issuing a
+    duplicate request. The task is shielded, so a disconnecting caller does not
+    cancel the call for everyone else waiting on it.
+    """
+
+    def __init__(self):
+        self._inflight = {}   # key -> asyncio.Task
+        self.upstream_calls = 0
+        self.coalesced_hits = 0
+
+    async def do(self, key: str, fn):
+        """Run `fn()` (a coroutine factory) once per key among concurrent callers."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _, k=key: self._inflight.pop(k, None))
+            self.upstream_calls += 1
+        else:
+            self.coalesced_hits += 1
+            print(f"🔗 Coalesced duplicate LLM request (in flight: {len(self._inflight)})")
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.upstream_calls,
+            "coalesced_hits": self.coalesced_hits,
+        }
+
+# Global instances
+llm_single_flight = SingleFlight()
+# Whole chat turns (LLM answer + history append), so coalesced duplicates record the turn once
+chat_turn_single_flight = SingleFlight()
+
+class RequestHedger:
+    """
+    Hedge slow LLM requests to cut tail latency.
+
+    If the first attempt has not answered after the configured percentile of
+    recent successful latencies, an identical second request is fired and the
+    first to succeed wins; the loser is cancelled. Hedges are capped at
+    LLM_HEDGE_MAX_RATE of all requests so they cannot double upstream load.
+    """
+
+    def __init__(self):
+        self.latencies = deque(maxlen=LLM_HEDGE_WINDOW)
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None if this request must not be hedged."""
+        if not LLM_HEDGING_ENABLED or len(self.latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        if self.hedges_fired + 1 > LLM_HEDGE_MAX_RATE * self.requests:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * LLM_HEDGE_PERCENTILE / 100))
+        return ordered[index]
+
+    async def run(self, fn, can_hedge=lambda: True):
+        """
+        Run `fn()` (a coroutine factory doing one upstream request), hedging if it is slow.
+
+        `can_hedge()` is checked right before firing the hedge so the caller can
+        refuse it, e.g. when there is no rate-limit capacity left.
+        """
+        self.requests += 1
+        started = time.monotonic()
+        delay = self.hedge_delay()
+
+        if delay is None:
+            result = await fn()
+            self.latencies.append(time.monotonic() - started)
+            return result
+
+        primary = asyncio.ensure_future(fn())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not can_hedge():
+            result = await primary
+            self.latencies.append(time.monotonic() - started)
+            return result
+
+        self.hedges_fired += 1
+        print(f"🪃 Hedging slow LLM request after {delay:.2f}s")
+        hedge = asyncio.ensure_future(fn())
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        else:
+                            self.primary_wins += 1
+                        self.latencies.append(time.monotonic() - started)
+                        return task.result()
+            # Both attempts failed - surface the original request's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        return {
+            "enabled": LLM_HEDGING_ENABLED,
+            "requests": self.requests,
+            "hedges_fired": self.hedges_fired,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins_after_hedge": self.primary_wins,
+            "hedge_delay_seconds": self.hedge_delay() if LLM_HEDGING_ENABLED else None,
+        }
+
+# Global instance
+llm_hedger = RequestHedger()
@@ -0,0 +1,233 @@
+"""
+Outbound LLM concurrency governor: rate limiting, retries and circuit breaking
+"""
+import os
+import time
+import random
+import asyncio
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Governor Configuration
+LLM_RPM_LIMIT = float(os.getenv("LLM_RPM_LIMIT", "60"))              # requests per minute
+LLM_TPM_LIMIT = float(os.getenv("LLM_TPM_LIMIT", "500000"))          # tokens per minute
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "500"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "100"))               # callers allowed to wait for a slot
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "15"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "10"))
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Upstream statuses worth retrying (rate limited / provider overloaded / gateway errors)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class LLMResponseError(HTTPException):
+    """
+    The provider answered 200 but the body was not valid JSON or lacked the
+    expected structure. Raised as 502 to clients, but deterministic - it is
+    never retried and does not count against the circuit breaker.
+    """
+
+    def __init__(self, detail):
+        super().__init__(status_code=502, detail=detail)
+
+def estimate_request_tokens(payload: dict) -> int:
+    """Rough token cost of a request: ~4 characters per prompt token plus the expected completion."""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+    return prompt_chars // 4 + LLM_EXPECTED_COMPLETION_TOKENS
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most `per_minute` units."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(per_minute, 1.0)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+class CircuitBreaker:
+    """
+    Fail fast while the provider is degraded.
+
+    Opens after `failure_threshold` consecutive failures; after `reset_seconds`
+    one trial request is let through (half-open) and its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURE_THRESHOLD, reset_seconds=LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        # Also re-admit a trial if the previous one never reported back (e.g. was cancelled)
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self.opened_at = time.monotonic()
+            print("🟡 LLM circuit half-open - sending a trial request")
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        if self.state != "closed":
+            print("🟢 LLM circuit closed - provider recovered")
+        self.state = "closed"
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                print(f"🔴 LLM circuit opened after {self.consecutive_failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+class LLMGovernor:
+    """
+    Admission control in front of every upstream LLM request.
+
+    - Token buckets sized from the configured RPM/TPM limits pace requests
+    - At most `max_queue` callers wait for a slot, each until its own deadline
+    - Retryable failures are retried with full jitter, honoring Retry-After
+    - A circuit breaker rejects requests immediately while the provider is down
+    """
+
+    def __init__(self):
+        self.rpm_bucket = TokenBucket(LLM_RPM_LIMIT)
+        self.tpm_bucket = TokenBucket(LLM_TPM_LIMIT)
+        self.breaker = CircuitBreaker()
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.rejected_circuit_open = 0
+        self.retries = 0
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self.rejected_circuit_open += 1
+            retry_after = self.breaker.retry_after()
+            raise HTTPException(
+                status_code=503,
+                detail="LLM provider is temporarily unavailable, please retry shortly",
+                headers={"Retry-After": str(int(retry_after) + 1)},
+            )
+
+    async def admit(self, estimated_tokens: int, deadline: float):
+        """Wait for rate-limit capacity or raise once the queue is full or the deadline passes."""
+        self._check_breaker()
+        if self.waiting >= LLM_MAX_QUEUE:
+            self.rejected_queue_full += 1
+            raise HTTPException(status_code=429, detail="LLM request queue is full, please retry shortly")
+
+        self.waiting += 1
+        try:
+            while True:
+                wait = max(self.rpm_bucket.wait_time(1), self.tpm_bucket.wait_time(estimated_tokens))
+                if wait <= 0:
+                    self.rpm_bucket.consume(1)
+                    self.tpm_bucket.consume(estimated_tokens)
+                    self.admitted += 1
+                    return
+                if time.monotonic() + wait > deadline:
+                    self.rejected_deadline += 1
+                    raise HTTPException(status_code=503, detail="Timed out waiting for LLM capacity")
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            self.waiting -= 1
+
+    def try_admit(self, estimated_tokens: int) -> bool:
+        """Take rate-limit capacity only if it is available right now (used for optional extra requests)."""
+        if self.breaker.state != "closed":
+            return False
+        if self.rpm_bucket.wait_time(1) > 0 or self.tpm_bucket.wait_time(estimated_tokens) > 0:
+            return False
+        self.rpm_bucket.consume(1)
+        self.tpm_bucket.consume(estimated_tokens)
+        self.admitted += 1
+        return True
+
+    def _retry_delay(self, attempt: int, error: HTTPException) -> float:
+        retry_after = (error.headers or {}).get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+        # Full jitter exponential backoff
+        return random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * (2 ** attempt)))
+
+    async def run(self, fn, estimated_tokens: int):
+        """
+        Run `fn()` (a coroutine factory doing one upstream request) under the governor.
+
+        `fn` is expected to raise HTTPException carrying the upstream status code
+        (and Retry-After header, if any) on failure.
+        """
+        deadline = time.monotonic() + LLM_QUEUE_TIMEOUT_SECONDS
+        attempt = 0
+        while True:
+            await self.admit(estimated_tokens, deadline)
+            try:
+                result = await fn()
+            except HTTPException as e:
+                if e.status_code not in RETRYABLE_STATUS_CODES or isinstance(e, LLMResponseError):
+                    # The provider answered - a bad request or malformed body is not a sign of degradation
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= LLM_MAX_RETRIES:
+                    raise
+                delay = self._retry_delay(attempt, e)
+                attempt += 1
+                self.retries += 1
+                print(f"🔁 LLM call failed with {e.status_code}, retry {attempt}/{LLM_MAX_RETRIES} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                # Give each retry a fresh queue deadline
+                deadline = time.monotonic() + LLM_QUEUE_TIMEOUT_SECONDS
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self):
+        return {
+            "circuit_state": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "retries": self.retries,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+            "rejected_circuit_open": self.rejected_circuit_open,
+        }
+
+# Global instance
+llm_governor = LLMGovernor()
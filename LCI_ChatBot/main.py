@@ -3,14 +3,57 @@ import os
 import sys
 import json
 import time
+import asyncio
+import inspect
+from contextlib import asynccontextmanager
 from typing import List, Optional
 
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from llm_client import (
+    get_llm_client,
+    close_llm_client,
+    llm_single_flight,
+    chat_turn_single_flight,
+    llm_hedger,
+    request_fingerprint,
+)
+from llm_governor import (
+    llm_governor,
+    estimate_request_tokens,
+    LLMResponseError,
+    RETRYABLE_STATUS_CODES,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+)
+from autofill_parser import (
+    IncrementalJSONObjectParser,
+    parse_json_object,
+    expected_autofill_fields,
+    find_missing_fields,
+    is_valid_field_value,
+)
+from autofill_cache import autofill_cache
+from semantic_cache import semantic_cache, SEMANTIC_CACHE_ENABLED
+from context_assembler import ContextAssembler, count_tokens, get_encoding
+from context_sources import (
+    fetch_context_sources,
+    run_blocking_source,
+    context_source_metrics,
+    CONTEXT_TEMPLATE_TIMEOUT,
+    CONTEXT_CANVAS_TIMEOUT,
+    CONTEXT_SEARCH_TIMEOUT,
+)
+from chat_memory import conversation_summarizer
+from content_refs import content_store, resolve_content_refs
+from state_backend import chat_sessions, autofill_contexts, close_state_backend
+from startup import bootstrap_state, READY_REQUIRE_SEARCH
+
 # ============================  
 # 🔧 Environment Setup
 # ============================
@@ -59,23 +102,19 @@ def initialize_qdrant_and_embeddings():
         return False
 
 # Optional dependencies - handle gracefully if not available
-try:
-    from pymongo import MongoClient
-    MONGO_AVAILABLE = True
-except ImportError:
-    print("⚠️ Warning: pymongo not available. MongoDB features disabled.")
-    MONGO_AVAILABLE = False
+from mongo_store import mongo_store
+from canvas_digest import render_template_fields
+from answer_delta import answer_deltas
 
 try:
     # Using Qdrant for semantic search
-    # NOTE: Model (all-MiniLM-L6-v2, 384-dim) is lazy-loaded on first search, not at startup
-    # This reduces RAM usage - model will be cached after first load for fast subsequent searches
+    # NOTE: Qdrant, the embeddings and the model (all-MiniLM-L6-v2, 384-dim) are set up and
+    # warmed by the lifespan bootstrap in the background - /ready reports when they are done
     from qdrant_search import search_chunks_qdrant as search_chunks_sentence_transformer
+    from qdrant_search import embed_query, embedding_batcher, query_embedding_cache, search_result_cache
+    from qdrant_search import warm_up_encoder, warm_up_search
     SEARCH_AVAILABLE = True
-    print("✅ Using Qdrant for semantic search (lazy-loaded model)")
-    
-    # Initialize Qdrant server and embeddings
-    initialize_qdrant_and_embeddings()
+    print("✅ Using Qdrant for semantic search (warmed up in the background)")
     
 except Exception as e:
     print(f"❌ Error: Qdrant not available: {e}")
@@ -88,40 +127,93 @@ except Exception as e:
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 MISTRAL_MODEL = "mistral-tiny"
 BASE_URL = "https://api.mistral.ai/v1/chat/completions"
+# Ask the provider for a guaranteed JSON object on autofill calls (response_format)
+MISTRAL_JSON_MODE = os.getenv("MISTRAL_JSON_MODE", "true").lower() in ("1", "true", "yes")
+# Follow-up LLM calls that re-ask only for missing/invalid autofill fields
+AUTOFILL_MAX_REPAIR_ATTEMPTS = int(os.getenv("AUTOFILL_MAX_REPAIR_ATTEMPTS", "1"))
+# Bump whenever the autofill prompt changes so cached field answers are not reused
+AUTOFILL_PROMPT_VERSION = "2"
+# Token budget for past chat turns resent with each question (the newest turns are kept)
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
 
-# MongoDB setup (if available)
-if MONGO_AVAILABLE:
-    MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-    DB_NAME = os.getenv("DB_NAME", "startovate")
-    try:
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-    except Exception as e:
-        print(f"⚠️ Warning: Could not connect to MongoDB: {e}")
-        MONGO_AVAILABLE = False
-else:
-    db = None
+# MongoDB access (async, projected, cached) lives in mongo_store.mongo_store
 
-# Memory - Per-user chat history
-CHAT_HISTORY = {}   # dict of {user_id: [{"role": "user"/"assistant", "content": "..."}]}
+# Memory - Per-user chat history (raw queries and answers only - no instructions or context)
+# lives in state_backend.chat_sessions: in-process (bounded, spilled to SQLite) or Redis
 
 # ============================
 # 🔁 Shared AutoFill Context Store
 # ============================
-# Keys are typically templateKey (from AutoFillRequest.templateKey), but can be any identifier you want to use
-AUTO_CONTEXT = {}
-# Example structure:
-# AUTO_CONTEXT = {
-#     "template_abc": {
-#         "ideaDescription": "...",
-#         "stepDescription": "...",
-#         "fieldHints": {...},
-#         "fields": [...],
-#         "repeatedFields": [...],
-#         "generatedAnswers": {...},
-#         "timestamp": 1690000000.0
-#     }
-# }
+# Previous autofill answers live in state_backend.autofill_contexts, scoped per
+# (userId, canvasId, templateKey), TTL/LRU-evicted and stored as rendered prompt text
+
+# ============================
+# 🚀 Startup Bootstrap
+# ============================
+async def bootstrap_search():
+    """
+    Bring semantic search up and warm it, without blocking the server from listening.
+
+    Two chains run concurrently: Qdrant + embeddings, and model artifact +
+    encoder. Once both are up, a warmup search pages in the Qdrant segments.
+    """
+    if not SEARCH_AVAILABLE:
+        for name in ("qdrant", "model_artifact", "encoder", "warmup_search"):
+            bootstrap_state.skip(name, "qdrant_search not importable")
+        return
+
+    from auto_setup import verify_model_artifacts
+
+    async def encoder_chain():
+        if not await bootstrap_state.run_step("model_artifact", verify_model_artifacts):
+            bootstrap_state.skip("encoder", "model artifact not usable")
+            return False
+        return await bootstrap_state.run_step("encoder", warm_up_encoder)
+
+    qdrant_ok, encoder_ok = await asyncio.gather(
+        bootstrap_state.run_step("qdrant", initialize_qdrant_and_embeddings),
+        encoder_chain(),
+    )
+    if qdrant_ok and encoder_ok:
+        await bootstrap_state.run_step("warmup_search", warm_up_search)
+    else:
+        bootstrap_state.skip("warmup_search", "qdrant or encoder not ready")
+        print("💡 Chatbot will run without LCI knowledge - manual setup may be needed")
+    log_memory("After bootstrap")
+
+async def bootstrap():
+    """Load the context tokenizer (from its vendored file) while semantic search comes up."""
+    await asyncio.gather(
+        bootstrap_state.run_step("tokenizer", lambda: get_encoding() is not None),
+        bootstrap_search(),
+    )
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start the bootstrap in the background; on shutdown close Qdrant, MongoDB, state and the LLM client"""
+    bootstrap_state.start(bootstrap)
+    yield
+
+    def stop_qdrant():
+        from qdrant_server_manager import stop_qdrant
+        stop_qdrant()
+
+    # Each step runs even if an earlier one fails; pending session/autofill writes are flushed first
+    shutdown_steps = [
+        ("startup bootstrap", bootstrap_state.stop),
+        ("chat summarizer", conversation_summarizer.stop),
+        ("state backend", close_state_backend),
+        ("MongoDB client", mongo_store.close),
+        ("LLM client", close_llm_client),
+        ("Qdrant server", stop_qdrant),
+    ]
+    for name, step in shutdown_steps:
+        try:
+            result = step()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"⚠️ Error closing {name}: {e}")
 
 # ============================
 # 🚀 FastAPI Setup
@@ -130,19 +222,10 @@ app = FastAPI(
     title="LCI ChatBot API (Mistral Hybrid Context)",
     description="FastAPI backend for LCI chatbot using Mistral with hybrid context (template + canvas + semantic search).",
     version="3.0.0",
+    lifespan=lifespan,
 )
 log_memory("After FastAPI startup")
 
-# Add shutdown handler for Qdrant server
-@app.on_event("shutdown")
-def shutdown_event():
-    """Gracefully shutdown Qdrant server when FastAPI shuts down"""
-    try:
-        from qdrant_server_manager import stop_qdrant
-        stop_qdrant()
-    except Exception as e:
-        print(f"⚠️ Error during shutdown: {e}")
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173", "http://localhost:51722", "https://startovate-frontend.pages.dev"],
@@ -154,7 +237,76 @@ app.add_middleware(
 # ============================
 # 🧠 Helper: Call LLM API
 # ============================
-def call_llm(provider: str, messages: List[dict], model: Optional[str] = None) -> str:
+def build_mistral_request(messages: List[dict], model: Optional[str] = None, json_mode: bool = False, **extra):
+    """Build the (headers, payload) pair for a Mistral chat completion request."""
+    headers = {
+        "Authorization": f"Bearer {MISTRAL_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": model or MISTRAL_MODEL,
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": 4000,  # Ensure we get complete responses
+    }
+    if json_mode and MISTRAL_JSON_MODE:
+        payload["response_format"] = {"type": "json_object"}
+    payload.update(extra)
+    return headers, payload
+
+async def post_mistral(headers: dict, payload: dict) -> str:
+    """Send one chat completion request and return the answer text."""
+    try:
+        client = get_llm_client()
+        response = await client.post(BASE_URL, headers=headers, json=payload)
+        print(f"📥 DEBUG call_llm: Response status code: {response.status_code}")
+
+        if response.status_code != 200:
+            print(f"❌ DEBUG call_llm: Error response: {response.text}")
+            retry_after = response.headers.get("Retry-After")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Mistral API error: {response.text}",
+                headers={"Retry-After": retry_after} if retry_after else None,
+            )
+
+        data = response.json()
+        print(f"✅ DEBUG call_llm: Response parsed successfully")
+
+        # Check response structure
+        if "choices" not in data:
+            print(f"❌ DEBUG call_llm: 'choices' key missing from response: {data}")
+            raise LLMResponseError("Invalid response structure: missing 'choices'")
+
+        if not data["choices"]:
+            print(f"❌ DEBUG call_llm: 'choices' array is empty: {data}")
+            raise LLMResponseError("Invalid response structure: empty 'choices'")
+
+        if "message" not in data["choices"][0]:
+            print(f"❌ DEBUG call_llm: 'message' key missing from choice: {data['choices'][0]}")
+            raise LLMResponseError("Invalid response structure: missing 'message'")
+
+        if "content" not in data["choices"][0]["message"]:
+            print(f"❌ DEBUG call_llm: 'content' key missing from message: {data['choices'][0]['message']}")
+            raise LLMResponseError("Invalid response structure: missing 'content'")
+
+        content = data["choices"][0]["message"]["content"].strip()
+        print(f"📝 DEBUG call_llm: Extracted content (length: {len(content)})")
+        log_memory("After LLM call")
+
+        return content
+
+    except httpx.TimeoutException:
+        print("❌ DEBUG call_llm: Request timed out")
+        raise HTTPException(status_code=504, detail="Mistral API request timed out")
+    except httpx.HTTPError as e:
+        print(f"❌ DEBUG call_llm: Request exception: {e}")
+        raise HTTPException(status_code=502, detail=f"Mistral API request failed: {str(e)}")
+    except ValueError as e:
+        print(f"❌ DEBUG call_llm: JSON parsing error: {e}")
+        raise LLMResponseError(f"Invalid JSON response from Mistral API: {str(e)}")
+
+async def call_llm(provider: str, messages: List[dict], model: Optional[str] = None, json_mode: bool = False) -> str:
     log_memory("Before LLM call")
 
     print(f"🔍 DEBUG call_llm: Called with provider='{provider}', model='{model or MISTRAL_MODEL}', messages_count={len(messages)}")
@@ -167,78 +319,100 @@ def call_llm(provider: str, messages: List[dict], model: Optional[str] = None) -
 
         print(f"🔑 DEBUG call_llm: API key is set (length: {len(MISTRAL_API_KEY)})")
 
-        headers = {
-            "Authorization": f"Bearer {MISTRAL_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "model": model or MISTRAL_MODEL,
-            "messages": messages,
-            "temperature": 0.7,
-            "max_tokens": 4000,  # Ensure we get complete responses
-        }
+        headers, payload = build_mistral_request(messages, model, json_mode=json_mode)
 
         print(f"📤 DEBUG call_llm: Sending request to {BASE_URL}")
         print(f"📦 DEBUG call_llm: Payload model={payload['model']}, temperature={payload['temperature']}")
 
-        try:
-            response = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
-            print(f"📥 DEBUG call_llm: Response status code: {response.status_code}")
-
-            if response.status_code != 200:
-                print(f"❌ DEBUG call_llm: Error response: {response.text}")
-                raise HTTPException(status_code=response.status_code, detail=f"Mistral API error: {response.text}")
-
-            data = response.json()
-            print(f"✅ DEBUG call_llm: Response parsed successfully")
+        # Identical concurrent requests (double clicks, retries) share one upstream call,
+        # which is paced, retried and circuit-broken by the governor and hedged if slow
+        estimated_tokens = estimate_request_tokens(payload)
+        return await llm_single_flight.do(
+            request_fingerprint(payload),
+            lambda: llm_governor.run(
+                lambda: llm_hedger.run(
+                    lambda: post_mistral(headers, payload),
+                    can_hedge=lambda: llm_governor.try_admit(estimated_tokens),
+                ),
+                estimated_tokens,
+            ),
+        )
 
-            # Check response structure
-            if "choices" not in data:
-                print(f"❌ DEBUG call_llm: 'choices' key missing from response: {data}")
-                raise HTTPException(status_code=500, detail="Invalid response structure: missing 'choices'")
+    else:
+        print(f"❌ DEBUG call_llm: Unknown provider: {provider}")
+        raise ValueError(f"Unknown provider: {provider}")
 
-            if not data["choices"]:
-                print(f"❌ DEBUG call_llm: 'choices' array is empty: {data}")
-                raise HTTPException(status_code=500, detail="Invalid response structure: empty 'choices'")
+async def stream_llm(provider: str, messages: List[dict], model: Optional[str] = None, json_mode: bool = False):
+    """
+    Stream a completion from the LLM provider.
 
-            if "message" not in data["choices"][0]:
-                print(f"❌ DEBUG call_llm: 'message' key missing from choice: {data['choices'][0]}")
-                raise HTTPException(status_code=500, detail="Invalid response structure: missing 'message'")
+    Same request as call_llm but with `stream: true`; yields each content
+    delta as soon as the provider sends it.
+    """
+    print(f"🔍 DEBUG stream_llm: Called with provider='{provider}', model='{model or MISTRAL_MODEL}', messages_count={len(messages)}")
 
-            if "content" not in data["choices"][0]["message"]:
-                print(f"❌ DEBUG call_llm: 'content' key missing from message: {data['choices'][0]['message']}")
-                raise HTTPException(status_code=500, detail="Invalid response structure: missing 'content'")
+    if provider.lower() != "mistral":
+        print(f"❌ DEBUG stream_llm: Unknown provider: {provider}")
+        raise ValueError(f"Unknown provider: {provider}")
 
-            content = data["choices"][0]["message"]["content"].strip()
-            print(f"📝 DEBUG call_llm: Extracted content (length: {len(content)})")
-            log_memory("After LLM call")
+    if not MISTRAL_API_KEY:
+        print("❌ DEBUG stream_llm: MISTRAL_API_KEY is not set!")
+        raise HTTPException(status_code=500, detail="Mistral API key not configured")
 
-            return content
+    headers, payload = build_mistral_request(messages, model, json_mode=json_mode, stream=True)
 
-        except requests.exceptions.Timeout:
-            print("❌ DEBUG call_llm: Request timed out")
-            raise HTTPException(status_code=500, detail="Mistral API request timed out")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ DEBUG call_llm: Request exception: {e}")
-            raise HTTPException(status_code=500, detail=f"Mistral API request failed: {str(e)}")
-        except ValueError as e:
-            print(f"❌ DEBUG call_llm: JSON parsing error: {e}")
-            raise HTTPException(status_code=500, detail=f"Invalid JSON response from Mistral API: {str(e)}")
+    # Streams are paced by the governor but not retried - deltas may already be sent
+    await llm_governor.admit(
+        estimate_request_tokens(payload),
+        deadline=time.monotonic() + LLM_QUEUE_TIMEOUT_SECONDS,
+    )
 
-    else:
-        print(f"❌ DEBUG call_llm: Unknown provider: {provider}")
-        raise ValueError(f"Unknown provider: {provider}")
+    try:
+        client = get_llm_client()
+        async with client.stream("POST", BASE_URL, headers=headers, json=payload) as response:
+            print(f"📥 DEBUG stream_llm: Response status code: {response.status_code}")
+            if response.status_code != 200:
+                body = (await response.aread()).decode("utf-8", errors="replace")
+                print(f"❌ DEBUG stream_llm: Error response: {body}")
+                # Same accounting as LLMGovernor.run, so a half-open trial always resolves
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    llm_governor.breaker.record_failure()
+                else:
+                    llm_governor.breaker.record_success()
+                raise HTTPException(status_code=response.status_code, detail=f"Mistral API error: {body}")
+            llm_governor.breaker.record_success()
+
+            # Provider sends SSE lines: "data: {...}" and finally "data: [DONE]"
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+
+    except httpx.TimeoutException:
+        print("❌ DEBUG stream_llm: Request timed out")
+        llm_governor.breaker.record_failure()
+        raise HTTPException(status_code=504, detail="Mistral API request timed out")
+    except httpx.HTTPError as e:
+        print(f"❌ DEBUG stream_llm: Request exception: {e}")
+        llm_governor.breaker.record_failure()
+        raise HTTPException(status_code=502, detail=f"Mistral API request failed: {str(e)}")
+    except ValueError as e:
+        print(f"❌ DEBUG stream_llm: JSON parsing error: {e}")
+        raise HTTPException(status_code=500, detail=f"Invalid JSON chunk from Mistral API: {str(e)}")
 
 # ============================
 # 💬 Generate Chatbot Response
 # ============================
-def generate_chatbot_response(query: str, context_texts: List[str], user_id: str = "default") -> str:
-    print(f"🤖 [GENERATE] Starting chatbot response generation...")
-    print(f"   - Query: {query[:50]}...")
-    print(f"   - User ID: {user_id}")
-    print(f"   - Context texts count: {len(context_texts)}")
-
-    domain_instruction = """
+CHAT_SYSTEM_PROMPT = """
 You are an AI assistant specialized in the **Lean Canvas for Invention (LCI)** methodology.
 
 Your knowledge base includes:
@@ -252,18 +426,17 @@ Your knowledge base includes:
 1. Stay within the LCI context.
 2. If the user asks something unrelated, respond with:
    "I'm here to assist only with Lean Canvas for Invention methodology and its templates."
-   "I'm here to assist only with Lean Canvas for Invention methodology and its templates."
 3. Use existing user data (from templates/canvas) to give personalized, contextual help.
 4. Be CONCISE - answer with just enough detail to be helpful, no more. One clear paragraph is usually enough.
 5. Use bullet points for lists.
 6. Avoid unnecessary elaboration - get straight to the point.
 """
 
+def build_chat_prompt(query: str, context_texts: List[str]) -> str:
+    """Build the current user turn (query + freshly retrieved context)."""
     print("🤖 [GENERATE] Building prompt...")
     combined_context = "\n\n".join(context_texts)
     prompt = f"""
-{domain_instruction}
-
 User Query:
 "{query}"
 
@@ -273,27 +446,112 @@ Relevant Context from Database and LCI Knowledge:
 IMPORTANT: Keep your response concise - just enough to answer the question clearly. One paragraph is usually sufficient.
 """
     print(f"   - Prompt length: {len(prompt)}")
+    return prompt
+
+def select_recent_history(history: List[dict], budget_tokens: int = CHAT_HISTORY_TOKEN_BUDGET) -> List[dict]:
+    """
+    Pick the newest whole user/assistant exchanges that fit in the token budget.
+
+    Args:
+        history: Stored chat history, oldest first
+        budget_tokens: Maximum tokens of history to resend
+
+    Returns:
+        list: Messages to send, oldest first (always starting with a user turn)
+    """
+    selected = []
+    used = 0
+    for message in reversed(history):
+        tokens = count_tokens(message["content"])
+        if used + tokens > budget_tokens:
+            break
+        selected.append(message)
+        used += tokens
+    selected.reverse()
+    # Do not start mid-exchange with an orphaned assistant answer
+    while selected and selected[0]["role"] != "user":
+        selected.pop(0)
+    return selected
+
+async def build_chat_messages(query: str, context_texts: List[str], user_id: str) -> List[dict]:
+    """System instruction, summary of older turns, budgeted raw history, then the current turn with its context."""
+    messages = [{"role": "system", "content": CHAT_SYSTEM_PROMPT}]
+    # Session stores do blocking I/O (Redis round trips, SQLite spill) - keep it off the event loop
+    summary, stored_messages = await run_in_threadpool(chat_sessions.get_session, user_id)
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    history = select_recent_history(stored_messages)
+    print(f"   - History messages sent: {len(history)} (summary: {len(summary)} chars)")
+    return messages + history + [{"role": "user", "content": build_chat_prompt(query, context_texts)}]
+
+async def record_chat_turn(user_id: str, query: str, answer: str, history_note: Optional[str] = None):
+    """
+    Append one raw user/assistant exchange to the user's chat history.
 
-    print("🤖 [GENERATE] Updating chat history...")
-    # Initialize user's chat history if not exists
-    if user_id not in CHAT_HISTORY:
-        CHAT_HISTORY[user_id] = []
-        print(f"   - Created new chat history for user: {user_id}")
+    `history_note` is context the later turns build on (e.g. the answers
+    snapshot a delta refers to) and is stored with the query.
+    """
+    user_content = f"{query}\n\n{history_note}" if history_note else query
+    await run_in_threadpool(chat_sessions.append, user_id, [
+        {"role": "user", "content": user_content},
+        {"role": "assistant", "content": answer},
+    ])
+    # Older turns are folded into a running summary in the background once history grows
+    conversation_summarizer.schedule(user_id)
 
-    # Update user's chat memory
-    CHAT_HISTORY[user_id].append({"role": "user", "content": prompt})
-    recent_history = CHAT_HISTORY[user_id][-10:]  # Last 10 messages for this user
-    print(f"   - Chat history updated, recent messages: {len(recent_history)}")
+async def summarize_chat_turns(messages: List[dict]) -> str:
+    return await call_llm("mistral", messages)
 
-    print("🤖 [GENERATE] Calling LLM...")
-    answer = call_llm("mistral", recent_history)
-    print(f"✅ [GENERATE] LLM call completed (answer length: {len(answer)})")
+conversation_summarizer.configure(chat_sessions, summarize_chat_turns)
 
-    CHAT_HISTORY[user_id].append({"role": "assistant", "content": answer})
+async def generate_chatbot_response(query: str, context_texts: List[str], user_id: str = "default",
+                                    history_note: Optional[str] = None) -> str:
+    print(f"🤖 [GENERATE] Starting chatbot response generation...")
+    print(f"   - Query: {query[:50]}...")
+    print(f"   - User ID: {user_id}")
+    print(f"   - Context texts count: {len(context_texts)}")
+
+    messages = await build_chat_messages(query, context_texts, user_id)
+
+    async def answer_and_record():
+        print("🤖 [GENERATE] Calling LLM...")
+        answer = await call_llm("mistral", messages)
+        print(f"✅ [GENERATE] LLM call completed (answer length: {len(answer)})")
+
+        # Only the raw query is remembered - context is re-retrieved for every turn
+        await record_chat_turn(user_id, query, answer, history_note)
+        return answer
+
+    # Duplicate submissions of the same turn share one LLM call and are recorded in history once
+    turn_key = request_fingerprint({"userId": user_id, "messages": messages, "history_note": history_note})
+    answer = await chat_turn_single_flight.do(turn_key, answer_and_record)
     print("✅ [GENERATE] Response generation completed")
 
     return answer
 
+async def stream_chatbot_response(query: str, context_texts: List[str], user_id: str = "default",
+                                  history_note: Optional[str] = None):
+    """
+    Streaming variant of generate_chatbot_response - yields answer deltas.
+
+    The query and assembled answer are recorded together, once,
+    only after the stream completes, so an aborted stream leaves history untouched.
+    """
+    print(f"🤖 [STREAM] Starting streamed chatbot response...")
+    print(f"   - Query: {query[:50]}...")
+    print(f"   - User ID: {user_id}")
+
+    messages = await build_chat_messages(query, context_texts, user_id)
+
+    parts = []
+    async for delta in stream_llm("mistral", messages):
+        parts.append(delta)
+        yield delta
+
+    answer = "".join(parts).strip()
+    await record_chat_turn(user_id, query, answer, history_note)
+    print(f"✅ [STREAM] Streamed response completed (answer length: {len(answer)})")
+
 # ============================
 # 📬 API Schemas
 # ============================
@@ -307,26 +565,243 @@ class ChatRequest(BaseModel):
     ideaDescription: Optional[str] = None
     fieldHints: Optional[dict] = None
     currentAnswers: Optional[dict] = None
+    contentRefs: Optional[dict] = None    # field -> content hash, sent instead of a previously sent value
+    isFollowUp: Optional[bool] = None     # client's own view of whether this turn continues a conversation
     top_k: Optional[int] = 3
 
 class ChatResponse(BaseModel):
     query: str
     answer: str
     context_used: Optional[List[str]] = None
+    context_dropped: Optional[List[str]] = None
     provider: str
+    cached: bool = False
+    contentRefs: Optional[dict] = None
 
 class AutoFillRequest(BaseModel):
     templateKey: str
-    stepDescription: str
+    userId: Optional[str] = None
+    canvasId: Optional[str] = None
+    stepDescription: Optional[str] = None
     ideaDescription: Optional[str] = ""
     fields: List[str]
-    fieldHints: dict
+    fieldHints: Optional[dict] = None
     repeatedFields: Optional[List[dict]] = []
+    contentRefs: Optional[dict] = None
 
 class AutoFillResponse(BaseModel):
     success: bool
     answers: Optional[dict] = None
     error: Optional[str] = None
+    missingFields: Optional[List[str]] = None
+    contentRefs: Optional[dict] = None
+
+# Request fields the backend may send as a content hash after the first time
+CHAT_CONTENT_REF_FIELDS = ["stepDescription", "ideaDescription", "fieldHints", "currentAnswers"]
+AUTOFILL_CONTENT_REF_FIELDS = ["stepDescription", "ideaDescription", "fieldHints"]
+
+# ============================
+# 📚 Chat Context Collection
+# ============================
+def render_template_context(template_id: str, template: dict) -> str:
+    """Compact prompt text for the template being worked on: one line per filled field."""
+    header = (f"Template Context ({template_id} - {template.get('componentName', '')}, "
+              f"step {template.get('checklistStep', '')}):")
+    return "\n".join([header] + render_template_fields(template.get("content")))
+
+async def build_chat_context(request: ChatRequest, query: str):
+    """
+    Collect every context source for a chat turn and pack them into the token budget.
+
+    Sources are ranked by priority (lower = more important); overlapping content
+    is deduplicated and whatever does not fit is truncated or dropped.
+
+    Returns:
+        tuple: (context_texts, chunk_ids, report) - prompt context sections, the IDs
+               of the LCI book chunks that made it into the prompt, and the
+               assembler report (token usage and dropped sections)
+    """
+    assembler = ContextAssembler()
+    print("📚 [CHAT] Starting context collection...")
+
+    # 1️⃣ Add Template-Specific Context (Step Description, Idea, Field Hints, Current Answers)
+    # This is the SAME context that autofill uses - now available to chat!
+    print("📋 [CHAT] Adding template-specific context...")
+    if request.stepDescription:
+        assembler.add("step_description", f"📋 CURRENT STEP DESCRIPTION:\n{request.stepDescription}", priority=3)
+        print(f"✅ [CHAT] Added step description to chat context")
+    else:
+        print("⚠️ [CHAT] No step description provided")
+
+    if request.ideaDescription:
+        assembler.add("idea_description", f"💡 USER'S IDEA/BUSINESS CONCEPT:\n{request.ideaDescription}", priority=1)
+        print(f"✅ [CHAT] Added idea description to chat context")
+    else:
+        print("⚠️ [CHAT] No idea description provided")
+
+    if request.fieldHints:
+        hints_text = "\n".join([f"  - {field}: {hint}" for field, hint in request.fieldHints.items()])
+        assembler.add("field_hints", f"📝 TEMPLATE FIELDS:\n{hints_text}", priority=5)
+        print(f"✅ [CHAT] Added {len(request.fieldHints)} field hints to chat context")
+    else:
+        print("⚠️ [CHAT] No field hints provided")
+
+    answers_note = None
+    if request.currentAnswers:
+        # Only fields changed since the snapshot still visible in the resent history
+        history = select_recent_history(await run_in_threadpool(chat_sessions.get_messages, chat_session_id(request)))
+        answers_text, record = answer_deltas.render(request.templateKey, request.currentAnswers, history)
+        if answers_text:
+            assembler.add("current_answers", answers_text, priority=2)
+            answers_note = answers_text if record else None
+            print(f"✅ [CHAT] Added current answers to chat context ({answers_text.splitlines()[0]})")
+    else:
+        print("⚠️ [CHAT] No current answers provided")
+
+    # 2️⃣-4️⃣ Fetch template, canvas and semantic search context concurrently.
+    # Each source has its own deadline; a slow one only loses its own section.
+    sources = {}
+    if mongo_store.available:
+        mongo_store.start_change_stream()
+    if request.templateId and mongo_store.available:
+        print(f"📄 [CHAT] Fetching template from MongoDB: {request.templateId}")
+        sources["template"] = (
+            lambda: mongo_store.get_template(request.templateId, request.canvasId,
+                                             max_time_ms=int(CONTEXT_TEMPLATE_TIMEOUT * 1000)),
+            CONTEXT_TEMPLATE_TIMEOUT,
+        )
+    else:
+        print(f"⚠️ [CHAT] MongoDB template context skipped")
+
+    if request.canvasId and mongo_store.available:
+        print(f"🎨 [CHAT] Fetching canvas from MongoDB: {request.canvasId}")
+        sources["canvas"] = (
+            lambda: mongo_store.get_canvas_digest(request.canvasId,
+                                                  max_time_ms=int(CONTEXT_CANVAS_TIMEOUT * 1000)),
+            CONTEXT_CANVAS_TIMEOUT,
+        )
+    else:
+        print(f"⚠️ [CHAT] MongoDB canvas context skipped")
+
+    if SEARCH_AVAILABLE:
+        print(f"🔍 [CHAT] Performing semantic search with top_k={request.top_k} for query: {query[:50]}...")
+        log_memory("Before semantic search")
+        sources["search"] = (
+            lambda: run_blocking_source(search_chunks_sentence_transformer, query, top_k=request.top_k,
+                                        timeout=CONTEXT_SEARCH_TIMEOUT),
+            CONTEXT_SEARCH_TIMEOUT,
+        )
+    else:
+        print(f"⚠️ [CHAT] Semantic search skipped")
+
+    fetched = await fetch_context_sources(sources)
+
+    template = fetched.get("template")
+    if template:
+        assembler.add("template", render_template_context(request.templateId, template), priority=7)
+        print(f"✅ [CHAT] Template context added successfully")
+    elif "template" in sources:
+        print(f"⚠️ [CHAT] Template context unavailable: {request.templateId}")
+
+    canvas_digest = fetched.get("canvas")
+    if canvas_digest:
+        assembler.add("canvas", canvas_digest, priority=8)
+        print(f"✅ [CHAT] Canvas context added successfully")
+    elif "canvas" in sources:
+        print(f"⚠️ [CHAT] Canvas context unavailable: {request.canvasId}")
+
+    results = fetched.get("search")
+    if results:
+        # Best-matching chunks rank higher; they share one priority band
+        for rank, chunk in enumerate(results):
+            assembler.add(f"chunk:{chunk['chunk_id']}", chunk["text"], priority=4 + rank * 0.01)
+        print(f"✅ [CHAT] Semantic search completed, found {len(results)} results")
+    elif "search" in sources:
+        print(f"⚠️ [CHAT] Semantic search returned no results")
+
+    # 5️⃣ Add basic context information
+    print("📋 [CHAT] Adding basic context information...")
+    if request.canvasId:
+        assembler.add("canvas_id", f"User is working on canvas: {request.canvasId}", priority=9, truncatable=False)
+        print(f"✅ [CHAT] Added canvas context: {request.canvasId}")
+    if request.templateId:
+        assembler.add("template_id", f"User is working on template: {request.templateId}", priority=9, truncatable=False)
+        print(f"✅ [CHAT] Added template context: {request.templateId}")
+    if request.templateKey:
+        assembler.add("template_key", f"User is working on template: {request.templateKey}", priority=9, truncatable=False)
+        print(f"✅ [CHAT] Added template key context: {request.templateKey}")
+
+    # 6️⃣ Add AutoFill Shared Context if present (from previous autofill operations)
+    # Same template first, else the latest autofill on this user's canvas
+    print("🔁 [CHAT] Checking autofill context...")
+    autofill_ctx = await run_in_threadpool(autofill_contexts.get, request.userId, request.canvasId, request.templateKey)
+    if autofill_ctx:
+        template_key, text = autofill_ctx
+        assembler.add("autofill_context", text, priority=6)
+        print(f"✅ [CHAT] Loaded autofill context for templateKey={template_key}")
+    else:
+        print("⚠️ [CHAT] No autofill context found")
+
+    context_texts, report = assembler.assemble()
+    chunk_ids = [name.split(":", 1)[1] for name in report["kept"] if name.startswith("chunk:")]
+    print(f"📦 [CHAT] Context packed: {report['used_tokens']}/{report['budget_tokens']} tokens, "
+          f"{len(report['kept'])} sections kept")
+    for entry in report["dropped"]:
+        print(f"   - {entry['reason']}: {entry['name']} ({entry['tokens']} tokens)")
+    # Stored with the turn so later deltas can refer back to it
+    truncated = {entry["name"] for entry in report["dropped"]}
+    report["history_note"] = answers_note if "current_answers" in report["kept"] and "current_answers" not in truncated else None
+    return context_texts, chunk_ids, report
+
+def chat_session_id(request: ChatRequest) -> str:
+    """Conversation memory key: one conversation per user and canvas (the backend sends both)."""
+    if request.userId and request.canvasId:
+        return f"{request.userId}:{request.canvasId}"
+    return request.userId or request.canvasId or "default"
+
+# ============================
+# ⚡ Semantic Answer Cache
+# ============================
+def is_knowledge_only(request: ChatRequest) -> bool:
+    """True when the answer can only depend on the LCI book - no user-specific context."""
+    has_answers = bool(request.currentAnswers) and any(request.currentAnswers.values())
+    return not any([
+        request.stepDescription,
+        request.ideaDescription,
+        request.fieldHints,
+        has_answers,
+        request.canvasId,
+        request.templateId,
+        request.templateKey,
+    ])
+
+async def embed_for_semantic_cache(request: ChatRequest, query: str, user_id: str):
+    """
+    Embed the query for a semantic cache lookup, or return None when the cache must be skipped.
+
+    The cache is keyed on the message alone, so it is only used for the first
+    turn of a conversation - a follow-up such as "can you elaborate?" depends
+    on the history or summary it builds on. The client's `isFollowUp` flag
+    decides when sent; otherwise the user's own session is checked. Anonymous
+    requests without the flag share the "default" session, whose history says
+    nothing about this caller, so they skip the cache.
+    """
+    if not (SEMANTIC_CACHE_ENABLED and SEARCH_AVAILABLE and is_knowledge_only(request)):
+        return None
+    if request.isFollowUp is not None:
+        if request.isFollowUp:
+            return None
+    elif not request.userId:
+        return None
+    else:
+        summary, history = await run_in_threadpool(chat_sessions.get_session, user_id)
+        if summary or history:
+            return None
+    try:
+        return await run_in_threadpool(embed_query, query)
+    except Exception as e:
+        print(f"⚠️ [CHAT] Semantic cache embedding failed, skipping cache: {e}")
+        return None
 
 # ============================
 # 🌐 Endpoints
@@ -337,13 +812,36 @@ def health_check():
         "status": "ok",
         "provider": "mistral",
         "model": MISTRAL_MODEL,
-        "active_users": len(CHAT_HISTORY),
-        "total_messages": sum(len(history) for history in CHAT_HISTORY.values()),
-        "autofill_context_count": len(AUTO_CONTEXT),
+        "chat_sessions": chat_sessions.stats(),
+        "autofill_contexts": autofill_contexts.stats(),
+        "autofill_cache": autofill_cache.stats(),
+        "llm_single_flight": llm_single_flight.stats(),
+        "chat_turn_single_flight": chat_turn_single_flight.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "llm_governor": llm_governor.stats(),
+        "llm_hedging": llm_hedger.stats(),
+        "chat_summary": conversation_summarizer.stats(),
+        "context_sources": context_source_metrics.stats(),
+        "mongo": mongo_store.stats(),
+        "answer_deltas": answer_deltas.stats(),
+        "content_store": content_store.stats(),
+        "embedding_batcher": embedding_batcher.stats() if SEARCH_AVAILABLE else None,
+        "query_embedding_cache": query_embedding_cache.stats() if SEARCH_AVAILABLE else None,
+        "search_result_cache": search_result_cache.stats() if SEARCH_AVAILABLE else None,
+        "bootstrap": bootstrap_state.stats(),
     }
 
+@app.get("/ready")
+def readiness_check():
+    """503 until the startup bootstrap has finished, so orchestrators only route traffic to warm workers"""
+    required = ["warmup_search"] if READY_REQUIRE_SEARCH else []
+    if not bootstrap_state.is_ready(required):
+        status = "degraded" if bootstrap_state.finished else "starting"
+        raise HTTPException(status_code=503, detail={"status": status, **bootstrap_state.stats()})
+    return {"status": "ready", **bootstrap_state.stats()}
+
 @app.post("/chat", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest):
     print("🚀 [CHAT START] Received chat request")
     print(f"   - Query: {request.query[:100]}...")
     print(f"   - User ID: {request.userId}")
@@ -358,166 +856,48 @@ def chat_endpoint(request: ChatRequest):
         print("❌ [CHAT] Query validation failed: empty query")
         raise HTTPException(status_code=400, detail="Query cannot be empty.")
     print("✅ [CHAT] Query validation passed")
+    content_refs = resolve_content_refs(request, CHAT_CONTENT_REF_FIELDS)
 
     try:
-        context_texts = []
-        print("📚 [CHAT] Starting context collection...")
-
-        # 1️⃣ Add Template-Specific Context (Step Description, Idea, Field Hints, Current Answers)
-        # This is the SAME context that autofill uses - now available to chat!
-        print("📋 [CHAT] Adding template-specific context...")
-        if request.stepDescription:
-            context_texts.append(f"📋 CURRENT STEP DESCRIPTION:\n{request.stepDescription}")
-            print(f"✅ [CHAT] Added step description to chat context")
-        else:
-            print("⚠️ [CHAT] No step description provided")
-
-        if request.ideaDescription:
-            context_texts.append(f"💡 USER'S IDEA/BUSINESS CONCEPT:\n{request.ideaDescription}")
-            print(f"✅ [CHAT] Added idea description to chat context")
-        else:
-            print("⚠️ [CHAT] No idea description provided")
+        user_id = chat_session_id(request)
+
+        # Generic LCI questions: reuse the answer to a near-duplicate past query
+        query_vector = await embed_for_semantic_cache(request, query, user_id)
+        if query_vector is not None:
+            cached = semantic_cache.lookup(query_vector, request.top_k)
+            if cached:
+                print(f"⚡ [CHAT END] Semantic cache hit (similarity={cached['similarity']:.3f}, "
+                      f"cached query: {cached['query'][:50]}...)")
+                await record_chat_turn(user_id, query, cached["answer"])
+                return ChatResponse(
+                    query=query,
+                    answer=cached["answer"],
+                    context_used=[],
+                    provider="mistral",
+                    cached=True,
+                    contentRefs=content_refs
+                )
 
-        if request.fieldHints:
-            hints_text = "\n".join([f"  - {field}: {hint}" for field, hint in request.fieldHints.items()])
-            context_texts.append(f"📝 TEMPLATE FIELDS:\n{hints_text}")
-            print(f"✅ [CHAT] Added {len(request.fieldHints)} field hints to chat context")
-        else:
-            print("⚠️ [CHAT] No field hints provided")
-
-        if request.currentAnswers:
-            answers_text = "\n".join([f"  - {field}: {value}" for field, value in request.currentAnswers.items() if value])
-            if answers_text:
-                context_texts.append(f"✍️ USER'S CURRENT ANSWERS:\n{answers_text}")
-                print(f"✅ [CHAT] Added {len([v for v in request.currentAnswers.values() if v])} current answers to chat context")
-        else:
-            print("⚠️ [CHAT] No current answers provided")
-
-        # 2️⃣ Add Template Context (if MongoDB available)
-        print(f"📄 [CHAT] Checking MongoDB template context...")
-        print(f"   - MONGO_AVAILABLE: {MONGO_AVAILABLE}")
-        print(f"   - db is not None: {db is not None}")
-        print(f"   - templateId: {request.templateId}")
-
-        if request.templateId and MONGO_AVAILABLE and db is not None:
-            try:
-                print(f"📄 [CHAT] Fetching template from MongoDB: {request.templateId}")
-                template = db.templates.find_one({"templateId": request.templateId})
-                if template:
-                    context_texts.append(f"Template Context ({request.templateId}):\n{template.get('content', '')}")
-                    print(f"✅ [CHAT] Template context added successfully")
-                else:
-                    print(f"⚠️ [CHAT] Template not found in MongoDB: {request.templateId}")
-            except Exception as e:
-                print(f"❌ [CHAT] Error fetching template context: {e}")
-        else:
-            print(f"⚠️ [CHAT] MongoDB template context skipped")
-
-        # 3️⃣ Add Canvas Context (if MongoDB available)
-        print(f"🎨 [CHAT] Checking MongoDB canvas context...")
-        if request.canvasId and MONGO_AVAILABLE and db is not None:
-            try:
-                print(f"🎨 [CHAT] Fetching canvas from MongoDB: {request.canvasId}")
-                canvas = db.canvases.find_one({"canvasId": request.canvasId})
-                if canvas:
-                    context_texts.append(f"Canvas Overview ({request.canvasId}):\n{canvas}")
-                    print(f"✅ [CHAT] Canvas context added successfully")
-                else:
-                    print(f"⚠️ [CHAT] Canvas not found in MongoDB: {request.canvasId}")
-            except Exception as e:
-                print(f"❌ [CHAT] Error fetching canvas context: {e}")
-        else:
-            print(f"⚠️ [CHAT] MongoDB canvas context skipped")
-
-        # 4️⃣ Add Semantic Search Context (if available)
-        print(f"🔍 [CHAT] Checking semantic search...")
-        print(f"   - SEARCH_AVAILABLE: {SEARCH_AVAILABLE}")
-        print(f"   - top_k: {request.top_k}")
-
-        if SEARCH_AVAILABLE:
-            print(f"🔍 [CHAT] Performing semantic search with top_k={request.top_k}")
-            log_memory("Before semantic search")
-            try:
-                print(f"🔍 [CHAT] Performing semantic search for query: {query[:50]}...")
-                results = search_chunks_sentence_transformer(query, top_k=request.top_k)
-                if results:
-                    context_texts += [chunk["text"] for chunk in results]
-                    print(f"✅ [CHAT] Semantic search completed, found {len(results)} results")
-                else:
-                    print(f"⚠️ [CHAT] Semantic search completed, no results found")
-            except Exception as e:
-                print(f"❌ [CHAT] Error performing semantic search: {e}")
-        else:
-            print(f"⚠️ [CHAT] Semantic search skipped")
-        
-        # 5️⃣ Add basic context information
-        print("📋 [CHAT] Adding basic context information...")
-        if request.canvasId:
-            context_texts.append(f"User is working on canvas: {request.canvasId}")
-            print(f"✅ [CHAT] Added canvas context: {request.canvasId}")
-        if request.templateId:
-            context_texts.append(f"User is working on template: {request.templateId}")
-            print(f"✅ [CHAT] Added template context: {request.templateId}")
-        if request.templateKey:
-            context_texts.append(f"User is working on template: {request.templateKey}")
-            print(f"✅ [CHAT] Added template key context: {request.templateKey}")
-
-        # 6️⃣ Add AutoFill Shared Context if present (from previous autofill operations)
-        # Check by templateKey first (most specific), then templateId, then canvasId
-        print("🔁 [CHAT] Checking autofill context...")
-        print(f"   - AUTO_CONTEXT keys: {list(AUTO_CONTEXT.keys())}")
-        added_autofill = False
-
-        if request.templateKey and request.templateKey in AUTO_CONTEXT:
-            try:
-                print(f"🔁 [CHAT] Loading autofill context for templateKey: {request.templateKey}")
-                ctx = AUTO_CONTEXT[request.templateKey]
-                pretty = json.dumps(ctx, indent=2)
-                context_texts.append(f"PREVIOUS AUTOFILL CONTEXT (templateKey={request.templateKey}):\n{pretty}")
-                added_autofill = True
-                print(f"✅ [CHAT] Loaded autofill context for templateKey={request.templateKey}")
-            except Exception as e:
-                print(f"❌ [CHAT] Error loading autofill context for templateKey={request.templateKey}: {e}")
-
-        if not added_autofill and request.templateId and request.templateId in AUTO_CONTEXT:
-            try:
-                print(f"🔁 [CHAT] Loading autofill context for templateId: {request.templateId}")
-                ctx = AUTO_CONTEXT[request.templateId]
-                pretty = json.dumps(ctx, indent=2)
-                context_texts.append(f"PREVIOUS AUTOFILL CONTEXT (templateId={request.templateId}):\n{pretty}")
-                added_autofill = True
-                print(f"✅ [CHAT] Loaded autofill context for templateId={request.templateId}")
-            except Exception as e:
-                print(f"❌ [CHAT] Error loading autofill context for templateId={request.templateId}: {e}")
-
-        if not added_autofill and request.canvasId and request.canvasId in AUTO_CONTEXT:
-            try:
-                print(f"🔁 [CHAT] Loading autofill context for canvasId: {request.canvasId}")
-                ctx = AUTO_CONTEXT[request.canvasId]
-                pretty = json.dumps(ctx, indent=2)
-                context_texts.append(f"PREVIOUS AUTOFILL CONTEXT (canvasId={request.canvasId}):\n{pretty}")
-                added_autofill = True
-                print(f"✅ [CHAT] Loaded autofill context for canvasId={request.canvasId}")
-            except Exception as e:
-                print(f"❌ [CHAT] Error loading autofill context for canvasId={request.canvasId}: {e}")
-
-        if not added_autofill:
-            print("⚠️ [CHAT] No autofill context found")
+        context_texts, chunk_ids, context_report = await build_chat_context(request, query)
 
         # 7️⃣ Generate Answer
         print("🧠 [CHAT] Starting answer generation...")
         print(f"   - Context texts count: {len(context_texts)}")
-        user_id = request.userId or request.canvasId or "default"
         print(f"   - User ID: {user_id}")
-        answer = generate_chatbot_response(query, context_texts, user_id)
+        answer = await generate_chatbot_response(query, context_texts, user_id, context_report["history_note"])
         print("✅ [CHAT] Answer generation completed")
 
+        if query_vector is not None:
+            semantic_cache.store(query_vector, query, answer, request.top_k)
+
         print("📤 [CHAT] Preparing response...")
         response = ChatResponse(
             query=query,
             answer=answer,
             context_used=context_texts,
-            provider="mistral"
+            context_dropped=[entry["name"] for entry in context_report["dropped"]],
+            provider="mistral",
+            contentRefs=content_refs
         )
         print(f"✅ [CHAT END] Request completed successfully - answer length: {len(answer)}")
         return response
@@ -532,8 +912,202 @@ def chat_endpoint(request: ChatRequest):
         print(f"   - Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming variant of /chat (server-sent events).
+
+    Events:
+        context - sent first, with the retrieved LCI chunk IDs
+        token   - one per answer delta: {"delta": "..."}
+        done    - the assembled answer, once the stream completes
+        error   - {"detail": "..."} if generation fails mid-stream
+    """
+    print("🚀 [CHAT STREAM START] Received streaming chat request")
+    print(f"   - Query: {request.query[:100]}...")
+    print(f"   - User ID: {request.userId}")
+
+    query = request.query.strip()
+    if not query:
+        print("❌ [CHAT STREAM] Query validation failed: empty query")
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    content_refs = resolve_content_refs(request, CHAT_CONTENT_REF_FIELDS)
+
+    user_id = chat_session_id(request)
+    query_vector = await embed_for_semantic_cache(request, query, user_id)
+    cached = semantic_cache.lookup(query_vector, request.top_k) if query_vector is not None else None
+
+    if cached:
+        print(f"⚡ [CHAT STREAM END] Semantic cache hit (similarity={cached['similarity']:.3f})")
+        await record_chat_turn(user_id, query, cached["answer"])
+
+        async def cached_stream():
+            yield sse_event("context", {"chunk_ids": [], "context_count": 0, "cached": True, "contentRefs": content_refs})
+            yield sse_event("token", {"delta": cached["answer"]})
+            yield sse_event("done", {"query": query, "answer": cached["answer"], "provider": "mistral", "cached": True})
+
+        return StreamingResponse(
+            cached_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    context_texts, chunk_ids, context_report = await build_chat_context(request, query)
+
+    async def event_stream():
+        yield sse_event("context", {
+            "chunk_ids": chunk_ids,
+            "context_count": len(context_texts),
+            "context_tokens": context_report["used_tokens"],
+            "context_dropped": [entry["name"] for entry in context_report["dropped"]],
+            "contentRefs": content_refs,
+        })
+        parts = []
+        try:
+            async for delta in stream_chatbot_response(query, context_texts, user_id, context_report["history_note"]):
+                parts.append(delta)
+                yield sse_event("token", {"delta": delta})
+            answer = "".join(parts).strip()
+            if query_vector is not None:
+                semantic_cache.store(query_vector, query, answer, request.top_k)
+            yield sse_event("done", {"query": query, "answer": answer, "provider": "mistral"})
+            print(f"✅ [CHAT STREAM END] Stream completed - answer length: {len(answer)}")
+        except HTTPException as he:
+            print(f"❌ [CHAT STREAM END] HTTP exception: {he.detail}")
+            yield sse_event("error", {"detail": he.detail})
+        except Exception as e:
+            print(f"❌ [CHAT STREAM END] Unexpected error: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def build_autofill_messages(request: AutoFillRequest, field_hints: Optional[dict] = None) -> List[dict]:
+    """
+    Build the system + user messages for an autofill LLM call.
+
+    Pass `field_hints` to ask for a subset of fields only (used when re-asking
+    for fields the first response missed); repeated patterns are then omitted
+    since the subset already names each field explicitly.
+    """
+    print("📝 [AUTOFILL] Constructing prompt...")
+
+    # Construct the prompt for the LLM
+    prompt = construct_autofill_prompt(
+        template_key=request.templateKey,
+        step_description=request.stepDescription,
+        idea_description=request.ideaDescription or "",
+        field_hints=field_hints if field_hints is not None else request.fieldHints,
+        repeated_fields=[] if field_hints is not None else (request.repeatedFields or []),
+        fields=request.fields
+    )
+    print(f"✅ [AUTOFILL] Prompt construction completed (length: {len(prompt)})")
+    
+    # Prepare system message - emphasize idea context if available
+    system_content = """You are an AI assistant helping to autofill a Lean Canvas for Invention (LCI) template.
+
+CRITICAL REQUIREMENT: If the user provides their idea/business concept, you MUST base ALL your answers specifically on that idea. Do NOT generate generic or random answers.
+
+Your task:
+1. Carefully read and understand the user's idea/business concept
+2. Generate answers that are directly relevant and specific to their idea
+3. Be concise, relevant, and business-focused
+4. Only fill in fields that are empty or null
+5. Maintain consistency with the user's idea throughout all answers
+
+Remember: Every answer should clearly relate to the specific business idea provided by the user."""
+    
+    # Messages for the LLM call
+    messages = [
+        {
+            "role": "system",
+            "content": system_content
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+    
+    # Debug logging
+    print("=" * 80)
+    print("🔍 [AUTOFILL] Autofill Prompt")
+    print("=" * 80)
+    print(prompt[:500] + "..." if len(prompt) > 500 else prompt)
+    print("=" * 80)
+
+    return messages
+
+def autofill_cache_keys(request: AutoFillRequest, expected: dict) -> dict:
+    """Map each expected field to its content-addressed autofill cache key."""
+    return {
+        field: autofill_cache.make_key(
+            request.ideaDescription,
+            request.stepDescription,
+            request.templateKey,
+            field,
+            hint,
+            MISTRAL_MODEL,
+            AUTOFILL_PROMPT_VERSION,
+        )
+        for field, hint in expected.items()
+    }
+
+def lookup_cached_autofill(cache_keys: dict) -> dict:
+    """Return {field: value} for every field with a cached answer."""
+    cached = {}
+    for field, key in cache_keys.items():
+        value = autofill_cache.get(key)
+        if value is not None:
+            cached[field] = value
+    return cached
+
+async def store_cached_autofill(cache_keys: dict, answers: dict):
+    """Cache every validated generated field that has a key, off the event loop."""
+    items = {cache_keys[field]: value for field, value in answers.items() if field in cache_keys}
+    if items:
+        await run_in_threadpool(autofill_cache.put_many, items)
+
+async def repair_autofill_answers(request: AutoFillRequest, answers: dict, pending: dict) -> list:
+    """
+    Re-ask the LLM for the `pending` fields that are missing or invalid in `answers`.
+
+    Repaired values are merged into `answers` in place; up to
+    AUTOFILL_MAX_REPAIR_ATTEMPTS follow-up calls are made.
+
+    Returns:
+        list: Fields still missing or invalid afterwards
+    """
+    missing = find_missing_fields(answers, pending)
+    attempt = 0
+    while missing and attempt < AUTOFILL_MAX_REPAIR_ATTEMPTS:
+        attempt += 1
+        print(f"🔧 [AUTOFILL] Repair attempt {attempt}: re-asking for {len(missing)} fields: {missing}")
+        repair_messages = build_autofill_messages(
+            request, field_hints={field: pending[field] for field in missing}
+        )
+        repaired = parse_json_object(await call_llm("mistral", repair_messages, json_mode=True))
+        answers.update({field: repaired[field] for field in missing if field in repaired})
+        missing = find_missing_fields(answers, pending)
+    return missing
+
+def save_autofill_context(request: AutoFillRequest, answers: dict):
+    """Store generated answers so later chat turns on the same user/canvas can use them."""
+    try:
+        autofill_contexts.put(request.userId, request.canvasId, request.templateKey, answers)
+        print(f"✅ [AUTOFILL] Saved autofill context under key: {request.templateKey}")
+    except Exception as e:
+        print(f"❌ [AUTOFILL] Error saving autofill context: {e}")
+
 @app.post("/chatbot/auto-fill", response_model=AutoFillResponse)
-def auto_fill_endpoint(request: AutoFillRequest):
+async def auto_fill_endpoint(request: AutoFillRequest):
     """
     Auto-fill template fields using LLM based on context and hints.
 
@@ -543,12 +1117,13 @@ def auto_fill_endpoint(request: AutoFillRequest):
     step description, field hints, and current answers.
     """
     print("🔄 [AUTOFILL START] Received autofill request")
+    content_refs = resolve_content_refs(request, AUTOFILL_CONTENT_REF_FIELDS)
     print(f"   - Template Key: {request.templateKey}")
     print(f"   - Step Description: {request.stepDescription[:50] if request.stepDescription else 'None'}...")
     print(f"   - Idea Description: {'✅ PROVIDED' if request.ideaDescription and request.ideaDescription.strip() else '❌ NOT PROVIDED'}")
     if request.ideaDescription and request.ideaDescription.strip():
         print(f"   - Idea Preview: {request.ideaDescription[:100]}...")
-    print(f"   - Fields to fill: {len(request.fieldHints)}")
+    print(f"   - Fields to fill: {len(request.fieldHints or {})}")
     print(f"   - Fields: {list(request.fieldHints.keys()) if request.fieldHints else []}")
 
     try:
@@ -568,145 +1143,74 @@ def auto_fill_endpoint(request: AutoFillRequest):
                 error="Template key cannot be empty."
             )
 
+        if not request.stepDescription:
+            print("❌ [AUTOFILL] Validation failed: No step description")
+            return AutoFillResponse(
+                success=False,
+                error="Step description cannot be empty."
+            )
+
         print("✅ [AUTOFILL] Validation passed")
-        print("📝 [AUTOFILL] Constructing prompt...")
-
-        # Construct the prompt for the LLM
-        prompt = construct_autofill_prompt(
-            template_key=request.templateKey,
-            step_description=request.stepDescription,
-            idea_description=request.ideaDescription or "",
-            field_hints=request.fieldHints,
-            repeated_fields=request.repeatedFields or [],
-            fields=request.fields
-        )
-        print(f"✅ [AUTOFILL] Prompt construction completed (length: {len(prompt)})")
-        
-        # Prepare system message - emphasize idea context if available
-        system_content = """You are an AI assistant helping to autofill a Lean Canvas for Invention (LCI) template.
 
-CRITICAL REQUIREMENT: If the user provides their idea/business concept, you MUST base ALL your answers specifically on that idea. Do NOT generate generic or random answers.
+        # Serve fields answered before from the cache; only the rest go to the LLM
+        expected = expected_autofill_fields(request.fieldHints, request.repeatedFields or [])
+        cache_keys = autofill_cache_keys(request, expected)
+        cached_answers = lookup_cached_autofill(cache_keys)
+        pending = {field: hint for field, hint in expected.items() if field not in cached_answers}
+        print(f"⚡ [AUTOFILL] Cache: {len(cached_answers)} hits, {len(pending)} fields to generate")
 
-Your task:
-1. Carefully read and understand the user's idea/business concept
-2. Generate answers that are directly relevant and specific to their idea
-3. Be concise, relevant, and business-focused
-4. Only fill in fields that are empty or null
-5. Maintain consistency with the user's idea throughout all answers
+        if not pending:
+            save_autofill_context(request, cached_answers)
+            print("📤 [AUTOFILL END] All fields served from cache")
+            return AutoFillResponse(
+                success=True,
+                answers=cached_answers,
+                contentRefs=content_refs
+            )
 
-Remember: Every answer should clearly relate to the specific business idea provided by the user."""
-        
-        # Call LLM to generate answers
-        messages = [
-            {
-                "role": "system",
-                "content": system_content
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-        
-        # Debug logging
-        print("=" * 80)
-        print("🔍 [AUTOFILL] Autofill Prompt")
-        print("=" * 80)
-        print(prompt[:500] + "..." if len(prompt) > 500 else prompt)
-        print("=" * 80)
+        # Ask for the full template on a cold cache, otherwise only the missed fields
+        messages = build_autofill_messages(request, field_hints=pending if cached_answers else None)
 
         print("🤖 [AUTOFILL] Calling LLM...")
-        llm_response = call_llm("mistral", messages)
+        llm_response = await call_llm("mistral", messages, json_mode=True)
         print(f"✅ [AUTOFILL] LLM call completed (response length: {len(llm_response)})")
         print(f"📄 [AUTOFILL] LLM response preview: {llm_response[:200]}...")
 
+        # Tolerant parse: skips code fences and keeps every field completed before truncation
         print("🔄 [AUTOFILL] Parsing LLM response...")
-        
-        # Parse LLM response as JSON
-        try:
-            print("🧹 [AUTOFILL] Cleaning LLM response...")
-            print(f"📄 [AUTOFILL] Raw response length: {len(llm_response)}")
-            print(f"📄 [AUTOFILL] Raw response (first 500 chars): {llm_response[:500]}")
-            print(f"📄 [AUTOFILL] Raw response (last 200 chars): {llm_response[-200:]}")
-            
-            # Remove any potential markdown code blocks
-            cleaned_response = llm_response.strip()
-            if cleaned_response.startswith("```json"):
-                cleaned_response = cleaned_response[7:]
-            if cleaned_response.startswith("```"):
-                cleaned_response = cleaned_response[3:]
-            if cleaned_response.endswith("```"):
-                cleaned_response = cleaned_response[:-3]
-            cleaned_response = cleaned_response.strip()
-
-            print("📄 [AUTOFILL] Parsing JSON...")
-            print(f"   - Cleaned response length: {len(cleaned_response)}")
-            print(f"   - Cleaned response preview: {cleaned_response[:200]}...")
-            print(f"   - Cleaned response ending: {cleaned_response[-100:]}")
-
-            # Try to fix incomplete JSON by finding the last complete field
-            if not cleaned_response.endswith('}'):
-                print("⚠️ [AUTOFILL] JSON appears incomplete, attempting to fix...")
-                # Find the last complete field by looking for the last comma or opening brace
-                last_comma = cleaned_response.rfind(',')
-                last_brace = cleaned_response.rfind('{')
-                
-                if last_comma > last_brace:
-                    # Truncate at the last comma and add closing brace
-                    cleaned_response = cleaned_response[:last_comma] + '}'
-                    print(f"🔧 [AUTOFILL] Fixed incomplete JSON, new length: {len(cleaned_response)}")
-                elif last_brace >= 0:
-                    # If we have an opening brace but no comma, just add closing brace
-                    cleaned_response = cleaned_response + '}'
-                    print(f"🔧 [AUTOFILL] Added missing closing brace")
-
-            # Parse JSON safely
-            answers = json.loads(cleaned_response)
-            print("✅ [AUTOFILL] JSON parsed successfully")
-            print(f"   - Answer keys: {list(answers.keys()) if isinstance(answers, dict) else 'Not a dict'}")
-
-            # Validate that the response contains the expected fields
-            if not isinstance(answers, dict):
-                print("❌ [AUTOFILL] Validation failed: Not a dictionary")
-                return AutoFillResponse(
-                    success=False,
-                    error="LLM response is not a valid JSON object."
-                )
-            
-            print("✅ [AUTOFILL] Response validation passed")
-            print("💾 [AUTOFILL] Saving autofill context...")
-
-            # ---------------------------
-            # SAVE AUTO-FILL CONTEXT HERE
-            # ---------------------------
-            try:
-                AUTO_CONTEXT[request.templateKey] = {
-                    "ideaDescription": request.ideaDescription,
-                    "stepDescription": request.stepDescription,
-                    "fieldHints": request.fieldHints,
-                    "fields": request.fields,
-                    "repeatedFields": request.repeatedFields or [],
-                    "generatedAnswers": answers,
-                    "timestamp": time.time()
-                }
-                print(f"✅ [AUTOFILL] Saved autofill context under key: {request.templateKey}")
-            except Exception as e:
-                print(f"❌ [AUTOFILL] Error saving autofill context: {e}")
-
-            print("📤 [AUTOFILL] Preparing success response...")
-            return AutoFillResponse(
-                success=True,
-                answers=answers
-            )
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ [AUTOFILL END] JSON parsing failed: {e}")
+        answers = parse_json_object(llm_response)
+        print(f"   - Parsed fields: {list(answers.keys())}")
+
+        # Compare against the expected fields and re-ask only for the missing/invalid ones
+        missing = await repair_autofill_answers(request, answers, pending)
+
+        # Drop invalid leftovers so the frontend never receives unusable values
+        answers = {field: value for field, value in answers.items() if field not in missing}
+        await store_cached_autofill(cache_keys, answers)
+        answers = {**cached_answers, **answers}
+
+        if not answers:
+            print("❌ [AUTOFILL END] No usable fields in LLM response")
             print(f"   - Raw LLM response: {llm_response[:500]}...")
             return AutoFillResponse(
                 success=False,
-                error=f"Failed to parse LLM response as JSON: {str(e)}"
+                error="Failed to parse LLM response as JSON.",
+                missingFields=missing
             )
 
+        if missing:
+            print(f"⚠️ [AUTOFILL] Returning partial answers, still missing: {missing}")
+        print("✅ [AUTOFILL] Response validation passed")
+        print("💾 [AUTOFILL] Saving autofill context...")
+        save_autofill_context(request, answers)
+
+        print("📤 [AUTOFILL] Preparing success response...")
+        return AutoFillResponse(
+            success=True,
+            answers=answers,
+            missingFields=missing or None,
+            contentRefs=content_refs
+        )
 
     except HTTPException as e:
         print(f"❌ [AUTOFILL END] HTTP exception: {e.detail}")
@@ -727,6 +1231,96 @@ Remember: Every answer should clearly relate to the specific business idea provi
             error=f"An unexpected error occurred: {str(e)}"
         )
 
+@app.post("/chatbot/auto-fill/stream")
+async def auto_fill_stream_endpoint(request: AutoFillRequest):
+    """
+    Streaming variant of /chatbot/auto-fill (server-sent events).
+
+    The LLM's JSON is parsed as it arrives and each completed, valid field is
+    pushed immediately, so the frontend can fill fields one by one. Fields
+    still missing or invalid at the end are re-asked (as in the buffered
+    endpoint) and pushed once repaired.
+
+    Events:
+        field - {"field": "...", "value": ...} for each completed, valid field
+        done  - {"success": true, "answers": {...}, "missingFields": [...]} with every usable field
+        error - {"success": false, "error": "..."}
+    """
+    print("🔄 [AUTOFILL STREAM START] Received streaming autofill request")
+    content_refs = resolve_content_refs(request, AUTOFILL_CONTENT_REF_FIELDS)
+    print(f"   - Template Key: {request.templateKey}")
+    print(f"   - Fields to fill: {len(request.fieldHints or {})}")
+
+    if not request.fieldHints:
+        raise HTTPException(status_code=400, detail="Field hints cannot be empty.")
+    if not request.templateKey:
+        raise HTTPException(status_code=400, detail="Template key cannot be empty.")
+    if not request.stepDescription:
+        raise HTTPException(status_code=400, detail="Step description cannot be empty.")
+
+    expected = expected_autofill_fields(request.fieldHints, request.repeatedFields or [])
+    cache_keys = autofill_cache_keys(request, expected)
+    cached_answers = lookup_cached_autofill(cache_keys)
+    pending = {field: hint for field, hint in expected.items() if field not in cached_answers}
+    print(f"⚡ [AUTOFILL STREAM] Cache: {len(cached_answers)} hits, {len(pending)} fields to generate")
+
+    async def event_stream():
+        parser = IncrementalJSONObjectParser()
+        try:
+            # Cached fields go out immediately, before any LLM work
+            for field, value in cached_answers.items():
+                yield sse_event("field", {"field": field, "value": value})
+
+            # Invalid values (e.g. an unknown intensity level) are held back for the repair pass
+            emitted = set()
+            missing = []
+            if pending:
+                messages = build_autofill_messages(request, field_hints=pending if cached_answers else None)
+                async for delta in stream_llm("mistral", messages, json_mode=True):
+                    for field, value in parser.feed(delta):
+                        if is_valid_field_value(field, value):
+                            emitted.add(field)
+                            yield sse_event("field", {"field": field, "value": value})
+                    if parser.done:
+                        break
+
+                generated = parser.result
+                missing = await repair_autofill_answers(request, generated, pending)
+                generated = {field: value for field, value in generated.items() if field not in missing}
+                for field, value in generated.items():
+                    if field not in emitted and is_valid_field_value(field, value):
+                        yield sse_event("field", {"field": field, "value": value})
+            else:
+                generated = {}
+
+            await store_cached_autofill(cache_keys, generated)
+            answers = {**cached_answers, **generated}
+            if not answers:
+                print("❌ [AUTOFILL STREAM END] No usable fields in LLM response")
+                yield sse_event("error", {"success": False, "error": "Failed to parse LLM response as JSON.",
+                                          "missingFields": missing})
+                return
+
+            if missing:
+                print(f"⚠️ [AUTOFILL STREAM] Returning partial answers, still missing: {missing}")
+            save_autofill_context(request, answers)
+            print(f"✅ [AUTOFILL STREAM END] Streamed {len(answers)} fields")
+            yield sse_event("done", {"success": True, "answers": answers, "missingFields": missing or None,
+                                     "contentRefs": content_refs})
+
+        except HTTPException as he:
+            print(f"❌ [AUTOFILL STREAM END] HTTP exception: {he.detail}")
+            yield sse_event("error", {"success": False, "error": f"API Error: {he.detail}"})
+        except Exception as e:
+            print(f"❌ [AUTOFILL STREAM END] Unexpected error: {str(e)}")
+            yield sse_event("error", {"success": False, "error": f"An unexpected error occurred: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 def construct_autofill_prompt(
     template_key: str,
     step_description: str,
@@ -0,0 +1,197 @@
+"""
+Local, checksummed copy of the all-MiniLM-L6-v2 model (weights + tokenizer)
+
+The model is vendored once into MODEL_ARTIFACT_DIR as safetensors with a
+manifest.json of file sizes and SHA-256 checksums. After that it is only
+ever loaded from that directory with local_files_only=True, so a cold
+container or an air-gapped machine never contacts the Hugging Face hub.
+
+Usage:
+    python model_artifacts.py vendor     # download once (e.g. at docker build), with the tiktoken tokenizer
+    python model_artifacts.py verify     # check sizes and checksums
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Model Artifact Configuration
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "models/all-MiniLM-L6-v2")
+# Vendor the model from the hub at runtime when the artifact is missing or damaged. Off by default so a
+# missing artifact fails loudly instead of downloading - run 'python model_artifacts.py vendor' once instead
+MODEL_ARTIFACT_AUTO_VENDOR = os.getenv("MODEL_ARTIFACT_AUTO_VENDOR", "false").lower() in ("1", "true", "yes")
+
+MANIFEST_FILE = "manifest.json"
+
+# Serializes verify/vendor when startup steps run concurrently
+_artifact_lock = threading.Lock()
+
+# Directories verified in this process -> True once checksums were checked, False for sizes only
+_verified = {}
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_manifest(artifact_dir, source):
+    """
+    Record the size and SHA-256 of every file in an artifact directory.
+
+    Args:
+        artifact_dir: Directory holding the model files
+        source: Where the files came from (model name or export script)
+
+    Returns:
+        dict: The manifest written to manifest.json
+    """
+    files = {}
+    for root, _, names in os.walk(artifact_dir):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            relpath = os.path.relpath(path, artifact_dir).replace(os.sep, "/")
+            if relpath == MANIFEST_FILE:
+                continue
+            files[relpath] = {"size": os.path.getsize(path), "sha256": _sha256(path)}
+    manifest = {
+        "source": source,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": files,
+    }
+    with open(os.path.join(artifact_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def verify_artifact(artifact_dir=MODEL_ARTIFACT_DIR, full=True):
+    """
+    Check an artifact directory against its manifest.
+
+    Args:
+        artifact_dir: Directory holding the model files
+        full: Also compare SHA-256 checksums (otherwise only presence and size)
+
+    Returns:
+        tuple: (ok, problems) - problems is a list of human-readable issues
+    """
+    checked_full = _verified.get(artifact_dir)
+    if checked_full is not None and (checked_full or not full):
+        return True, []
+    manifest_path = os.path.join(artifact_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return False, [f"no {MANIFEST_FILE} in {artifact_dir}"]
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    problems = []
+    for relpath, expected in manifest.get("files", {}).items():
+        path = os.path.join(artifact_dir, relpath)
+        if not os.path.exists(path):
+            problems.append(f"missing {relpath}")
+        elif os.path.getsize(path) != expected["size"]:
+            problems.append(f"size mismatch for {relpath}")
+        elif full and _sha256(path) != expected["sha256"]:
+            problems.append(f"checksum mismatch for {relpath}")
+    if not manifest.get("files"):
+        problems.append("manifest lists no files")
+    if not problems:
+        _verified[artifact_dir] = full
+    return not problems, problems
+
+def vendor_model(model_name=MODEL_NAME, artifact_dir=MODEL_ARTIFACT_DIR):
+    """
+    Download the model once and save it as safetensors with a checksum manifest.
+
+    The files are written to a temporary directory and moved into place, so a
+    reader never sees a half-written artifact.
+
+    Returns:
+        dict: The manifest of the vendored artifact
+    """
+    from sentence_transformers import SentenceTransformer
+
+    print(f"📦 Vendoring {model_name} into {artifact_dir}...")
+    staging = f"{artifact_dir.rstrip('/')}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    model.save(staging, safe_serialization=True, create_model_card=False)
+    manifest = write_manifest(staging, model_name)
+
+    if os.path.exists(artifact_dir):
+        shutil.rmtree(artifact_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(artifact_dir)), exist_ok=True)
+    os.replace(staging, artifact_dir)
+    _verified[artifact_dir] = True
+    size_mb = sum(f["size"] for f in manifest["files"].values()) / 1024**2
+    print(f"✅ Vendored {len(manifest['files'])} files ({size_mb:.1f} MB) to {artifact_dir}")
+    return manifest
+
+def ensure_model_artifact(artifact_dir=MODEL_ARTIFACT_DIR, full=False):
+    """
+    Make sure a usable artifact is on disk, vendoring it if allowed.
+
+    Args:
+        artifact_dir: Directory holding the model files
+        full: Verify checksums, not just file sizes
+
+    Raises:
+        RuntimeError: If the artifact is missing or damaged and auto-vendoring is disabled
+    """
+    with _artifact_lock:
+        ok, problems = verify_artifact(artifact_dir, full=full)
+        if ok:
+            return
+        if not MODEL_ARTIFACT_AUTO_VENDOR:
+            raise RuntimeError(f"Model artifact {os.path.abspath(artifact_dir)} unusable ({'; '.join(problems)}) - "
+                               f"run 'python model_artifacts.py vendor' from LCI_ChatBot/ once with network access "
+                               f"(the start scripts do this), or set MODEL_ARTIFACT_AUTO_VENDOR=true")
+        print(f"⚠️ Warning: Model artifact {artifact_dir} unusable ({'; '.join(problems)}) - vendoring it now")
+        vendor_model(MODEL_NAME, artifact_dir)
+
+def load_sentence_transformer(artifact_dir=MODEL_ARTIFACT_DIR, **kwargs):
+    """
+    Load all-MiniLM-L6-v2 from the local artifact only (safetensors weights are memory-mapped).
+
+    Args:
+        artifact_dir: Directory holding the model files
+        **kwargs: Passed to SentenceTransformer (e.g. device="cpu")
+
+    Returns:
+        SentenceTransformer: The loaded model
+    """
+    ensure_model_artifact(artifact_dir)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(artifact_dir, local_files_only=True, **kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendor or verify the local embedding model artifact")
+    parser.add_argument("command", choices=["vendor", "verify"])
+    parser.add_argument("--dir", default=MODEL_ARTIFACT_DIR, help=f"Artifact directory (default: {MODEL_ARTIFACT_DIR})")
+    parser.add_argument("--force", action="store_true", help="Vendor again even if the artifact verifies")
+    args = parser.parse_args()
+
+    if args.command == "vendor":
+        # The chat context tokenizer is vendored alongside, so the server never downloads it either
+        from context_assembler import vendor_encoding
+        vendor_encoding()
+        if not args.force and verify_artifact(args.dir, full=True)[0]:
+            print(f"✅ Model artifact {args.dir} already present and verified")
+            return True
+        vendor_model(MODEL_NAME, args.dir)
+        return True
+
+    ok, problems = verify_artifact(args.dir, full=True)
+    print(f"✅ Model artifact {args.dir} verified" if ok else f"❌ Model artifact {args.dir}: {'; '.join(problems)}")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,307 @@
+"""
+Async MongoDB access for chat context with a read-through document cache
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+from canvas_digest import build_canvas_digest
+
+load_dotenv()
+
+# Optional dependencies - handle gracefully if not available
+try:
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    from pymongo import MongoClient
+    MONGO_AVAILABLE = True
+except ImportError:
+    print("⚠️ Warning: pymongo not available. MongoDB features disabled.")
+    MONGO_AVAILABLE = False
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    MOTOR_AVAILABLE = True
+except ImportError:
+    MOTOR_AVAILABLE = False
+
+# MongoDB Configuration
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "startovate")
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000"))
+MONGO_CACHE_MAX_ENTRIES = int(os.getenv("MONGO_CACHE_MAX_ENTRIES", "2000"))
+MONGO_CACHE_TTL_SECONDS = float(os.getenv("MONGO_CACHE_TTL_SECONDS", "60"))
+MONGO_CHANGE_STREAM = os.getenv("MONGO_CHANGE_STREAM", "true").lower() in ("1", "true", "yes")
+
+# Only the fields the prompt uses are fetched
+CANVAS_PROJECTION = {
+    "researchTitle": 1, "authorName": 1, "completionStatus": 1,
+    "components.name": 1, "components.status": 1, "updatedAt": 1,
+}
+TEMPLATE_PROJECTION = {
+    "templateId": 1, "componentName": 1, "checklistStep": 1, "content": 1, "updatedAt": 1,
+}
+# Enough to tell whether a cached document changed
+VERSION_PROJECTION = {"_id": 1, "updatedAt": 1}
+
+def to_object_id(value):
+    """Convert a 24-hex id string to ObjectId; other values are returned unchanged."""
+    try:
+        return ObjectId(value) if isinstance(value, str) else value
+    except (InvalidId, TypeError):
+        return value
+
+class DocumentCache:
+    """
+    LRU + TTL cache of fetched documents, indexed by lookup key and by `_id`.
+
+    Each entry remembers the `_id`s it was built from and a version stamp
+    (`updatedAt` by default). An entry past its TTL is revalidated with tiny
+    `{_id, updatedAt}` queries and reused if the stamp has not changed;
+    change-stream events evict by `_id` at once.
+    """
+
+    def __init__(self, max_entries=MONGO_CACHE_MAX_ENTRIES, ttl_seconds=MONGO_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # lookup key -> {"doc", "doc_ids", "stamp", "checked_at"}
+        self._by_id = {}                # document _id -> set of lookup keys
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return (entry, fresh) - entry is None on a miss, fresh is False once the TTL has passed."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        self._entries.move_to_end(key)
+        return entry, time.monotonic() - entry["checked_at"] <= self.ttl_seconds
+
+    def put(self, key, doc, doc_ids=None, stamp=None):
+        """Cache `doc`; `doc_ids`/`stamp` default to the document's own `_id` and `updatedAt`."""
+        self._remove(key)
+        if doc_ids is None:
+            doc_ids = [doc["_id"]] if doc and "_id" in doc else []
+            stamp = doc.get("updatedAt") if doc else None
+        self._entries[key] = {
+            "doc": doc,
+            "doc_ids": list(doc_ids),
+            "stamp": stamp,
+            "checked_at": time.monotonic(),
+        }
+        for doc_id in doc_ids:
+            self._by_id.setdefault(doc_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def touch(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry["checked_at"] = time.monotonic()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        for doc_id in entry["doc_ids"] if entry else ():
+            keys = self._by_id.get(doc_id, set())
+            keys.discard(key)
+            if not keys:
+                self._by_id.pop(doc_id, None)
+
+    def invalidate_id(self, doc_id):
+        for key in list(self._by_id.get(doc_id, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "revalidated": self.revalidated,
+            "invalidations": self.invalidations,
+        }
+
+class MongoContextStore:
+    """
+    Read-through access to canvases and templates for chat context.
+
+    Uses the async motor driver when installed (pymongo in a worker thread
+    otherwise) and fetches only projected fields. Any database object with
+    `find_one` can be injected instead - e.g. a mongomock database in tests.
+    """
+
+    def __init__(self, database=None):
+        self._database = database
+        self._is_async = database is not None and type(database).__module__.startswith("motor")
+        self._client = None
+        self.cache = DocumentCache()
+        self.digests = DocumentCache()  # canvas digests, built from a canvas and all of its templates
+        self._watch_task = None
+
+    @property
+    def available(self):
+        return self._database is not None or MONGO_AVAILABLE
+
+    def get_database(self):
+        """Get or create the database handle (lazy-loaded and cached)."""
+        if self._database is None:
+            if MOTOR_AVAILABLE:
+                self._client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS)
+                self._is_async = True
+                print("✅ MongoDB client created (motor async driver)")
+            else:
+                self._client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS)
+                print("⚠️ Warning: motor not installed - MongoDB queries run in worker threads")
+            self._database = self._client[DB_NAME]
+        return self._database
+
+    async def _find_one(self, collection, query, projection, max_time_ms=None):
+        # max_time_ms makes the server abandon a query the caller's deadline no longer waits for
+        options = {"max_time_ms": max_time_ms} if max_time_ms else {}
+        coll = self.get_database()[collection]
+        if self._is_async:
+            return await coll.find_one(query, projection, **options)
+        # Synchronous driver (pymongo / mongomock) - keep the event loop free
+        return await asyncio.to_thread(lambda: coll.find_one(query, projection, **options))
+
+    async def _find(self, collection, query, projection, max_time_ms=None):
+        options = {"max_time_ms": max_time_ms} if max_time_ms else {}
+        coll = self.get_database()[collection]
+        if self._is_async:
+            return await coll.find(query, projection, **options).to_list(length=None)
+        return await asyncio.to_thread(lambda: list(coll.find(query, projection, **options)))
+
+    async def _cached_find_one(self, collection, query, projection, max_time_ms=None):
+        key = (collection, tuple(sorted((k, str(v)) for k, v in query.items())))
+        entry, fresh = self.cache.get(key)
+        if entry is not None:
+            if fresh:
+                self.cache.hits += 1
+                return entry["doc"]
+            if entry["stamp"] is not None:
+                current = await self._find_one(collection, {"_id": entry["doc_ids"][0]}, VERSION_PROJECTION,
+                                               max_time_ms)
+                if current and current.get("updatedAt") == entry["stamp"]:
+                    self.cache.touch(key)
+                    self.cache.revalidated += 1
+                    self.cache.hits += 1
+                    return entry["doc"]
+        self.cache.misses += 1
+        doc = await self._find_one(collection, query, projection, max_time_ms)
+        self.cache.put(key, doc)
+        return doc
+
+    @staticmethod
+    def _digest_stamp(canvas, templates):
+        """(canvas updatedAt, template count, newest template updatedAt), or None if any document lacks updatedAt."""
+        stamps = [doc.get("updatedAt") for doc in [canvas or {}] + templates]
+        if None in stamps:
+            return None
+        return (stamps[0], len(templates), max(stamps[1:], default=None))
+
+    async def _digest_version(self, canvas_oid, max_time_ms=None):
+        canvas, templates = await asyncio.gather(
+            self._find_one("canvases", {"_id": canvas_oid}, VERSION_PROJECTION, max_time_ms),
+            self._find("templates", {"canvasId": canvas_oid}, VERSION_PROJECTION, max_time_ms),
+        )
+        return self._digest_stamp(canvas, templates)
+
+    async def get_canvas_digest(self, canvas_id, max_time_ms=None):
+        """
+        Compact digest of a canvas and its filled templates, rebuilt only when the canvas changes.
+
+        Args:
+            canvas_id: Canvas id (24-hex string or ObjectId)
+            max_time_ms: Server-side time limit for each query (the caller's deadline)
+
+        Returns:
+            str or None: Digest text, or None if the canvas does not exist
+        """
+        key = ("digest", str(canvas_id))
+        canvas_oid = to_object_id(canvas_id)
+        entry, fresh = self.digests.get(key)
+        if entry is not None and fresh:
+            self.digests.hits += 1
+            return entry["doc"]
+        version = await self._digest_version(canvas_oid, max_time_ms) if entry is not None else None
+        if entry is not None and version is not None and version == entry["stamp"]:
+            self.digests.touch(key)
+            self.digests.revalidated += 1
+            self.digests.hits += 1
+            return entry["doc"]
+
+        self.digests.misses += 1
+        canvas, templates = await asyncio.gather(
+            self._find_one("canvases", {"_id": canvas_oid}, CANVAS_PROJECTION, max_time_ms),
+            self._find("templates", {"canvasId": canvas_oid}, TEMPLATE_PROJECTION, max_time_ms),
+        )
+        digest = build_canvas_digest(canvas, templates) if canvas else None
+        self.digests.put(key, digest, doc_ids=[canvas_oid] + [t["_id"] for t in templates],
+                         stamp=self._digest_stamp(canvas, templates))
+        return digest
+
+    async def get_template(self, template_id, canvas_id=None, max_time_ms=None):
+        query = {"templateId": template_id}
+        if canvas_id:
+            # templateId is only unique within a canvas
+            query["canvasId"] = to_object_id(canvas_id)
+        return await self._cached_find_one("templates", query, TEMPLATE_PROJECTION, max_time_ms)
+
+    async def _watch_changes(self):
+        """Evict cached documents as soon as they change (needs a replica set)."""
+        pipeline = [{"$match": {"ns.coll": {"$in": ["canvases", "templates"]}}}]
+        try:
+            async with self.get_database().watch(pipeline) as stream:
+                print("✅ MongoDB change stream watching canvases/templates")
+                async for change in stream:
+                    doc_id = change.get("documentKey", {}).get("_id")
+                    if doc_id is not None:
+                        self.cache.invalidate_id(doc_id)
+                        self.digests.invalidate_id(doc_id)
+                    # A newly inserted template changes its canvas digest
+                    canvas_id = (change.get("fullDocument") or {}).get("canvasId")
+                    if canvas_id is not None:
+                        self.digests.invalidate_id(canvas_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ MongoDB change stream unavailable, cache relies on TTL revalidation: {e}")
+
+    def start_change_stream(self):
+        """Start the change-stream invalidator once, from inside the running event loop."""
+        if not MONGO_CHANGE_STREAM or self._watch_task is not None:
+            return
+        self.get_database()
+        if not self._is_async:
+            return
+        self._watch_task = asyncio.ensure_future(self._watch_changes())
+
+    async def close(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._database = None
+
+    def stats(self):
+        return {
+            "driver": "motor" if self._is_async else "sync",
+            "change_stream": self._watch_task is not None and not self._watch_task.done(),
+            "cache": self.cache.stats(),
+            "canvas_digests": self.digests.stats(),
+        }
+
+# Global instance
+mongo_store = MongoContextStore()
@@ -0,0 +1,104 @@
+"""
+ONNX Runtime (int8) backend for the all-MiniLM-L6-v2 query encoder
+
+Runs the model exported by export_onnx_encoder.py without importing torch.
+Embeddings match SentenceTransformer('all-MiniLM-L6-v2').encode: mean pooling
+over the attention mask followed by L2 normalization, 384 dimensions.
+"""
+import os
+import json
+import numpy as np
+from dotenv import load_dotenv
+
+from model_artifacts import verify_artifact
+
+load_dotenv()
+
+# Optional dependencies - handle gracefully if not available
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# ONNX Encoder Configuration
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/all-MiniLM-L6-v2-onnx-int8")
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))   # 0 = onnxruntime default (all cores)
+
+# Files written by export_onnx_encoder.py
+ONNX_MODEL_FILE = "model_int8.onnx"
+ONNX_TOKENIZER_FILE = "tokenizer.json"
+ONNX_CONFIG_FILE = "encoder_config.json"
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in replacement for the SentenceTransformer methods the chatbot uses
+    (`encode` and `get_sentence_embedding_dimension`).
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, intra_op_threads=ONNX_INTRA_OP_THREADS):
+        if not ONNX_AVAILABLE:
+            raise RuntimeError("onnxruntime and tokenizers are required for the ONNX encoder")
+        missing = [name for name in (ONNX_MODEL_FILE, ONNX_TOKENIZER_FILE, ONNX_CONFIG_FILE)
+                   if not os.path.exists(os.path.join(model_dir, name))]
+        if missing:
+            raise RuntimeError(f"ONNX encoder files missing in {model_dir}: {missing} - run export_onnx_encoder.py")
+        ok, problems = verify_artifact(model_dir, full=False)
+        if not ok:
+            raise RuntimeError(f"ONNX encoder in {model_dir} failed verification: {'; '.join(problems)}")
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, ONNX_TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dimension"]
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+
+        # Mean pooling over real tokens, as in the sentence-transformers Pooling module
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config.get("normalize", True):
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Embed one text or a list of texts.
+
+        Args:
+            sentences: A string or list of strings
+            batch_size: Texts per forward pass
+
+        Returns:
+            np.ndarray: (len(sentences), dimension) float32 array, or one vector for a single string
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        vectors = np.vstack([self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+        return vectors[0] if single else vectors
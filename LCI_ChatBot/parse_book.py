@@ -77,6 +77,7 @@ except ImportError:
 
 try:
     from sentence_transformers import SentenceTransformer
+    from model_artifacts import load_sentence_transformer
     SENTENCE_TRANSFORMERS_AVAILABLE = True
 except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
@@ -130,7 +131,7 @@ class PDFBookParser:
         self.embedding_model = None
         if SENTENCE_TRANSFORMERS_AVAILABLE:
             try:
-                self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+                self.embedding_model = load_sentence_transformer()
                 logger.info("Sentence transformer model loaded successfully")
             except Exception as e:
                 logger.warning(f"Could not load embedding model: {e}")
@@ -2,6 +2,7 @@
 Qdrant Configuration and Client Setup
 """
 import os
+import time
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams
@@ -135,6 +136,31 @@ def delete_collection(client, collection_name=COLLECTION_NAME):
         print(f"❌ Error deleting collection: {e}")
         return False
 
+def new_ingest_version():
+    """Version tag stamped into every point's payload (`ingest_version`) when the collection is (re-)ingested."""
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"-{os.getpid()}"
+
+def get_collection_version(client, collection_name=COLLECTION_NAME):
+    """
+    Cheap fingerprint of the collection contents, used to invalidate cached search results.
+
+    Args:
+        client: QdrantClient instance
+        collection_name: Name of the collection
+
+    Returns:
+        tuple: (points count, ingest_version of the first point)
+    """
+    info = client.get_collection(collection_name)
+    points, _ = client.scroll(
+        collection_name=collection_name,
+        limit=1,
+        with_payload=["ingest_version"],
+        with_vectors=False
+    )
+    ingest_version = points[0].payload.get("ingest_version") if points else None
+    return (info.points_count, ingest_version)
+
 def get_collection_stats(client, collection_name=COLLECTION_NAME):
     """
     Get statistics about a collection.
@@ -4,16 +4,17 @@ Create and store embeddings in Qdrant vector database
 import json
 import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from qdrant_client.models import PointStruct
 from tqdm import tqdm
 
 from qdrant_config import (
     get_qdrant_client,
     ensure_collection_exists,
+    new_ingest_version,
     COLLECTION_NAME,
     EMBEDDING_DIMENSION
 )
+from model_artifacts import load_sentence_transformer
 
 def create_qdrant_embeddings(batch_size=100):
     """
@@ -67,7 +68,7 @@ def create_qdrant_embeddings(batch_size=100):
     
     # Initialize embedding model
     print("\n🧠 Loading Sentence Transformer model...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    model = load_sentence_transformer()
     print("✅ Model loaded successfully!")
     
     # Prepare texts for embedding
@@ -95,6 +96,7 @@ def create_qdrant_embeddings(batch_size=100):
     # Prepare points for Qdrant
     print("\n📦 Preparing points for upload...")
     points = []
+    ingest_version = new_ingest_version()  # lets running chatbots drop cached search results
     
     for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
         # Create payload with metadata
@@ -105,7 +107,8 @@ def create_qdrant_embeddings(batch_size=100):
             "token_count": chunk.get("token_count", 0),
             "source_file": chunk.get("source_file", "unknown"),
             "page_number": chunk.get("page_number", 0),
-            "chunk_index": i
+            "chunk_index": i,
+            "ingest_version": ingest_version
         }
         
         # Create point
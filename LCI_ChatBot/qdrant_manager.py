@@ -14,6 +14,7 @@ from qdrant_config import (
     get_collection_stats,
     delete_collection,
     ensure_collection_exists,
+    new_ingest_version,
     COLLECTION_NAME
 )
 from qdrant_search import search_chunks_qdrant
@@ -151,6 +152,7 @@ def import_collection(client, collection_name, input_file, batch_size=100):
         
         # Upload in batches
         from qdrant_client.models import PointStruct
+        ingest_version = new_ingest_version()  # lets running chatbots drop cached search results
         
         for i in range(0, len(points), batch_size):
             batch = points[i:i + batch_size]
@@ -159,7 +161,7 @@ def import_collection(client, collection_name, input_file, batch_size=100):
                 PointStruct(
                     id=p["id"],
                     vector=p["vector"],
-                    payload=p["payload"]
+                    payload={**p["payload"], "ingest_version": ingest_version}
                 )
                 for p in batch
             ]
@@ -2,14 +2,29 @@
 Search function using Qdrant vector database
 """
 import os
+import math
+import time
+import threading
 import psutil
-from sentence_transformers import SentenceTransformer
 from qdrant_client.models import Filter, FieldCondition, MatchValue
 
-from qdrant_config import get_qdrant_client, COLLECTION_NAME
+from qdrant_config import get_qdrant_client, get_collection_version, COLLECTION_NAME
+from embedding_batcher import EmbeddingBatcher
+from retrieval_cache import QueryEmbeddingCache, SearchResultCache, normalize_query
+
+# Query encoder backend: "torch" (SentenceTransformer) or "onnx" (int8 model from export_onnx_encoder.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+# How often the collection version is re-checked for re-ingestion (seconds)
+SEARCH_VERSION_CHECK_SECONDS = float(os.getenv("SEARCH_VERSION_CHECK_SECONDS", "30"))
+
+# Startup warmup: points paged in from the collection, and the query run end to end
+QDRANT_WARMUP_MAX_POINTS = int(os.getenv("QDRANT_WARMUP_MAX_POINTS", "5000"))
+WARMUP_QUERY = "What is the Lean Canvas for Invention?"
 
 # Cache the model to avoid reloading on every search
 _model_cache = None
+_model_lock = threading.Lock()
 
 def log_memory(stage=""):
     """Log current memory usage for debugging."""
@@ -20,6 +35,27 @@ def log_memory(stage=""):
     except Exception as e:
         print(f"[MEMORY] {stage} - Error logging memory: {e}")
 
+def load_encoder(backend=EMBEDDING_BACKEND):
+    """
+    Load the all-MiniLM-L6-v2 query encoder for the given backend.
+
+    The ONNX backend avoids importing torch; if its files or packages are
+    missing it falls back to SentenceTransformer.
+    """
+    if backend == "onnx":
+        try:
+            from onnx_encoder import OnnxSentenceEncoder
+            encoder = OnnxSentenceEncoder()
+            print("✅ Using ONNX Runtime int8 query encoder")
+            return encoder
+        except Exception as e:
+            print(f"⚠️ Warning: ONNX encoder unavailable, falling back to SentenceTransformer: {e}")
+    elif backend != "torch":
+        print(f"⚠️ Warning: Unknown EMBEDDING_BACKEND '{backend}' - using SentenceTransformer")
+    # Imported here so the ONNX backend never pulls in torch
+    from model_artifacts import load_sentence_transformer
+    return load_sentence_transformer()
+
 def get_model():
     """
     Get or initialize the embedding model (lazy-loaded and cached).
@@ -29,25 +65,100 @@ def get_model():
     """
     global _model_cache
     if _model_cache is None:
-        log_memory("Before model loading")
-        print("🧠 Loading Sentence Transformer model (all-MiniLM-L6-v2, 384-dim)...")
-        print("   This is a lazy load - model will be cached after first use")
-        _model_cache = SentenceTransformer('all-MiniLM-L6-v2')
+        # Locked so a request arriving during the startup warmup does not load a second copy
+        with _model_lock:
+            if _model_cache is None:
+                log_memory("Before model loading")
+                print(f"🧠 Loading Sentence Transformer model (all-MiniLM-L6-v2, 384-dim, backend={EMBEDDING_BACKEND})...")
+                print("   This is a lazy load - model will be cached after first use")
+                _model_cache = load_encoder()
         
-        # Verify model configuration
-        if hasattr(_model_cache, 'get_sentence_embedding_dimension'):
-            dim = _model_cache.get_sentence_embedding_dimension()
-            print(f"✅ Model loaded: all-MiniLM-L6-v2, dimension={dim}")
-            if dim != 384:
-                print(f"⚠️ Warning: Expected 384 dimensions, got {dim}")
-        else:
-            print("✅ Model loaded: all-MiniLM-L6-v2")
+                # Verify model configuration
+                if hasattr(_model_cache, 'get_sentence_embedding_dimension'):
+                    dim = _model_cache.get_sentence_embedding_dimension()
+                    print(f"✅ Model loaded: all-MiniLM-L6-v2, dimension={dim}")
+                    if dim != 384:
+                        print(f"⚠️ Warning: Expected 384 dimensions, got {dim}")
+                else:
+                    print("✅ Model loaded: all-MiniLM-L6-v2")
         
-        log_memory("After model loading")
-        print("✅ Model cached - subsequent searches will reuse it")
+                log_memory("After model loading")
+                print("✅ Model cached - subsequent searches will reuse it")
     return _model_cache
 
-def search_chunks_qdrant(query, top_k=3, score_threshold=0.0, filters=None):
+# Concurrent searches share one batched forward pass
+embedding_batcher = EmbeddingBatcher(get_model)
+
+# Repeated queries skip both the encoder and Qdrant
+query_embedding_cache = QueryEmbeddingCache()
+search_result_cache = SearchResultCache()
+_version_checked_at = 0.0
+
+def embed_query(query):
+    """Embed a single query (cached, otherwise through the micro-batcher - blocking, call from a worker thread)."""
+    key = normalize_query(query)
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        vector = embedding_batcher.encode(key)
+        query_embedding_cache.put(key, vector)
+    return vector
+
+def refresh_collection_version(client, force=False):
+    """Re-read the collection version at most every SEARCH_VERSION_CHECK_SECONDS; a change clears cached results."""
+    global _version_checked_at
+    now = time.monotonic()
+    if not force and now - _version_checked_at < SEARCH_VERSION_CHECK_SECONDS:
+        return search_result_cache.version
+    try:
+        search_result_cache.set_version(get_collection_version(client, COLLECTION_NAME))
+    except Exception as e:
+        print(f"⚠️ Warning: Could not read Qdrant collection version: {e}")
+    _version_checked_at = now
+    return search_result_cache.version
+
+def _run_search(client, query_embedding, top_k, score_threshold, filters, timeout=None):
+    """Query Qdrant and format the hits (raises on failure)."""
+    # Build filter if provided
+    qdrant_filter = None
+    if filters:
+        conditions = []
+        for key, value in filters.items():
+            conditions.append(
+                FieldCondition(
+                    key=key,
+                    match=MatchValue(value=value)
+                )
+            )
+        if conditions:
+            qdrant_filter = Filter(must=conditions)
+    
+    # Search in Qdrant
+    search_results = client.search(
+        collection_name=COLLECTION_NAME,
+        query_vector=query_embedding.tolist(),
+        limit=top_k,
+        score_threshold=score_threshold,
+        query_filter=qdrant_filter,
+        # Whole seconds; bounds both the server-side search and the HTTP request
+        timeout=max(1, math.ceil(timeout)) if timeout else None
+    )
+    
+    # Format results
+    results = []
+    for hit in search_results:
+        results.append({
+            'chunk_id': hit.payload.get('chunk_id', 'unknown'),
+            'text': hit.payload.get('text', ''),
+            'similarity': float(hit.score),
+            'preview': hit.payload.get('preview', ''),
+            'token_count': hit.payload.get('token_count', 0),
+            'source_file': hit.payload.get('source_file', 'unknown'),
+            'page_number': hit.payload.get('page_number', 0),
+            'chunk_index': hit.payload.get('chunk_index', 0)
+        })
+    return results
+
+def search_chunks_qdrant(query, top_k=3, score_threshold=0.0, filters=None, timeout=None):
     """
     Search for relevant chunks using Qdrant vector database.
     
@@ -57,6 +168,7 @@ def search_chunks_qdrant(query, top_k=3, score_threshold=0.0, filters=None):
         score_threshold (float): Minimum similarity score (0.0 to 1.0)
         filters (dict): Optional filters for metadata
             Example: {"source_file": "document.pdf", "page_number": 5}
+        timeout (float): Optional Qdrant request timeout in seconds (e.g. the caller's deadline)
     
     Returns:
         list: List of relevant chunks with similarity scores
@@ -73,61 +185,67 @@ def search_chunks_qdrant(query, top_k=3, score_threshold=0.0, filters=None):
         # Get Qdrant client (lazy-loaded)
         client = get_qdrant_client()
         
-        # Get embedding model (lazy-loaded, cached after first use)
-        model = get_model()
-        
-        log_memory("After model/client (before encoding)")
+        log_memory("After client (before encoding)")
         
-        # Encode query
-        query_embedding = model.encode([query])[0].tolist()
+        # Encode query (cached, or batched with concurrent searches; the model is lazy-loaded on first use)
+        query_embedding = embed_query(query)
         
         log_memory("After encoding (before search)")
         
-        # Build filter if provided
-        qdrant_filter = None
-        if filters:
-            conditions = []
-            for key, value in filters.items():
-                conditions.append(
-                    FieldCondition(
-                        key=key,
-                        match=MatchValue(value=value)
-                    )
-                )
-            if conditions:
-                qdrant_filter = Filter(must=conditions)
-        
-        # Search in Qdrant
-        search_results = client.search(
-            collection_name=COLLECTION_NAME,
-            query_vector=query_embedding,
-            limit=top_k,
-            score_threshold=score_threshold,
-            query_filter=qdrant_filter
+        # Serve repeated searches from the result cache (stale entries refresh in the background)
+        version = refresh_collection_version(client)
+        key = search_result_cache.make_key(query_embedding, top_k, score_threshold, filters, version)
+        results = search_result_cache.get(
+            key, lambda: _run_search(client, query_embedding, top_k, score_threshold, filters, timeout)
         )
-        
-        # Format results
-        results = []
-        for hit in search_results:
-            results.append({
-                'chunk_id': hit.payload.get('chunk_id', 'unknown'),
-                'text': hit.payload.get('text', ''),
-                'similarity': float(hit.score),
-                'preview': hit.payload.get('preview', ''),
-                'token_count': hit.payload.get('token_count', 0),
-                'source_file': hit.payload.get('source_file', 'unknown'),
-                'page_number': hit.payload.get('page_number', 0),
-                'chunk_index': hit.payload.get('chunk_index', 0)
-            })
+        if results is None:
+            results = _run_search(client, query_embedding, top_k, score_threshold, filters, timeout)
+            search_result_cache.put(key, results)
         
         log_memory("After search complete")
-        return results
+        # Callers add keys to the result dicts - never hand out the cached ones
+        return [dict(result) for result in results]
     
     except Exception as e:
         print(f"❌ Error searching Qdrant: {e}")
         print("💡 Make sure Qdrant is running and embeddings are uploaded")
         return []
 
+def warm_up_encoder():
+    """Load the query encoder and run one encode through the micro-batcher."""
+    get_model()
+    vector = embedding_batcher.encode(WARMUP_QUERY)
+    print(f"✅ Query encoder warm ({len(vector)}-dim)")
+    return True
+
+def warm_up_search(max_points=QDRANT_WARMUP_MAX_POINTS):
+    """
+    Touch the collection so the first chat does not pay for cold Qdrant segments.
+
+    Pages stored vectors and payloads in with a scroll, then runs WARMUP_QUERY
+    through the full search path (encoder, caches, Qdrant).
+
+    Returns:
+        bool: True if the warmup search returned results
+    """
+    client = get_qdrant_client()
+    refresh_collection_version(client, force=True)
+    touched, offset = 0, None
+    while touched < max_points:
+        points, offset = client.scroll(
+            collection_name=COLLECTION_NAME,
+            limit=256,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        touched += len(points)
+        if offset is None or not points:
+            break
+    results = search_chunks_qdrant(WARMUP_QUERY, top_k=3)
+    print(f"✅ Qdrant warm: {touched} points touched, warmup search returned {len(results)} chunks")
+    return bool(results)
+
 def search_with_context(query, top_k=3, context_window=1):
     """
     Search and include surrounding chunks for better context.
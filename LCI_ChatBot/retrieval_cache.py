@@ -0,0 +1,172 @@
+"""
+Two-level retrieval cache: query text -> embedding, and embedding + search params -> Qdrant results
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache Configuration
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2000"))
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "1000"))
+SEARCH_RESULT_TTL_SECONDS = float(os.getenv("SEARCH_RESULT_TTL_SECONDS", "300"))          # served as fresh
+SEARCH_RESULT_STALE_SECONDS = float(os.getenv("SEARCH_RESULT_STALE_SECONDS", "3600"))     # served stale while refreshing
+
+def normalize_query(text):
+    """
+    Collapse whitespace and lowercase a query before embedding.
+
+    all-MiniLM-L6-v2 uses an uncased tokenizer, so this does not change the
+    embedding - it only lets trivially different queries share a cache entry.
+    """
+    return " ".join((text or "").lower().split())
+
+class QueryEmbeddingCache:
+    """LRU of normalized query text -> embedding vector (vectors are shared, treat them as read-only)."""
+
+    def __init__(self, max_entries=QUERY_EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key, vector):
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+class SearchResultCache:
+    """
+    LRU of search results with stale-while-revalidate.
+
+    Keys include the collection version, and `set_version` drops every entry
+    when it changes, so a re-ingested collection never serves old chunks.
+    Entries younger than `ttl_seconds` are served as is; older ones (up to
+    `stale_seconds`) are served immediately while one background refresh
+    replaces them.
+    """
+
+    def __init__(self, max_entries=SEARCH_RESULT_CACHE_SIZE, ttl_seconds=SEARCH_RESULT_TTL_SECONDS,
+                 stale_seconds=SEARCH_RESULT_STALE_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries = OrderedDict()   # key -> (results, stored_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.version = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(vector, top_k, score_threshold, filters, version):
+        digest = hashlib.sha256(vector.tobytes()).hexdigest()
+        return (digest, top_k, score_threshold, json.dumps(filters or {}, sort_keys=True, default=str), str(version))
+
+    def set_version(self, version):
+        """Record the collection version; a change invalidates every cached result."""
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                print(f"♻️ Qdrant collection changed ({self.version} -> {version}) - search result cache cleared")
+                self.invalidations += 1
+            self.version = version
+            self._entries.clear()
+
+    def get(self, key, refresh_fn):
+        """
+        Return cached results, or None on a miss.
+
+        Args:
+            key: Key from make_key
+            refresh_fn: Zero-argument function re-running the search, used for a stale entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            results, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age > self.stale_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if age <= self.ttl_seconds:
+                self.hits += 1
+                return results
+            self.stale_hits += 1
+            if key in self._refreshing:
+                return results
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, refresh_fn), name="search-cache-refresh", daemon=True).start()
+        return results
+
+    def _refresh(self, key, refresh_fn):
+        try:
+            self.put(key, refresh_fn())
+            self.refreshes += 1
+        except Exception as e:
+            self.refresh_errors += 1
+            print(f"⚠️ Warning: Search result refresh failed, keeping stale entry: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def put(self, key, results):
+        with self._lock:
+            if key[-1] != str(self.version):
+                return   # computed against a collection version that has since changed
+            self._entries[key] = (results, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "collection_version": str(self.version),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / total, 3) if total else 0.0,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,117 @@
+"""
+Semantic answer cache for knowledge-only chat questions
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache Configuration
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # cosine similarity
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+class SemanticAnswerCache:
+    """
+    Answers to past generic questions, looked up by query-embedding similarity.
+
+    Only safe for questions whose answer depends on the LCI book alone - callers
+    must skip it whenever the request carries user-specific context. Entries are
+    evicted least-recently-used once `max_entries` is reached, or after the TTL.
+    """
+
+    def __init__(self, max_entries=SEMANTIC_CACHE_MAX_ENTRIES, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # entry_id -> {"vector", "query", "answer", "top_k", "stored_at"}
+        self._next_id = 0
+        self._matrix = None             # stacked vectors, rebuilt lazily after changes
+        self._matrix_ids = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _rebuild_matrix(self):
+        self._matrix_ids = list(self._entries.keys())
+        self._matrix = (np.stack([self._entries[i]["vector"] for i in self._matrix_ids])
+                        if self._matrix_ids else None)
+
+    def lookup(self, vector, top_k):
+        """
+        Find a cached answer for a near-duplicate query.
+
+        Returns:
+            dict or None: {"query", "answer", "similarity"} for the best match above
+            the threshold asked with the same top_k, else None
+        """
+        query_vector = self._normalize(vector)
+        with self._lock:
+            now = time.time()
+            expired = [i for i, e in self._entries.items() if now - e["stored_at"] > self.ttl_seconds]
+            for entry_id in expired:
+                del self._entries[entry_id]
+            if expired or self._matrix is None or len(self._matrix_ids) != len(self._entries):
+                self._rebuild_matrix()
+
+            if self._matrix is None:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ query_vector
+            for idx in np.argsort(-similarities):
+                similarity = float(similarities[idx])
+                if similarity < self.threshold:
+                    break
+                entry_id = self._matrix_ids[idx]
+                entry = self._entries[entry_id]
+                if entry["top_k"] != top_k:
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return {"query": entry["query"], "answer": entry["answer"], "similarity": similarity}
+
+            self.misses += 1
+            return None
+
+    def store(self, vector, query, answer, top_k):
+        with self._lock:
+            self._entries[self._next_id] = {
+                "vector": self._normalize(vector),
+                "query": query,
+                "answer": answer,
+                "top_k": top_k,
+                "stored_at": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": SEMANTIC_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "threshold": self.threshold,
+            }
+
+# Global instance
+semantic_cache = SemanticAnswerCache()
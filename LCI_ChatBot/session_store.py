@@ -0,0 +1,257 @@
+"""
+Bounded, tiered store for per-user chat sessions
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Session Store Configuration
+SESSION_STORE_STRIPES = int(os.getenv("SESSION_STORE_STRIPES", "16"))
+SESSION_HOT_MAX_SESSIONS = int(os.getenv("SESSION_HOT_MAX_SESSIONS", "2000"))
+SESSION_HOT_MAX_BYTES = int(os.getenv("SESSION_HOT_MAX_BYTES", str(64 * 1024 * 1024)))   # memory cap for the hot tier
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))       # idle sessions are forgotten
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "200"))                    # hard cap per session
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "cache/chat_sessions.sqlite3")     # empty = no spill, evicted sessions are dropped
+
+# Rough per-message overhead of the dicts/strings holding a message, on top of its text
+MESSAGE_OVERHEAD_BYTES = 200
+
+def _session_size(session):
+    return (sum(len(m["content"]) + MESSAGE_OVERHEAD_BYTES for m in session["messages"])
+            + len(session["summary"]) + MESSAGE_OVERHEAD_BYTES)
+
+class _Stripe:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()   # user_id -> {"messages", "summary", "last_access", "size"}
+        self.bytes = 0
+
+class ChatSessionStore:
+    """
+    Per-user chat history and summary, bounded in memory.
+
+    Sessions live in a hot in-memory tier split into lock stripes (so threads
+    serving different users rarely contend). Each stripe evicts its least
+    recently used sessions once it exceeds its share of SESSION_HOT_MAX_SESSIONS
+    or SESSION_HOT_MAX_BYTES; evicted sessions are spilled to a local SQLite
+    file and transparently reloaded on their next access. Sessions idle for
+    longer than SESSION_TTL_SECONDS are dropped from both tiers.
+    """
+
+    def __init__(self, stripes=SESSION_STORE_STRIPES, max_sessions=SESSION_HOT_MAX_SESSIONS,
+                 max_bytes=SESSION_HOT_MAX_BYTES, ttl_seconds=SESSION_TTL_SECONDS, path=SESSION_STORE_PATH):
+        self.stripes = [_Stripe() for _ in range(max(1, stripes))]
+        self.max_sessions_per_stripe = max(1, max_sessions // len(self.stripes))
+        self.max_bytes_per_stripe = max(1, max_bytes // len(self.stripes))
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._db = None
+        self._db_lock = threading.Lock()
+        self.spilled = 0
+        self.reloaded = 0
+        self.expired = 0
+        if path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions (user_id TEXT PRIMARY KEY, data TEXT, last_access REAL)"
+            )
+            self._db.execute("DELETE FROM chat_sessions WHERE last_access < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+            count = self._db.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+            print(f"✅ Chat session store using {self.path} ({count} spilled sessions)")
+        except Exception as e:
+            print(f"⚠️ Warning: Chat session spill disabled ({self.path}): {e}")
+            self._db = None
+
+    def _stripe(self, user_id):
+        return self.stripes[hash(user_id) % len(self.stripes)]
+
+    # ---- cold tier -------------------------------------------------------
+
+    def _spill(self, user_id, session):
+        if self._db is None:
+            return
+        data = json.dumps({"messages": session["messages"], "summary": session["summary"]}, ensure_ascii=False)
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO chat_sessions (user_id, data, last_access) VALUES (?, ?, ?)",
+                    (user_id, data, session["last_access"])
+                )
+                self._db.commit()
+            self.spilled += 1
+        except Exception as e:
+            print(f"⚠️ Warning: Could not spill chat session {user_id}: {e}")
+
+    def _reload(self, user_id):
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT data, last_access FROM chat_sessions WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._db.execute("DELETE FROM chat_sessions WHERE user_id = ?", (user_id,))
+                self._db.commit()
+        except Exception as e:
+            print(f"⚠️ Warning: Could not reload chat session {user_id}: {e}")
+            return None
+        data, last_access = row
+        if time.time() - last_access > self.ttl_seconds:
+            self.expired += 1
+            return None
+        self.reloaded += 1
+        stored = json.loads(data)
+        return {"messages": stored["messages"], "summary": stored["summary"], "last_access": last_access}
+
+    # ---- hot tier --------------------------------------------------------
+
+    def _session(self, stripe, user_id, create):
+        """Fetch a session into the hot tier (caller holds the stripe lock)."""
+        now = time.time()
+        # Expire idle sessions from the LRU end of this stripe
+        while stripe.sessions:
+            oldest = next(iter(stripe.sessions.values()))
+            if now - oldest["last_access"] <= self.ttl_seconds:
+                break
+            stripe.sessions.popitem(last=False)
+            stripe.bytes -= oldest["size"]
+            self.expired += 1
+
+        session = stripe.sessions.get(user_id)
+        if session is None:
+            session = self._reload(user_id)
+            if session is None:
+                if not create:
+                    return None
+                session = {"messages": [], "summary": "", "last_access": now}
+            session["size"] = _session_size(session)
+            stripe.sessions[user_id] = session
+            stripe.bytes += session["size"]
+        stripe.sessions.move_to_end(user_id)
+        session["last_access"] = now
+        return session
+
+    def _resize(self, stripe, session):
+        size = _session_size(session)
+        stripe.bytes += size - session["size"]
+        session["size"] = size
+
+    def _evict(self, stripe):
+        while len(stripe.sessions) > 1 and (len(stripe.sessions) > self.max_sessions_per_stripe
+                                            or stripe.bytes > self.max_bytes_per_stripe):
+            user_id, session = stripe.sessions.popitem(last=False)
+            stripe.bytes -= session["size"]
+            self._spill(user_id, session)
+
+    # ---- public API ------------------------------------------------------
+
+    def get_messages(self, user_id):
+        """Return a copy of the user's stored messages, oldest first."""
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            session = self._session(stripe, user_id, create=False)
+            if session is None:
+                return []
+            messages = list(session["messages"])
+            self._evict(stripe)
+            return messages
+
+    def get_session(self, user_id):
+        """
+        Returns:
+            tuple: (summary, messages) - the running summary and a copy of the stored messages
+        """
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            session = self._session(stripe, user_id, create=False)
+            if session is None:
+                return "", []
+            result = (session["summary"], list(session["messages"]))
+            self._evict(stripe)
+            return result
+
+    def get_summary(self, user_id):
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            session = self._session(stripe, user_id, create=False)
+            summary = session["summary"] if session else ""
+            self._evict(stripe)
+            return summary
+
+    def append(self, user_id, messages):
+        """Append messages to the user's session, keeping at most SESSION_MAX_MESSAGES."""
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            session = self._session(stripe, user_id, create=True)
+            session["messages"].extend(messages)
+            overflow = len(session["messages"]) - SESSION_MAX_MESSAGES
+            if overflow > 0:
+                del session["messages"][:overflow]
+            self._resize(stripe, session)
+            self._evict(stripe)
+
+    def fold(self, user_id, folded, summary):
+        """
+        Replace the leading `folded` messages with a new summary.
+
+        Returns:
+            bool: False (and no change) if the history no longer starts with `folded`
+        """
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            session = self._session(stripe, user_id, create=False)
+            if session is None or session["messages"][:len(folded)] != folded:
+                return False
+            del session["messages"][:len(folded)]
+            session["summary"] = summary
+            self._resize(stripe, session)
+            self._evict(stripe)
+            return True
+
+    def flush(self):
+        """Spill every hot session to SQLite - called on shutdown so sessions survive a restart."""
+        if self._db is None:
+            return
+        for stripe in self.stripes:
+            with stripe.lock:
+                for user_id, session in stripe.sessions.items():
+                    self._spill(user_id, session)
+
+    def stats(self):
+        sessions = 0
+        messages = 0
+        hot_bytes = 0
+        for stripe in self.stripes:
+            with stripe.lock:
+                sessions += len(stripe.sessions)
+                messages += sum(len(s["messages"]) for s in stripe.sessions.values())
+                hot_bytes += stripe.bytes
+        return {
+            "backend": "memory",
+            "hot_sessions": sessions,
+            "hot_messages": messages,
+            "hot_bytes": hot_bytes,
+            "max_bytes": self.max_bytes_per_stripe * len(self.stripes),
+            "spilled": self.spilled,
+            "reloaded": self.reloaded,
+            "expired": self.expired,
+            "persistent": self._db is not None,
+        }
+
+# The global instance is created by state_backend (in-process or Redis)
@@ -20,6 +20,14 @@ if (-not $qdrantRunning) {
     Write-Host "✅ Qdrant is already running" -ForegroundColor Green
 }
 
+# Vendor the embedding model and context tokenizer (skipped once they verify)
+Write-Host "Checking local model artifacts..." -ForegroundColor Yellow
+python model_artifacts.py vendor
+if ($LASTEXITCODE -ne 0) {
+    Write-Host "❌ Could not vendor the model artifacts. Run 'python model_artifacts.py vendor' with network access." -ForegroundColor Red
+    exit 1
+}
+
 Write-Host "Starting ChatBot API with Uvicorn..." -ForegroundColor Green
 Write-Host "🔍 Auto-setup will check and initialize embeddings if needed" -ForegroundColor Cyan
 Write-Host "🌐 Server will be available at: http://localhost:8000" -ForegroundColor Cyan
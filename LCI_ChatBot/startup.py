@@ -0,0 +1,104 @@
+"""
+Startup bootstrap: runs setup and warmup steps in the background and tracks readiness
+"""
+import os
+import time
+import asyncio
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Bootstrap Configuration
+BOOTSTRAP_STEP_TIMEOUT = float(os.getenv("BOOTSTRAP_STEP_TIMEOUT", "300"))   # seconds per step
+# Report not-ready (503) when the encoder or the warmup search failed; set to false to serve without LCI knowledge
+READY_REQUIRE_SEARCH = os.getenv("READY_REQUIRE_SEARCH", "true").lower() in ("1", "true", "yes")
+
+class BootstrapState:
+    """
+    Background startup steps and their outcome.
+
+    The server accepts requests (and answers /health) while the steps run;
+    /ready only reports ready once every step has finished, so orchestrators
+    route traffic to warm workers only.
+    """
+
+    def __init__(self):
+        self.steps = {}     # name -> {"status", "seconds", "error"}
+        self.started_at = None
+        self.finished_at = None
+        self._task = None
+
+    async def run_step(self, name, fn, timeout=BOOTSTRAP_STEP_TIMEOUT):
+        """
+        Run a blocking step in a worker thread.
+
+        Args:
+            name: Step name reported by /ready
+            fn: Zero-argument function; returning False marks the step failed
+            timeout: Seconds before the step is reported as failed
+
+        Returns:
+            bool: True if the step succeeded
+        """
+        step = {"status": "running", "seconds": None, "error": None}
+        self.steps[name] = step
+        started = time.monotonic()
+        print(f"🚀 [BOOTSTRAP] {name} started")
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(fn), timeout)
+            step["status"] = "failed" if result is False else "ok"
+        except asyncio.TimeoutError:
+            step["status"], step["error"] = "failed", f"timed out after {timeout}s"
+        except Exception as e:
+            step["status"], step["error"] = "failed", str(e)
+        step["seconds"] = round(time.monotonic() - started, 2)
+        icon = "✅" if step["status"] == "ok" else "❌"
+        print(f"{icon} [BOOTSTRAP] {name} {step['status']} in {step['seconds']}s" +
+              (f": {step['error']}" if step["error"] else ""))
+        return step["status"] == "ok"
+
+    def skip(self, name, reason):
+        self.steps[name] = {"status": "skipped", "seconds": 0, "error": reason}
+        print(f"⏭️ [BOOTSTRAP] {name} skipped: {reason}")
+
+    def start(self, bootstrap):
+        """Run the `bootstrap` coroutine function in the background (call from the running event loop)."""
+        self.started_at = time.monotonic()
+        self._task = asyncio.ensure_future(self._run(bootstrap))
+
+    async def _run(self, bootstrap):
+        try:
+            await bootstrap()
+        except Exception as e:
+            print(f"❌ [BOOTSTRAP] Unexpected error: {e}")
+        finally:
+            self.finished_at = time.monotonic()
+            print(f"🎉 [BOOTSTRAP] Finished in {self.finished_at - self.started_at:.1f}s")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def is_ready(self, required=()):
+        """Ready once every step has finished and none of the `required` steps failed or was skipped."""
+        return self.finished and all(self.steps.get(name, {}).get("status") == "ok" for name in required)
+
+    def stats(self):
+        end = self.finished_at or time.monotonic()
+        return {
+            "finished": self.finished,
+            "elapsed_seconds": round(end - self.started_at, 2) if self.started_at else None,
+            "degraded": [name for name, step in self.steps.items() if step["status"] != "ok"],
+            "steps": self.steps,
+        }
+
+# Global instance
+bootstrap_state = BootstrapState()
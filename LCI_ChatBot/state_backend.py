@@ -0,0 +1,277 @@
+"""
+Pluggable backend for shared chatbot state (chat sessions and autofill context)
+
+STATE_BACKEND=memory keeps state in-process (single uvicorn worker).
+STATE_BACKEND=redis keeps it in Redis so several workers/replicas share
+conversations; start uvicorn with --workers N (or WEB_CONCURRENCY=N).
+"""
+import os
+import json
+import threading
+from dotenv import load_dotenv
+
+from session_store import ChatSessionStore, SESSION_TTL_SECONDS, SESSION_MAX_MESSAGES
+from autofill_context import AutofillContextStore, render_autofill_context, AUTO_CONTEXT_TTL_SECONDS
+
+load_dotenv()
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# State Backend Configuration
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()   # "memory" or "redis"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+STATE_KEY_PREFIX = os.getenv("STATE_KEY_PREFIX", "lci")
+STATE_WRITE_BEHIND_INTERVAL = float(os.getenv("STATE_WRITE_BEHIND_INTERVAL", "0.05"))  # seconds between batched flushes
+STATE_WRITE_BEHIND_MAX_BATCH = int(os.getenv("STATE_WRITE_BEHIND_MAX_BATCH", "200"))    # flush early once this many writes queue
+
+def _text(value):
+    """Redis replies as str - clients built without decode_responses=True return bytes."""
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+class WriteBehindBuffer:
+    """
+    Queue Redis writes and send them in pipelined batches from a background thread.
+
+    Each write is tagged with the key it touches; readers call `flush_if_dirty`
+    before reading a key with queued writes, so a worker always reads its own
+    writes. Writes are sent at most once - a failed batch is logged and dropped.
+    """
+
+    def __init__(self, client, interval=STATE_WRITE_BEHIND_INTERVAL, max_batch=STATE_WRITE_BEHIND_MAX_BATCH):
+        self.client = client
+        self.interval = interval
+        self.max_batch = max_batch
+        self._ops = []              # [(dirty_key, fn(pipeline))]
+        self._dirty = {}            # dirty_key -> queued write count
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()   # keeps batches in submission order
+        self._thread = None
+        self._stopped = False
+        self.batches = 0
+        self.writes = 0
+        self.failures = 0
+
+    def submit(self, dirty_key, op):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="state-write-behind", daemon=True)
+                self._thread.start()
+            self._ops.append((dirty_key, op))
+            self._dirty[dirty_key] = self._dirty.get(dirty_key, 0) + 1
+            if len(self._ops) >= self.max_batch:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                # A full batch may have been queued before this thread was waiting
+                if len(self._ops) < self.max_batch:
+                    self._cond.wait(self.interval)
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                ops, self._ops = self._ops, []
+            if not ops:
+                return
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                for _, op in ops:
+                    op(pipe)
+                pipe.execute()
+                self.batches += 1
+                self.writes += len(ops)
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️ Warning: Dropped {len(ops)} state writes, Redis flush failed: {e}")
+            finally:
+                with self._cond:
+                    for dirty_key, _ in ops:
+                        self._dirty[dirty_key] -= 1
+                        if not self._dirty[dirty_key]:
+                            del self._dirty[dirty_key]
+
+    def flush_if_dirty(self, dirty_key):
+        if dirty_key in self._dirty:
+            self.flush()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self.flush()
+
+    def stats(self):
+        return {
+            "queued": len(self._ops),
+            "batches": self.batches,
+            "writes": self.writes,
+            "failures": self.failures,
+        }
+
+class RedisChatSessionStore:
+    """
+    Chat sessions in Redis, interchangeable with ChatSessionStore.
+
+    Methods block on Redis round trips - async callers run them in a thread.
+
+    Each user has a list of JSON messages and a summary string, both expiring
+    after SESSION_TTL_SECONDS of inactivity. Appends go through the
+    write-behind buffer; reads are one pipelined round trip.
+    """
+
+    def __init__(self, client, writer, prefix=STATE_KEY_PREFIX, ttl_seconds=SESSION_TTL_SECONDS):
+        self.client = client
+        self.writer = writer
+        self.prefix = prefix
+        self.ttl = int(ttl_seconds)
+
+    def _keys(self, user_id):
+        base = f"{self.prefix}:chat:{user_id}"
+        return f"{base}:messages", f"{base}:summary"
+
+    def get_session(self, user_id):
+        messages_key, summary_key = self._keys(user_id)
+        self.writer.flush_if_dirty(messages_key)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(summary_key)
+        pipe.lrange(messages_key, 0, -1)
+        # Sliding expiry - an active conversation never times out
+        pipe.expire(summary_key, self.ttl)
+        pipe.expire(messages_key, self.ttl)
+        summary, raw_messages, _, _ = pipe.execute()
+        return _text(summary) or "", [json.loads(m) for m in raw_messages]
+
+    def get_messages(self, user_id):
+        return self.get_session(user_id)[1]
+
+    def get_summary(self, user_id):
+        return self.get_session(user_id)[0]
+
+    def append(self, user_id, messages):
+        messages_key, summary_key = self._keys(user_id)
+        encoded = [json.dumps(m, ensure_ascii=False) for m in messages]
+
+        def op(pipe):
+            pipe.rpush(messages_key, *encoded)
+            pipe.ltrim(messages_key, -SESSION_MAX_MESSAGES, -1)
+            pipe.expire(messages_key, self.ttl)
+            pipe.expire(summary_key, self.ttl)
+
+        self.writer.submit(messages_key, op)
+
+    def fold(self, user_id, folded, summary):
+        """Atomically replace the leading `folded` messages with `summary` (False if they changed)."""
+        messages_key, summary_key = self._keys(user_id)
+        self.writer.flush_if_dirty(messages_key)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(messages_key)
+                current = [json.loads(m) for m in pipe.lrange(messages_key, 0, len(folded) - 1)]
+                if current != folded:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.ltrim(messages_key, len(folded), -1)
+                pipe.set(summary_key, summary, ex=self.ttl)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                # Another worker appended or folded meanwhile
+                return False
+
+    def flush(self):
+        self.writer.flush()
+
+    def stats(self):
+        return {"backend": "redis", "write_behind": self.writer.stats()}
+
+class RedisAutofillContextStore:
+    """Autofill context in Redis, interchangeable with AutofillContextStore (expiry by TTL)."""
+
+    def __init__(self, client, writer, prefix=STATE_KEY_PREFIX, ttl_seconds=AUTO_CONTEXT_TTL_SECONDS):
+        self.client = client
+        self.writer = writer
+        self.prefix = prefix
+        self.ttl = int(ttl_seconds)
+
+    def _scope(self, user_id, canvas_id):
+        return f"{self.prefix}:autofill:{user_id or ''}:{canvas_id or ''}"
+
+    def put(self, user_id, canvas_id, template_key, answers):
+        scope = self._scope(user_id, canvas_id)
+        text = render_autofill_context(template_key, answers)
+
+        def op(pipe):
+            pipe.set(f"{scope}:{template_key}", text, ex=self.ttl)
+            pipe.set(f"{scope}:latest", template_key, ex=self.ttl)
+
+        self.writer.submit(scope, op)
+
+    def get(self, user_id, canvas_id, template_key=None):
+        scope = self._scope(user_id, canvas_id)
+        self.writer.flush_if_dirty(scope)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(f"{scope}:{template_key}" if template_key else f"{scope}:latest")
+        pipe.get(f"{scope}:latest")
+        text, latest = (_text(value) for value in pipe.execute())
+        if template_key and text:
+            return template_key, text
+        if latest and latest != template_key:
+            text = _text(self.client.get(f"{scope}:{latest}"))
+            if text:
+                return latest, text
+        return None
+
+    def stats(self):
+        return {"backend": "redis", "write_behind": self.writer.stats()}
+
+_writer = None
+
+def create_state_backend(backend=STATE_BACKEND, client=None):
+    """
+    Create the chat session and autofill context stores for the configured backend.
+
+    Args:
+        backend: "memory" or "redis"
+        client: Optional Redis client (e.g. fakeredis in tests); built from REDIS_URL otherwise
+
+    Returns:
+        tuple: (chat_sessions, autofill_contexts)
+    """
+    global _writer
+    if backend == "redis":
+        if client is None and not REDIS_AVAILABLE:
+            print("⚠️ Warning: STATE_BACKEND=redis but the 'redis' package is not installed - using in-process state")
+        else:
+            try:
+                source = "custom client" if client is not None else REDIS_URL
+                if client is None:
+                    client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+                client.ping()
+                _writer = WriteBehindBuffer(client)
+                print(f"✅ Shared state backend: Redis ({source})")
+                return RedisChatSessionStore(client, _writer), RedisAutofillContextStore(client, _writer)
+            except Exception as e:
+                print(f"⚠️ Warning: Could not connect to Redis ({REDIS_URL}), using in-process state: {e}")
+    elif backend != "memory":
+        print(f"⚠️ Warning: Unknown STATE_BACKEND '{backend}' - using in-process state")
+
+    print("✅ Shared state backend: in-process (run a single worker)")
+    return ChatSessionStore(), AutofillContextStore()
+
+def close_state_backend():
+    """Flush pending state writes - called on shutdown"""
+    chat_sessions.flush()
+    if _writer is not None:
+        _writer.stop()
+
+# Global instances
+chat_sessions, autofill_contexts = create_state_backend()
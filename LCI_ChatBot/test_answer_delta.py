@@ -0,0 +1,93 @@
+"""
+Tests for delta rendering of currentAnswers: deltas only build on a full snapshot still in history
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+answer_delta = pytest.importorskip("answer_delta")
+from answer_delta import AnswerDeltaTracker, snapshot_hash
+
+KEY = "ProblemIdentification-Step1"
+FIRST = {"why_0": "Cost", "why_1": "Access", "why_2": ""}
+
+def turn(text):
+    return [{"role": "user", "content": f"What next?\n\n{text}"}, {"role": "assistant", "content": "ok"}]
+
+def test_first_turn_sends_every_filled_answer():
+    text, record = AnswerDeltaTracker().render(KEY, FIRST, [])
+    assert record
+    assert text.splitlines() == [
+        f"✍️ USER'S CURRENT ANSWERS [{KEY} answers #{snapshot_hash(KEY, {'why_0': 'Cost', 'why_1': 'Access'})}]:",
+        "  - why_0: Cost",
+        "  - why_1: Access",
+    ]
+    assert AnswerDeltaTracker().render(KEY, {"why_0": ""}, []) == ("", False)
+
+def test_later_turn_sends_only_changes():
+    tracker = AnswerDeltaTracker()
+    full, _ = tracker.render(KEY, FIRST, [])
+    text, record = tracker.render(KEY, {"why_0": "Cost", "why_2": "Policy"}, turn(full))
+    assert record
+    base = snapshot_hash(KEY, {"why_0": "Cost", "why_1": "Access"})
+    assert f"based on #{base}]" in text.splitlines()[0]
+    assert text.splitlines()[1:] == [
+        "  - why_2: Policy",
+        "  - why_1: (cleared)",
+        "  (1 other answers unchanged since earlier in this conversation)",
+    ]
+
+def test_unchanged_answers_are_not_recorded_again():
+    tracker = AnswerDeltaTracker()
+    full, _ = tracker.render(KEY, FIRST, [])
+    text, record = tracker.render(KEY, FIRST, turn(full))
+    assert not record and "unchanged since" in text and "(2 answers)" in text
+
+    changed = {"why_0": "Cost", "why_1": "Price"}
+    delta, _ = tracker.render(KEY, changed, turn(full))
+    assert not tracker.render(KEY, changed, turn(full) + turn(delta))[1]
+    # A delta whose base snapshot left the history no longer counts as "unchanged"
+    text, record = tracker.render(KEY, changed, turn(delta))
+    assert record and text.startswith("✍️ USER'S CURRENT ANSWERS [")
+
+def test_deltas_build_on_the_last_full_snapshot_in_history():
+    tracker = AnswerDeltaTracker()
+    full, _ = tracker.render(KEY, FIRST, [])
+    first_delta, _ = tracker.render(KEY, {"why_0": "Cost", "why_1": "Price"}, turn(full))
+    # The first delta is not resent, so the second one restates every change since the snapshot
+    text, _ = tracker.render(KEY, {"why_0": "Time", "why_1": "Price"}, turn(full))
+    assert text.splitlines()[1:] == ["  - why_0: Time", "  - why_1: Price"]
+    assert "based on #" in first_delta and "based on #" in text
+
+def test_full_snapshot_resent_once_it_leaves_the_history():
+    tracker = AnswerDeltaTracker()
+    full, _ = tracker.render(KEY, FIRST, [])
+    text, record = tracker.render(KEY, {"why_0": "Cost"}, turn("an unrelated earlier turn"))
+    assert record and text.splitlines() == [
+        f"✍️ USER'S CURRENT ANSWERS [{KEY} answers #{snapshot_hash(KEY, {'why_0': 'Cost'})}]:",
+        "  - why_0: Cost",
+    ]
+
+def test_another_worker_falls_back_to_a_full_snapshot():
+    full, _ = AnswerDeltaTracker().render(KEY, FIRST, [])
+    other_worker = AnswerDeltaTracker()
+    text, record = other_worker.render(KEY, {"why_0": "Cost", "why_1": "Price"}, turn(full))
+    assert record and "based on" not in text and "  - why_0: Cost" in text
+    # Whether answers are unchanged only depends on the history, so any worker can tell
+    assert not other_worker.render(KEY, FIRST, turn(full))[1]
+
+def test_markers_of_other_templates_are_ignored():
+    tracker = AnswerDeltaTracker()
+    full, _ = tracker.render("Other-Step1", FIRST, [])
+    text, _ = tracker.render(KEY, FIRST, turn(full))
+    assert text.startswith(f"✍️ USER'S CURRENT ANSWERS [{KEY} answers #")
+
+def test_expired_snapshot_is_sent_in_full(monkeypatch):
+    tracker = AnswerDeltaTracker(ttl_seconds=60)
+    full, _ = tracker.render(KEY, FIRST, [])
+    later = time.time() + 61
+    monkeypatch.setattr(answer_delta, "time", SimpleNamespace(time=lambda: later))
+    text, record = tracker.render(KEY, {"why_0": "Cost"}, turn(full))
+    assert record and "based on" not in text
+    assert tracker.stats()["full_sends"] == 2
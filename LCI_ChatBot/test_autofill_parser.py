@@ -0,0 +1,145 @@
+"""
+Tests for the streaming autofill JSON parser, and for expected_autofill_fields
+against template shapes from frontend/src/content/templateMapping.js
+"""
+import json
+
+import pytest
+
+from autofill_parser import (
+    IncrementalJSONObjectParser,
+    expected_autofill_fields,
+    find_missing_fields,
+    parse_json_object,
+)
+
+ROW_COLUMNS = ["deliverable", "university", "industry", "innovationLab", "online", "purchaseFrom", "rentFrom"]
+
+# "KeyResources-Step3": every row is hinted as row_<i>_<column>
+KEY_RESOURCES_STEP3 = {
+    "repeatedFields": [{"prefix": "row", "count": 8}],
+    "fieldHints": {f"row_{i}_{column}": f"{column} - Row {i + 1}" for i in range(8) for column in ROW_COLUMNS},
+}
+
+# "ProblemIdentification-Step6" (abridged): problem_1..5 hinted without a startIndex
+PROBLEM_IDENTIFICATION_STEP6 = {
+    "repeatedFields": [
+        {"prefix": "problem", "count": 5},
+        {"prefix": "detail", "count": 8, "startIndex": 1},
+        {"prefix": "intensity", "count": 8, "startIndex": 1},
+    ],
+    "fieldHints": {
+        "name_": "Name",
+        **{f"problem_{i}": f"Problem {i}" for i in range(1, 6)},
+        **{f"detail_{i}": f"Detail of Problem {i}" for i in range(1, 9)},
+        **{f"intensity_{i}": f"Intensity level for Problem {i}" for i in range(1, 9)},
+    },
+}
+
+# "LiteratureSearch-Step3": "patent_keywords_" is not a row of the "patent" pattern
+LITERATURE_SEARCH_STEP3 = {
+    "repeatedFields": [{"prefix": "article", "count": 30}, {"prefix": "patent", "count": 30}],
+    "fieldHints": {
+        "keywords_": "Keywords (Article Matrix)",
+        "patent_keywords_": "Keywords (Patent Matrix)",
+        "article_0_0": "Article No.",
+        "patent_0_0": "Patent No.",
+    },
+}
+
+def _expected(template):
+    return expected_autofill_fields(template["fieldHints"], template["repeatedFields"])
+
+def test_row_pattern_with_column_hints_is_not_expanded():
+    expected = _expected(KEY_RESOURCES_STEP3)
+    assert set(expected) == set(KEY_RESOURCES_STEP3["fieldHints"])
+    answers = {field: "University lab" for field in expected}
+    assert find_missing_fields(answers, expected) == []
+
+def test_hinted_rows_without_start_index_add_no_phantom_field():
+    expected = _expected(PROBLEM_IDENTIFICATION_STEP6)
+    assert "problem_0" not in expected
+    assert set(expected) == set(PROBLEM_IDENTIFICATION_STEP6["fieldHints"])
+    answers = {field: "high" if field.startswith("intensity") else "text" for field in expected}
+    assert find_missing_fields(answers, expected) == []
+
+def test_similarly_named_hint_does_not_count_as_a_row():
+    expected = _expected(LITERATURE_SEARCH_STEP3)
+    assert "patent_keywords_" in expected
+    assert "patent_1" not in expected and "article_1" not in expected
+
+def test_unhinted_pattern_is_expanded():
+    expected = expected_autofill_fields({"name_": "Name"}, [{"prefix": "why", "count": 4}])
+    assert set(expected) == {"name_", "why_0", "why_1", "why_2", "why_3"}
+    expected = expected_autofill_fields({}, [{"prefix": "detail", "count": 2, "startIndex": 1}])
+    assert set(expected) == {"detail_1", "detail_2"}
+
+REPLY = {
+    "problem_1": 'Say "hi" \u00e9t\u00e9 \\ done',
+    "detail_1": {"nested": [1, {"x": "}]"}], "flag": True},
+    "rows": [["a", "b"], []],
+    "score": 4.5,
+    "empty": None,
+}
+
+def _feed_in_chunks(text, size):
+    parser = IncrementalJSONObjectParser()
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return parser, completed
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 1000])
+def test_any_chunk_split_yields_the_same_object(size):
+    # Size 1 splits every key, value and escape sequence (\\", \\uXXXX) across chunks
+    text = json.dumps(REPLY)
+    parser, completed = _feed_in_chunks(text, size)
+    assert parser.result == REPLY
+    assert [field for field, _ in completed] == list(REPLY)
+    assert parser.done and parser.errors == []
+
+def test_escape_split_right_after_backslash():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed('{"a": "x\\') == []
+    assert parser.feed('"y\\u00') == []
+    assert parser.feed('e9"}') == [("a", 'x"y\u00e9')]
+
+def test_truncated_stream_keeps_completed_fields_only():
+    text = json.dumps(REPLY)
+    for cut in ('"rows"', '"score": 4', '"empty": nu'):
+        partial = text[:text.index(cut) + len(cut)]
+        parser, completed = _feed_in_chunks(partial, 4)
+        assert not parser.done
+        finished = list(REPLY)[:list(REPLY).index(cut.split('"')[1])]
+        assert [field for field, _ in completed] == finished
+        assert parser.result == {field: REPLY[field] for field in finished}
+
+def test_truncated_nested_value_is_not_emitted():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed('{"a": 1, "b": {"c": [1, 2') == [("a", 1)]
+    assert parser.result == {"a": 1}
+
+def test_code_fenced_reply():
+    text = "```json\n" + json.dumps(REPLY, indent=2) + "\n```"
+    assert parse_json_object(text) == REPLY
+
+def test_prose_prefixed_reply_ignores_trailing_text():
+    text = "Sure! Here are the answers:\n" + json.dumps({"a": "b"}) + "\nLet me know {if} you need more."
+    parser, _ = _feed_in_chunks(text, 3)
+    assert parser.result == {"a": "b"} and parser.done
+
+def test_invalid_member_is_reported_and_skipped():
+    parser = IncrementalJSONObjectParser()
+    parser.feed('{"a": tru, "b": 2}')
+    assert parser.result == {"b": 2}
+    assert [field for field, _ in parser.errors] == ["a"]
+
+def test_partially_hinted_pattern_expands_only_unhinted_rows():
+    expected = expected_autofill_fields({"why_0": "Why 1", "why_1": "Why 2"}, [{"prefix": "why", "count": 4}])
+    assert set(expected) == {"why_0", "why_1", "why_2", "why_3"}
+    assert expected["why_0"] == "Why 1"
+    expected = expected_autofill_fields({"problem_1": "P1", "problem_2": "P2"}, [{"prefix": "problem", "count": 4}])
+    assert set(expected) == {"problem_1", "problem_2", "problem_3", "problem_4"}
+    # Column-hinted rows are not single fields, so a partial column pattern is left as hinted
+    expected = expected_autofill_fields({"article_0_0": "Article No."}, [{"prefix": "article", "count": 30}])
+    assert set(expected) == {"article_0_0"}
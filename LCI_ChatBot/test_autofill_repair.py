@@ -0,0 +1,72 @@
+"""
+Tests for the /chatbot/auto-fill repair loop: only missing or invalid fields are re-asked
+"""
+import asyncio
+import json
+import re
+
+import pytest
+
+main = pytest.importorskip("main")
+from autofill_cache import AutofillCache
+
+HINTS = {
+    "name_": "Name",
+    "why_0": "Why? Explore a root cause (1)",
+    "why_1": "Why? Explore a root cause (2)",
+    "intensity_1": "Intensity level for Problem 1",
+}
+
+def requested_fields(messages):
+    """Field names listed under FIELDS TO FILL in an autofill prompt."""
+    prompt = messages[-1]["content"]
+    section = prompt.split("FIELDS TO FILL:", 1)[1].split("\n\n", 1)[0]
+    return re.findall(r"^\s+- (\w+):", section, re.MULTILINE)
+
+@pytest.fixture
+def autofill(monkeypatch, mock_llm):
+    """Run /chatbot/auto-fill with a fresh cache; `replies` are returned by successive LLM calls."""
+    monkeypatch.setattr(main, "autofill_cache", AutofillCache(path=""))
+
+    def run(replies, hints=HINTS, repeated=None, attempts=1):
+        monkeypatch.setattr(main, "AUTOFILL_MAX_REPAIR_ATTEMPTS", attempts)
+        pending = iter(replies)
+        mock_llm.reply = lambda messages: json.dumps(next(pending))
+        request = main.AutoFillRequest(
+            templateKey="ProblemIdentification-Step1",
+            stepDescription="Explore the root causes",
+            ideaDescription="A solar-powered water purifier",
+            fields=[],
+            fieldHints=hints,
+            repeatedFields=repeated or [],
+        )
+        return asyncio.run(main.auto_fill_endpoint(request))
+
+    return run
+
+def test_repair_asks_only_for_missing_and_invalid_fields(autofill, mock_llm):
+    first = {"name_": "Ada", "why_0": "Cost", "why_1": "", "intensity_1": "very"}
+    response = autofill([first, {"why_1": "Access", "intensity_1": "high", "name_": "Changed"}])
+    assert len(mock_llm.calls) == 2
+    assert sorted(requested_fields(mock_llm.calls[1])) == ["intensity_1", "why_1"]
+    assert response.success and not response.missingFields
+    assert response.answers == {"name_": "Ada", "why_0": "Cost", "why_1": "Access", "intensity_1": "high"}
+
+def test_repair_attempts_are_bounded(autofill, mock_llm):
+    response = autofill([{"name_": "Ada"}, {}, {}, {}], attempts=2)
+    assert len(mock_llm.calls) == 3
+    assert response.success and response.answers == {"name_": "Ada"}
+    assert sorted(response.missingFields) == ["intensity_1", "why_0", "why_1"]
+
+def test_no_repair_call_when_first_pass_is_complete(autofill, mock_llm):
+    response = autofill([{"name_": "Ada", "why_0": "Cost", "why_1": "Access", "intensity_1": "low"}])
+    assert len(mock_llm.calls) == 1
+    assert response.success and not response.missingFields
+
+def test_partially_hinted_pattern_re_asks_only_unhinted_rows(autofill, mock_llm):
+    hints = {"why_0": "Why? (1)", "why_1": "Why? (2)"}
+    first = {"why_0": "Cost", "why_1": "Access"}
+    response = autofill([first, {"why_2": "Policy", "why_3": "Habit"}], hints=hints,
+                        repeated=[{"prefix": "why", "count": 4}])
+    assert sorted(requested_fields(mock_llm.calls[1])) == ["why_2", "why_3"]
+    assert response.answers == {"why_0": "Cost", "why_1": "Access", "why_2": "Policy", "why_3": "Habit"}
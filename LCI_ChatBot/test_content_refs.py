@@ -0,0 +1,70 @@
+"""
+Tests for content-addressed request field references
+"""
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import HTTPException
+
+import content_refs
+from content_refs import ContentStore, content_hash, resolve_content_refs
+
+FIELDS = ["stepDescription", "fieldHints"]
+HINTS = {"why_0": "Why? (1)", "why_1": "Why? (2)"}
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    store = ContentStore()
+    monkeypatch.setattr(content_refs, "content_store", store)
+    return store
+
+def request(**fields):
+    return SimpleNamespace(**{"stepDescription": None, "fieldHints": None, "contentRefs": None, **fields})
+
+def test_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash("text") != content_hash("text ")
+
+def test_full_fields_are_stored_and_later_resolved_by_ref():
+    refs = resolve_content_refs(request(stepDescription="Explore root causes", fieldHints=HINTS), FIELDS)
+    assert refs == {"stepDescription": content_hash("Explore root causes"), "fieldHints": content_hash(HINTS)}
+
+    later = request(contentRefs=refs)
+    assert resolve_content_refs(later, FIELDS) == {}
+    assert later.stepDescription == "Explore root causes" and later.fieldHints == HINTS
+
+def test_unknown_ref_asks_for_full_content():
+    refs = {"stepDescription": content_hash("never sent"), "fieldHints": content_hash(HINTS)}
+    resolve_content_refs(request(fieldHints=HINTS), FIELDS)
+    with pytest.raises(HTTPException) as rejected:
+        resolve_content_refs(request(contentRefs=refs), FIELDS)
+    assert rejected.value.status_code == 409
+    assert rejected.value.detail == {"error": "need_full_content", "fields": ["stepDescription"]}
+
+def test_evicted_ref_asks_for_full_content(store):
+    store.max_entries = 1
+    first = resolve_content_refs(request(stepDescription="first"), FIELDS)
+    resolve_content_refs(request(stepDescription="second"), FIELDS)
+    with pytest.raises(HTTPException) as rejected:
+        resolve_content_refs(request(contentRefs=first), FIELDS)
+    assert rejected.value.detail["fields"] == ["stepDescription"]
+
+def test_store_is_bounded_by_bytes():
+    store = ContentStore(max_bytes=100)
+    small = store.put("a" * 40)
+    store.put("b" * 40)
+    store.put("c" * 40)
+    assert store.get(small) == (False, None)
+    assert store.stats()["bytes"] <= 100
+    oversized = store.put("d" * 500)
+    assert store.get(oversized) == (False, None)
+
+def test_pydantic_request_fields_are_replaced():
+    main = pytest.importorskip("main")
+    refs = resolve_content_refs(main.AutoFillRequest(templateKey="T", fields=[], stepDescription="Step",
+                                                     fieldHints=HINTS), main.AUTOFILL_CONTENT_REF_FIELDS)
+    later = main.AutoFillRequest(templateKey="T", fields=[], contentRefs=refs)
+    resolve_content_refs(later, main.AUTOFILL_CONTENT_REF_FIELDS)
+    assert later.stepDescription == "Step" and later.fieldHints == HINTS
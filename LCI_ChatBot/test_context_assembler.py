@@ -0,0 +1,39 @@
+"""
+Tests for token-budgeted context assembly
+"""
+import pytest
+
+context_assembler = pytest.importorskip("context_assembler")
+from context_assembler import TRUNCATION_MARKER, ContextAssembler, count_tokens
+
+@pytest.fixture(autouse=True)
+def small_truncation_floor(monkeypatch):
+    monkeypatch.setattr(context_assembler, "CONTEXT_MIN_TRUNCATED_TOKENS", 10)
+
+def test_truncated_section_and_marker_stay_within_the_budget():
+    assembler = ContextAssembler(budget_tokens=100)
+    assembler.add("question", "How do I validate the problem? " * 8, priority=1, truncatable=False)
+    assembler.add("book", " ".join(f"chunk{i} about stakeholders" for i in range(200)), priority=5)
+    texts, report = assembler.assemble()
+
+    assert report["kept"] == ["question", "book"]
+    assert texts[1].endswith(TRUNCATION_MARKER)
+    assert sum(count_tokens(text) for text in texts) <= 100
+    assert report["used_tokens"] == sum(count_tokens(text) for text in texts)
+    assert report["dropped"][0]["reason"] == "truncated"
+
+def test_sections_that_fit_are_kept_whole_in_insertion_order():
+    assembler = ContextAssembler(budget_tokens=1000)
+    assembler.add("book", "Lean Canvas chunk", priority=5)
+    assembler.add("question", "What is a stakeholder?", priority=1)
+    texts, report = assembler.assemble()
+    assert texts == ["Lean Canvas chunk", "What is a stakeholder?"]
+    assert report["dropped"] == []
+
+def test_section_is_dropped_when_too_little_room_is_left():
+    assembler = ContextAssembler(budget_tokens=20)
+    assembler.add("question", "word " * 12, priority=1, truncatable=False)
+    assembler.add("book", "another chunk " * 50, priority=5)
+    texts, report = assembler.assemble()
+    assert report["kept"] == ["question"]
+    assert [(d["name"], d["reason"]) for d in report["dropped"]] == [("book", "over_budget")]
@@ -0,0 +1,45 @@
+"""
+Tests for per-source deadlines and the bounded pool for blocking context sources
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+context_sources = pytest.importorskip("context_sources")
+from context_sources import ContextSourceMetrics, fetch_context_sources, run_blocking_source
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A two-thread source pool and fresh metrics."""
+    monkeypatch.setattr(context_sources, "CONTEXT_SOURCE_MAX_THREADS", 2)
+    monkeypatch.setattr(context_sources, "_source_executor", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(context_sources, "_source_slots", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(context_sources, "context_source_metrics", ContextSourceMetrics())
+    release = threading.Event()
+    yield release
+    release.set()
+
+def test_missed_deadline_only_drops_that_source(pool):
+    sources = {
+        "slow": (lambda: run_blocking_source(pool.wait, 5), 0.05),
+        "fast": (lambda: run_blocking_source(lambda: "chunks"), 1.0),
+    }
+    assert asyncio.run(fetch_context_sources(sources)) == {"slow": None, "fast": "chunks"}
+    stats = context_sources.context_source_metrics.stats()
+    assert stats["slow"]["timeouts"] == 1 and stats["fast"]["timeouts"] == 0
+
+def test_abandoned_calls_cannot_take_more_than_the_pool(pool):
+    stuck = {f"stuck{i}": (lambda: run_blocking_source(pool.wait, 5), 0.05) for i in range(2)}
+    asyncio.run(fetch_context_sources(stuck))
+    # Both threads are still blocked, so a new source fails at once instead of queueing
+    result = asyncio.run(fetch_context_sources({"search": (lambda: run_blocking_source(lambda: "chunks"), 1.0)}))
+    assert result == {"search": None}
+    assert context_sources.context_source_metrics.stats()["search"]["errors"] == 1
+
+    pool.set()
+    context_sources._source_executor.shutdown(wait=True)
+    context_sources._source_executor = ThreadPoolExecutor(max_workers=2)
+    result = asyncio.run(fetch_context_sources({"search": (lambda: run_blocking_source(lambda: "chunks"), 1.0)}))
+    assert result == {"search": "chunks"}
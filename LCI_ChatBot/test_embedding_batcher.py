@@ -0,0 +1,71 @@
+"""
+Tests for micro-batching of query embeddings: batches close on max_size or max_wait
+"""
+import threading
+import time
+
+import pytest
+
+embedding_batcher = pytest.importorskip("embedding_batcher")
+from embedding_batcher import EmbeddingBatcher
+
+class Model:
+    """Fake SentenceTransformer recording each batch it encodes."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def encode(self, texts, batch_size):
+        with self.lock:
+            self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [f"vector:{text}" for text in texts]
+
+def submit_all(batcher, texts):
+    return [batcher.submit(text) for text in texts]
+
+def test_full_batch_is_encoded_without_waiting():
+    model = Model()
+    batcher = EmbeddingBatcher(lambda: model, max_size=4, max_wait_ms=10_000)
+    started = time.monotonic()
+    futures = submit_all(batcher, ["a", "b", "c", "d"])
+    assert [f.result(timeout=2) for f in futures] == ["vector:a", "vector:b", "vector:c", "vector:d"]
+    assert time.monotonic() - started < 2
+    assert sorted(sum(model.batches, [])) == ["a", "b", "c", "d"]
+
+def test_partial_batch_is_encoded_after_max_wait():
+    model = Model()
+    batcher = EmbeddingBatcher(lambda: model, max_size=32, max_wait_ms=100)
+    started = time.monotonic()
+    assert batcher.encode("a") == "vector:a"
+    assert time.monotonic() - started >= 0.09
+    assert model.batches == [["a"]]
+
+def test_queries_arriving_within_the_window_share_a_batch():
+    model = Model()
+    batcher = EmbeddingBatcher(lambda: model, max_size=32, max_wait_ms=200)
+    futures = submit_all(batcher, ["a", "b", "c"])
+    assert [f.result(timeout=2) for f in futures] == ["vector:a", "vector:b", "vector:c"]
+    assert model.batches == [["a", "b", "c"]]
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["batch_size"]["le"]["4"] == 1
+
+def test_overflow_is_split_into_max_size_batches():
+    model = Model()
+    batcher = EmbeddingBatcher(lambda: model, max_size=4, max_wait_ms=50)
+    with batcher._cond:
+        # Queue everything before the worker can take the first item
+        futures = submit_all(batcher, list("abcdef"))
+    assert [f.result(timeout=2) for f in futures] == [f"vector:{t}" for t in "abcdef"]
+    assert [len(batch) for batch in model.batches] == [4, 2]
+
+def test_model_error_fails_every_caller_in_the_batch():
+    batcher = EmbeddingBatcher(lambda: Model(fail=True), max_size=2, max_wait_ms=10_000)
+    futures = submit_all(batcher, ["a", "b"])
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=2)
+    assert batcher.stats()["errors"] == 1
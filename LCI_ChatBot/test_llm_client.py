@@ -0,0 +1,118 @@
+"""
+Tests for single-flight coalescing and hedging of LLM requests
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+import llm_client
+from llm_client import RequestHedger, SingleFlight
+
+class Upstream:
+    """Fake provider call: counts calls and cancellations, answers after `delay` seconds."""
+
+    def __init__(self, delays=(0.05,)):
+        self.delays = list(delays)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        call = self.calls
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"answer {call}"
+
+def test_concurrent_identical_requests_share_one_upstream_call():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", upstream) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["answer 1"] * 10
+    assert upstream.calls == 1
+    assert flight.stats() == {"in_flight": 0, "upstream_calls": 1, "coalesced_hits": 9}
+
+def test_finished_call_is_not_reused():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def run():
+        return [await flight.do("key", upstream), await flight.do("key", upstream)]
+
+    assert asyncio.run(run()) == ["answer 1", "answer 2"]
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight, upstream = SingleFlight(), Upstream()
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("key", upstream))
+        second = asyncio.ensure_future(flight.do("key", upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "answer 1"
+    assert upstream.calls == 1 and upstream.cancelled == 0
+
+def test_upstream_error_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(run())] == ["provider down"] * 3
+
+@pytest.fixture
+def hedger(monkeypatch):
+    """Hedging enabled, hedging after the median of 100 recent 10 ms latencies."""
+    monkeypatch.setattr(llm_client, "LLM_HEDGING_ENABLED", True)
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_PERCENTILE", 50)
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_MIN_SAMPLES", 20)
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_MAX_RATE", 1.0)
+    hedger = RequestHedger()
+    hedger.latencies.extend([0.01] * 100)
+    return hedger
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled(hedger):
+    upstream = Upstream(delays=[1.0, 0.01])
+    assert asyncio.run(hedger.run(upstream)) == "answer 2"
+    assert upstream.calls == 2 and upstream.cancelled == 1
+    assert hedger.stats()["hedges_fired"] == 1 and hedger.hedge_wins == 1
+
+def test_fast_primary_is_not_hedged(hedger):
+    upstream = Upstream(delays=[0.0])
+    assert asyncio.run(hedger.run(upstream)) == "answer 1"
+    assert upstream.calls == 1 and hedger.hedges_fired == 0
+
+def test_caller_can_refuse_the_hedge(hedger):
+    upstream = Upstream(delays=[0.05])
+    assert asyncio.run(hedger.run(upstream, can_hedge=lambda: False)) == "answer 1"
+    assert upstream.calls == 1
+
+def test_hedges_are_capped_at_the_max_rate(hedger, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_MAX_RATE", 0.25)
+    upstream = Upstream(delays=[0.05])
+
+    async def run():
+        for _ in range(8):
+            await hedger.run(upstream)
+
+    asyncio.run(run())
+    assert hedger.requests == 8 and hedger.hedges_fired == 2
+    assert upstream.calls == 10
+
+def test_no_hedging_without_enough_samples(hedger):
+    hedger.latencies.clear()
+    hedger.latencies.extend([0.01] * 5)
+    assert hedger.hedge_delay() is None
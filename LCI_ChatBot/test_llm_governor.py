@@ -0,0 +1,146 @@
+"""
+Tests for the outbound LLM governor: circuit breaker, retries and admission control
+"""
+import asyncio
+import time
+
+import pytest
+
+fastapi = pytest.importorskip("fastapi")
+from fastapi import HTTPException
+
+import llm_governor
+from llm_governor import CircuitBreaker, LLMGovernor, LLMResponseError
+
+@pytest.fixture
+def governor(monkeypatch):
+    monkeypatch.setattr(llm_governor, "LLM_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(llm_governor, "LLM_MAX_RETRIES", 2)
+    governor = LLMGovernor()
+    governor.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    return governor
+
+class Provider:
+    """Fake upstream call failing with the given statuses, then answering."""
+
+    def __init__(self, *statuses, headers=None):
+        self.statuses = list(statuses)
+        self.headers = headers
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.statuses:
+            raise HTTPException(status_code=self.statuses.pop(0), detail="upstream error", headers=self.headers)
+        return "answer"
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()   # only one trial at a time
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.times_opened == 2
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.consecutive_failures == 0
+
+def test_open_circuit_rejects_with_retry_after(governor):
+    provider = Provider(503, 503, 503)
+    # The second failure opens the circuit, so the retry after it is rejected without a call
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(governor.run(provider, 10))
+    assert rejected.value.status_code == 503 and rejected.value.headers == {"Retry-After": "1"}
+    assert provider.calls == 2 and governor.breaker.state == "open"
+
+    with pytest.raises(HTTPException):
+        asyncio.run(governor.run(provider, 10))
+    assert provider.calls == 2 and governor.stats()["rejected_circuit_open"] == 2
+
+def test_retryable_failure_is_retried_until_success(governor):
+    governor.breaker.failure_threshold = 5
+    provider = Provider(429, 502)
+    assert asyncio.run(governor.run(provider, 10)) == "answer"
+    assert provider.calls == 3 and governor.retries == 2
+    assert governor.breaker.state == "closed"
+
+def test_retries_honor_retry_after(governor):
+    provider = Provider(429, headers={"Retry-After": "0.2"})
+    started = time.monotonic()
+    assert asyncio.run(governor.run(provider, 10)) == "answer"
+    assert time.monotonic() - started >= 0.2
+
+def test_retry_after_is_capped(governor, monkeypatch):
+    monkeypatch.setattr(llm_governor, "LLM_RETRY_MAX_DELAY", 0.05)
+    error = HTTPException(status_code=429, headers={"Retry-After": "120"})
+    assert governor._retry_delay(0, error) == 0.05
+
+def test_non_retryable_answers_are_not_retried_and_count_as_success(governor):
+    governor.breaker.record_failure()
+    for error in (Provider(400), Provider(401)):
+        with pytest.raises(HTTPException):
+            asyncio.run(governor.run(error, 10))
+        assert error.calls == 1
+
+    async def malformed():
+        raise LLMResponseError("no choices in response")
+
+    with pytest.raises(LLMResponseError):
+        asyncio.run(governor.run(malformed, 10))
+    assert governor.retries == 0 and governor.breaker.consecutive_failures == 0
+
+def test_full_queue_is_rejected(governor, monkeypatch):
+    monkeypatch.setattr(llm_governor, "LLM_MAX_QUEUE", 1)
+    governor.rpm_bucket.tokens = 0
+
+    async def run():
+        waiter = asyncio.ensure_future(governor.admit(10, time.monotonic() + 60))
+        await asyncio.sleep(0.01)
+        try:
+            with pytest.raises(HTTPException) as rejected:
+                await governor.admit(10, time.monotonic() + 60)
+            return rejected.value
+        finally:
+            waiter.cancel()
+
+    rejected = asyncio.run(run())
+    assert rejected.status_code == 429
+    assert governor.stats()["rejected_queue_full"] == 1 and governor.waiting == 0
+
+def test_caller_is_rejected_once_capacity_would_miss_its_deadline(governor):
+    governor.rpm_bucket.tokens = 0
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(governor.admit(10, time.monotonic() + 0.01))
+    assert rejected.value.status_code == 503
+    assert governor.stats()["rejected_deadline"] == 1
+
+def test_try_admit_only_takes_free_capacity(governor):
+    assert governor.try_admit(10)
+    governor.rpm_bucket.tokens = 0
+    assert not governor.try_admit(10)
+
+@pytest.mark.parametrize("status, state", [(400, "closed"), (503, "open")])
+def test_stream_resolves_a_half_open_trial(monkeypatch, status, state):
+    httpx = pytest.importorskip("httpx")
+    main = pytest.importorskip("main")
+    import llm_client
+    transport = httpx.MockTransport(lambda request: httpx.Response(status, text="upstream error"))
+    monkeypatch.setattr(llm_client, "_client_cache", httpx.AsyncClient(transport=transport))
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    monkeypatch.setattr(main.llm_governor, "breaker", breaker)
+    breaker.record_failure()
+
+    async def consume():
+        return [delta async for delta in main.stream_llm("mistral", [{"role": "user", "content": "hi"}])]
+
+    with pytest.raises(HTTPException) as failure:
+        asyncio.run(consume())
+    assert failure.value.status_code == status
+    assert breaker.state == state
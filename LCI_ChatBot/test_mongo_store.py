@@ -0,0 +1,159 @@
+"""
+Tests for the MongoDB context store and its read-through document cache, against mongomock
+"""
+import asyncio
+import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+pymongo_errors = pytest.importorskip("pymongo.errors")
+from bson import ObjectId
+
+import context_sources
+from mongo_store import TEMPLATE_PROJECTION, MongoContextStore
+
+CANVAS_ID = ObjectId()
+T0 = datetime.datetime(2026, 1, 1)
+T1 = datetime.datetime(2026, 1, 2)
+
+class RecordingCollection:
+    def __init__(self, database, name):
+        self._database = database
+        self._name = name
+        self._coll = database.db[name]
+
+    def _record(self, query, projection, options):
+        self._database.calls.append((self._name, query, projection, options))
+        if self._database.timeout and options.get("max_time_ms"):
+            raise pymongo_errors.ExecutionTimeout("operation exceeded time limit")
+
+    def find_one(self, query, projection=None, **options):
+        self._record(query, projection, options)
+        return self._coll.find_one(query, projection)
+
+    def find(self, query, projection=None, **options):
+        self._record(query, projection, options)
+        return self._coll.find(query, projection)
+
+class ChangeStream:
+    def __init__(self, events):
+        self._events = iter(events)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._events)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class RecordingDatabase:
+    """mongomock database that records every query and can replay change-stream events."""
+
+    def __init__(self):
+        self.db = mongomock.MongoClient().startovate
+        self.calls = []
+        self.events = []
+        self.timeout = False
+
+    def __getitem__(self, name):
+        return RecordingCollection(self, name)
+
+    def watch(self, pipeline):
+        return ChangeStream(self.events)
+
+@pytest.fixture
+def database():
+    database = RecordingDatabase()
+    database.db.canvases.insert_one({
+        "_id": CANVAS_ID, "researchTitle": "Solar purifier", "authorName": "Ada",
+        "components": [{"name": "Problem", "status": "done", "notes": "x" * 1000}],
+        "ownerEmail": "ada@example.com", "updatedAt": T0,
+    })
+    database.db.templates.insert_one({
+        "templateId": "why", "canvasId": CANVAS_ID, "componentName": "Problem",
+        "content": {"why_0": "Cost"}, "history": ["old"] * 50, "updatedAt": T0,
+    })
+    return database
+
+@pytest.fixture
+def store(database):
+    return MongoContextStore(database=database)
+
+def template_queries(database):
+    return [call for call in database.calls if call[0] == "templates" and call[2] == TEMPLATE_PROJECTION]
+
+def test_only_projected_fields_are_fetched(store, database):
+    template = asyncio.run(store.get_template("why", str(CANVAS_ID)))
+    assert set(template) <= set(TEMPLATE_PROJECTION) | {"_id"}
+    assert template["content"] == {"why_0": "Cost"} and "history" not in template
+    assert database.calls[0][1] == {"templateId": "why", "canvasId": CANVAS_ID}
+
+    digest = asyncio.run(store.get_canvas_digest(str(CANVAS_ID)))
+    assert "Solar purifier" in digest and "ada@example.com" not in digest
+
+def test_cache_hit_then_miss_after_update(store, database):
+    first = asyncio.run(store.get_template("why", str(CANVAS_ID)))
+    assert asyncio.run(store.get_template("why", str(CANVAS_ID))) == first
+    assert len(database.calls) == 1 and store.cache.stats()["hits"] == 1
+
+    # Past the TTL an unchanged document is revalidated by its updatedAt stamp only
+    store.cache.ttl_seconds = 0
+    assert asyncio.run(store.get_template("why", str(CANVAS_ID))) == first
+    assert len(template_queries(database)) == 1 and store.cache.revalidated == 1
+
+    database.db.templates.update_one({"templateId": "why"}, {"$set": {"content": {"why_0": "Access"}, "updatedAt": T1}})
+    updated = asyncio.run(store.get_template("why", str(CANVAS_ID)))
+    assert updated["content"] == {"why_0": "Access"}
+    assert len(template_queries(database)) == 2
+
+def test_fresh_entries_are_served_until_the_ttl_expires(store, database):
+    asyncio.run(store.get_template("why", str(CANVAS_ID)))
+    database.db.templates.update_one({"templateId": "why"}, {"$set": {"content": {"why_0": "Access"}, "updatedAt": T1}})
+    assert asyncio.run(store.get_template("why", str(CANVAS_ID)))["content"] == {"why_0": "Cost"}
+    store.cache.ttl_seconds = 0
+    assert asyncio.run(store.get_template("why", str(CANVAS_ID)))["content"] == {"why_0": "Access"}
+
+def test_digest_is_rebuilt_when_a_template_is_added(store, database):
+    store.digests.ttl_seconds = 0
+    asyncio.run(store.get_canvas_digest(str(CANVAS_ID)))
+    asyncio.run(store.get_canvas_digest(str(CANVAS_ID)))
+    assert store.digests.revalidated == 1 and store.digests.misses == 1
+    database.db.templates.insert_one({"templateId": "who", "canvasId": CANVAS_ID, "content": {}, "updatedAt": T0})
+    asyncio.run(store.get_canvas_digest(str(CANVAS_ID)))
+    assert store.digests.misses == 2
+
+def test_change_stream_event_invalidates_cached_documents(store, database):
+    template = asyncio.run(store.get_template("why", str(CANVAS_ID)))
+    asyncio.run(store.get_canvas_digest(str(CANVAS_ID)))
+    database.events = [{"operationType": "update", "documentKey": {"_id": template["_id"]}}]
+    asyncio.run(store._watch_changes())
+    assert store.cache.stats()["entries"] == 0 and store.digests.stats()["entries"] == 0
+
+    asyncio.run(store.get_template("why", str(CANVAS_ID)))
+    assert len(template_queries(database)) == 3   # first fetch, digest build, refetch
+
+def test_inserted_template_invalidates_its_canvas_digest(store, database):
+    asyncio.run(store.get_canvas_digest(str(CANVAS_ID)))
+    database.events = [{"operationType": "insert", "documentKey": {"_id": ObjectId()},
+                        "fullDocument": {"canvasId": CANVAS_ID}}]
+    asyncio.run(store._watch_changes())
+    assert store.digests.stats()["entries"] == 0
+
+def test_server_time_limit_drops_the_source_and_caches_nothing(store, database):
+    database.timeout = True
+    sources = {"template": (lambda: store.get_template("why", str(CANVAS_ID), max_time_ms=50), 1.0)}
+    assert asyncio.run(context_sources.fetch_context_sources(sources)) == {"template": None}
+    assert database.calls[0][3] == {"max_time_ms": 50}
+    assert store.cache.stats()["entries"] == 0
+
+    database.timeout = False
+    assert asyncio.run(store.get_template("why", str(CANVAS_ID), max_time_ms=50))["content"] == {"why_0": "Cost"}
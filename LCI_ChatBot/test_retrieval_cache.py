@@ -0,0 +1,99 @@
+"""
+Tests for the query-embedding and search-result caches: stale-while-revalidate and version invalidation
+"""
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from retrieval_cache import QueryEmbeddingCache, SearchResultCache, normalize_query
+
+VECTOR = np.arange(4, dtype=np.float32)
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def cache_at(version, **kwargs):
+    cache = SearchResultCache(**kwargs)
+    cache.set_version(version)
+    return cache, SearchResultCache.make_key(VECTOR, 3, 0.5, {"source": "book"}, version)
+
+def test_fresh_entry_is_served_without_refresh():
+    cache, key = cache_at("v1")
+    refresh = lambda: pytest.fail("fresh entries are not refreshed")
+    assert cache.get(key, refresh) is None
+    cache.put(key, ["chunk"])
+    assert cache.get(key, refresh) == ["chunk"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_key_covers_every_search_parameter():
+    key = SearchResultCache.make_key(VECTOR, 3, 0.5, {"a": 1, "b": 2}, "v1")
+    assert key == SearchResultCache.make_key(VECTOR.copy(), 3, 0.5, {"b": 2, "a": 1}, "v1")
+    assert key != SearchResultCache.make_key(VECTOR, 5, 0.5, {"a": 1, "b": 2}, "v1")
+    assert key != SearchResultCache.make_key(VECTOR + 1, 3, 0.5, {"a": 1, "b": 2}, "v1")
+
+def test_stale_entry_is_served_once_while_a_single_refresh_runs():
+    cache, key = cache_at("v1", ttl_seconds=0.01, stale_seconds=60)
+    cache.put(key, ["old"])
+    time.sleep(0.02)
+    release, calls = threading.Event(), []
+
+    def refresh():
+        calls.append(1)
+        release.wait(2)
+        return ["new"]
+
+    assert cache.get(key, refresh) == ["old"]
+    assert cache.get(key, refresh) == ["old"]   # refresh already in flight
+    release.set()
+    assert wait_for(lambda: cache.stats()["refreshes"] == 1)
+    assert len(calls) == 1
+    cache.ttl_seconds = 60
+    assert cache.get(key, refresh) == ["new"]
+    assert cache.stats()["stale_hits"] == 2 and cache.stats()["hits"] == 1
+
+def test_failed_refresh_keeps_the_stale_entry():
+    cache, key = cache_at("v1", ttl_seconds=0.01, stale_seconds=60)
+    cache.put(key, ["old"])
+    time.sleep(0.02)
+
+    def refresh():
+        raise RuntimeError("qdrant down")
+
+    assert cache.get(key, refresh) == ["old"]
+    assert wait_for(lambda: cache.stats()["refresh_errors"] == 1)
+    assert cache.get(key, refresh) == ["old"]
+
+def test_entry_past_the_stale_window_is_a_miss():
+    cache, key = cache_at("v1", ttl_seconds=0.01, stale_seconds=0.02)
+    cache.put(key, ["old"])
+    time.sleep(0.03)
+    assert cache.get(key, lambda: pytest.fail("expired entries are not refreshed")) is None
+    assert cache.stats()["entries"] == 0
+
+def test_version_bump_invalidates_entries():
+    cache, key = cache_at("v1")
+    cache.put(key, ["old"])
+    cache.set_version("v1")
+    assert cache.stats()["entries"] == 1
+    cache.set_version("v2")
+    assert cache.stats()["entries"] == 0 and cache.stats()["invalidations"] == 1
+    # A search computed against the old version can no longer be stored
+    cache.put(key, ["old"])
+    assert cache.get(key, lambda: None) is None
+
+def test_query_embedding_cache_is_lru_on_normalized_text():
+    assert normalize_query("  What IS   the LCI?\n") == "what is the lci?"
+    cache = QueryEmbeddingCache(max_entries=2)
+    cache.put("a", VECTOR)
+    cache.put("b", VECTOR)
+    assert cache.get("a") is VECTOR
+    cache.put("c", VECTOR)
+    assert cache.get("b") is None and cache.get("a") is VECTOR
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,56 @@
+"""
+Tests for the semantic answer cache on /chat: first turns share answers, follow-ups never do
+"""
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+main = pytest.importorskip("main")
+from semantic_cache import SemanticAnswerCache
+from session_store import ChatSessionStore
+
+@pytest.fixture
+def chat(monkeypatch, mock_llm):
+    """Knowledge-only /chat with a fresh cache and session store; every query embeds to the same vector."""
+    monkeypatch.setattr(main, "SEARCH_AVAILABLE", True)
+    monkeypatch.setattr(main, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(main, "semantic_cache", SemanticAnswerCache())
+    monkeypatch.setattr(main, "chat_sessions", ChatSessionStore(path=""))
+    monkeypatch.setattr(main, "embed_query", lambda query: np.ones(384, dtype=np.float32), raising=False)
+    monkeypatch.setattr(main, "search_chunks_sentence_transformer", lambda query, top_k=3, **kwargs: [], raising=False)
+    answers = iter(f"answer {i}" for i in range(100))
+    mock_llm.reply = lambda messages: next(answers)
+
+    def ask(**fields):
+        async def run():
+            try:
+                return await main.chat_endpoint(main.ChatRequest(**fields))
+            finally:
+                await main.conversation_summarizer.stop()
+        return asyncio.run(run())
+
+    return ask
+
+def test_first_question_from_another_user_is_a_cache_hit(chat, mock_llm):
+    first = chat(query="What is the Lean Canvas for Invention?", userId="alice")
+    second = chat(query="What is the Lean Canvas for Invention?", userId="bob")
+    assert not first.cached
+    assert second.cached and second.answer == first.answer
+    assert len(mock_llm.calls) == 1
+
+def test_follow_up_in_own_session_skips_the_cache(chat, mock_llm):
+    chat(query="What is the Lean Canvas for Invention?", userId="alice")
+    follow_up = chat(query="Can you elaborate?", userId="alice")
+    assert not follow_up.cached
+    assert len(mock_llm.calls) == 2
+
+def test_client_follow_up_flag_decides(chat, mock_llm):
+    chat(query="What is the Lean Canvas for Invention?", userId="alice")
+    assert not chat(query="Can you elaborate?", userId="bob", isFollowUp=True).cached
+    assert chat(query="What is the Lean Canvas for Invention?", userId="alice", isFollowUp=False).cached
+
+def test_anonymous_requests_do_not_use_the_shared_default_session(chat, mock_llm):
+    chat(query="What is the Lean Canvas for Invention?", userId="alice")
+    anonymous = chat(query="What is the Lean Canvas for Invention?")
+    assert not anonymous.cached
@@ -0,0 +1,89 @@
+"""
+Tests for the tiered chat session store: LRU/TTL eviction and spill to SQLite
+"""
+from types import SimpleNamespace
+
+import pytest
+
+session_store = pytest.importorskip("session_store")
+from session_store import ChatSessionStore
+
+def message(text):
+    return {"role": "user", "content": text}
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the store."""
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(session_store, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+def test_least_recently_used_session_is_evicted():
+    store = ChatSessionStore(stripes=1, max_sessions=2, path="")
+    store.append("alice", [message("a")])
+    store.append("bob", [message("b")])
+    store.get_messages("alice")
+    store.append("carol", [message("c")])
+    assert store.get_messages("bob") == []
+    assert store.get_messages("alice") == [message("a")]
+    assert store.stats()["hot_sessions"] == 2
+
+def test_byte_cap_evicts_but_keeps_the_active_session():
+    store = ChatSessionStore(stripes=1, max_bytes=1000, path="")
+    store.append("alice", [message("a" * 400)])
+    store.append("bob", [message("b" * 400)])
+    assert store.get_messages("alice") == []
+    store.append("bob", [message("b" * 5000)])
+    assert len(store.get_messages("bob")) == 2
+    assert store.stats()["hot_bytes"] > 1000
+
+def test_evicted_session_is_spilled_and_reloaded(tmp_path):
+    store = ChatSessionStore(stripes=1, max_sessions=1, path=str(tmp_path / "sessions.sqlite3"))
+    store.append("alice", [message("a")])
+    assert store.fold("alice", [], "summary")
+    store.append("alice", [message("b")])
+    store.append("bob", [message("c")])
+    assert store.stats()["spilled"] == 1 and store.stats()["hot_sessions"] == 1
+
+    assert store.get_session("alice") == ("summary", [message("a"), message("b")])
+    stats = store.stats()
+    assert stats["reloaded"] == 1 and stats["spilled"] == 2   # bob made room for alice
+
+def test_flushed_sessions_survive_a_restart(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = ChatSessionStore(path=path)
+    store.append("alice", [message("a")])
+    store.flush()
+    assert ChatSessionStore(path=path).get_messages("alice") == [message("a")]
+
+def test_idle_sessions_expire_from_the_hot_tier(clock):
+    store = ChatSessionStore(stripes=1, ttl_seconds=60, path="")
+    store.append("alice", [message("a")])
+    clock.now += 30
+    store.append("bob", [message("b")])
+    clock.now += 31
+    assert store.get_messages("alice") == []
+    assert store.get_messages("bob") == [message("b")]
+    assert store.stats()["expired"] == 1
+
+def test_idle_sessions_expire_from_the_spill_file(tmp_path, clock):
+    store = ChatSessionStore(stripes=1, max_sessions=1, ttl_seconds=60, path=str(tmp_path / "sessions.sqlite3"))
+    store.append("alice", [message("a")])
+    store.append("bob", [message("b")])
+    clock.now += 61
+    assert store.get_messages("alice") == []
+    assert store.stats()["reloaded"] == 0 and store.stats()["expired"] >= 1
+
+def test_session_length_is_capped(monkeypatch):
+    monkeypatch.setattr(session_store, "SESSION_MAX_MESSAGES", 3)
+    store = ChatSessionStore(path="")
+    store.append("alice", [message(str(i)) for i in range(5)])
+    assert store.get_messages("alice") == [message("2"), message("3"), message("4")]
+
+def test_fold_only_applies_to_the_current_history():
+    store = ChatSessionStore(path="")
+    store.append("alice", [message("a"), message("b"), message("c")])
+    assert not store.fold("alice", [message("b")], "stale")
+    assert store.fold("alice", [message("a"), message("b")], "summary of a and b")
+    assert store.get_session("alice") == ("summary of a and b", [message("c")])
+    assert not store.fold("nobody", [], "summary")
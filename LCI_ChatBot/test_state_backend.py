@@ -0,0 +1,83 @@
+"""
+Tests for the Redis state backend and its write-behind buffer, against fakeredis
+"""
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+from state_backend import RedisAutofillContextStore, RedisChatSessionStore, WriteBehindBuffer
+
+MESSAGES_KEY = "lci:chat:alice:messages"
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+def make_sessions(client, interval=60, max_batch=200, ttl_seconds=3600):
+    writer = WriteBehindBuffer(client, interval=interval, max_batch=max_batch)
+    return RedisChatSessionStore(client, writer, ttl_seconds=ttl_seconds), writer
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_writes_are_flushed_on_the_interval(client):
+    sessions, writer = make_sessions(client, interval=0.02)
+    sessions.append("alice", [{"role": "user", "content": "hi"}])
+    assert wait_for(lambda: client.llen(MESSAGES_KEY) == 1)
+    assert writer.stats()["batches"] == 1
+    writer.stop()
+
+def test_a_full_batch_is_flushed_early(client):
+    sessions, writer = make_sessions(client, max_batch=2)
+    sessions.append("alice", [{"role": "user", "content": "one"}])
+    sessions.append("alice", [{"role": "assistant", "content": "two"}])
+    assert wait_for(lambda: client.llen(MESSAGES_KEY) == 2)
+    writer.stop()
+
+def test_pending_writes_are_flushed_on_shutdown(client):
+    sessions, writer = make_sessions(client)
+    sessions.append("alice", [{"role": "user", "content": "hi"}])
+    time.sleep(0.05)
+    assert client.llen(MESSAGES_KEY) == 0
+    writer.stop()
+    assert client.llen(MESSAGES_KEY) == 1
+    assert writer.stats() == {"queued": 0, "batches": 1, "writes": 1, "failures": 0}
+
+def test_reads_see_own_queued_writes(client):
+    sessions, writer = make_sessions(client)
+    sessions.append("alice", [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}])
+    assert sessions.get_session("alice") == ("", [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+    ])
+    assert sessions.get_messages("bob") == []
+
+    contexts = RedisAutofillContextStore(client, writer)
+    contexts.put("alice", "canvas-1", "ProblemIdentification-Step1", {"why_0": "Cost"})
+    template_key, text = contexts.get("alice", "canvas-1")
+    assert template_key == "ProblemIdentification-Step1" and "Cost" in text
+    writer.stop()
+
+def test_fold_replaces_the_leading_messages_with_a_summary(client):
+    sessions, writer = make_sessions(client)
+    turns = [{"role": "user", "content": str(i)} for i in range(4)]
+    sessions.append("alice", turns)
+    assert sessions.fold("alice", turns[:2], "summary of 0 and 1")
+    assert sessions.get_session("alice") == ("summary of 0 and 1", turns[2:])
+    assert not sessions.fold("alice", turns[:2], "stale")
+    writer.stop()
+
+def test_sessions_expire_after_inactivity(client):
+    sessions, writer = make_sessions(client, ttl_seconds=1)
+    sessions.append("alice", [{"role": "user", "content": "hi"}])
+    writer.flush()
+    assert 0 < client.ttl(MESSAGES_KEY) <= 1
+    time.sleep(1.1)
+    assert sessions.get_session("alice") == ("", [])
+    writer.stop()
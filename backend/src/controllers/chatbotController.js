@@ -1,4 +1,5 @@
 const axios = require("axios");
+const crypto = require("crypto");
 const mongoose = require("mongoose");
 const StepDescription = require("../models/StepDescriptions");
 const Canvas = require("../models/Canvas");
@@ -30,6 +31,85 @@ const parseTemplateKey = (templateKey) => {
   return { componentName, stepNumber };
 };
 
+// Large payload fields the chatbot can receive as a content hash once it has seen them
+const CONTENT_REF_FIELDS = ["stepDescription", "ideaDescription", "fieldHints", "currentAnswers"];
+const MAX_KNOWN_CONTENT_REFS = 5000;
+// Hashes the chatbot has confirmed it stores, oldest first
+const knownContentRefs = new Set();
+
+/**
+ * JSON with sorted keys and no whitespace - must match canonical_json in LCI_ChatBot/content_refs.py
+ */
+const canonicalJson = (value) => {
+  if (Array.isArray(value)) {
+    return `[${value.map(canonicalJson).join(",")}]`;
+  }
+  if (value && typeof value === "object") {
+    const entries = Object.keys(value)
+      .sort()
+      .map((key) => `${JSON.stringify(key)}:${canonicalJson(value[key])}`);
+    return `{${entries.join(",")}}`;
+  }
+  return JSON.stringify(value);
+};
+
+const contentRef = (value) =>
+  "sha256:" + crypto.createHash("sha256").update(canonicalJson(value), "utf8").digest("hex");
+
+const rememberContentRefs = (refs) => {
+  for (const ref of Object.values(refs || {})) {
+    knownContentRefs.delete(ref);
+    knownContentRefs.add(ref);
+    if (knownContentRefs.size > MAX_KNOWN_CONTENT_REFS) {
+      knownContentRefs.delete(knownContentRefs.values().next().value);
+    }
+  }
+};
+
+/**
+ * Replace fields the chatbot already holds with their hash under `contentRefs`
+ */
+const compactPayload = (payload) => {
+  const compact = { ...payload };
+  const contentRefs = {};
+  for (const field of CONTENT_REF_FIELDS) {
+    if (payload[field] === undefined || payload[field] === null) continue;
+    const ref = contentRef(payload[field]);
+    if (knownContentRefs.has(ref)) {
+      contentRefs[field] = ref;
+      delete compact[field];
+    }
+  }
+  if (Object.keys(contentRefs).length > 0) {
+    compact.contentRefs = contentRefs;
+  }
+  return compact;
+};
+
+/**
+ * POST to the chatbot sending known fields by hash; resend in full if it answers "need_full_content"
+ */
+const postWithContentRefs = async (url, payload, options) => {
+  const compact = compactPayload(payload);
+  try {
+    const response = await axios.post(url, compact, options);
+    rememberContentRefs(response.data?.contentRefs);
+    return response;
+  } catch (error) {
+    const detail = error.response?.data?.detail;
+    if (error.response?.status !== 409 || detail?.error !== "need_full_content") {
+      throw error;
+    }
+    console.log("♻️ ChatBot needs full content for:", detail.fields);
+    for (const ref of Object.values(compact.contentRefs || {})) {
+      knownContentRefs.delete(ref);
+    }
+    const response = await axios.post(url, payload, options);
+    rememberContentRefs(response.data?.contentRefs);
+    return response;
+  }
+};
+
 /**
  * Send a message to the LCI ChatBot and return the response
  */
@@ -57,6 +137,8 @@ exports.sendChatMessage = async (req, res) => {
     const requestPayload = {
       query: query.trim(),
       top_k: parseInt(top_k),
+      // Scopes the chatbot's conversation memory (and semantic cache follow-up checks) to this user
+      userId: String(req.user.id || req.user._id),
     };
 
     // Add context if available
@@ -151,7 +233,7 @@ exports.sendChatMessage = async (req, res) => {
     });
 
     // Forward request to FastAPI ChatBot
-    const response = await axios.post(
+    const response = await postWithContentRefs(
       `${CHATBOT_BASE_URL}/chat`,
       requestPayload,
       {
@@ -543,11 +625,11 @@ exports.autofillFields = async (req, res) => {
     // Prepare request payload for FastAPI - matches the AutoFillRequest schema
     const requestPayload = {
       templateKey,
+      canvasId: canvasId || null, // scopes the saved autofill context for later chat turns
       stepDescription: description,
       ideaDescription: ideaDescription,
       fieldHints: fieldHints,
       repeatedFields: repeatedFields || [],
-      currentAnswers: currentAnswers || {},
       fields: fields || [],
     };
 
@@ -562,7 +644,7 @@ exports.autofillFields = async (req, res) => {
     });
 
     // Send request to FastAPI autofill endpoint
-    const response = await axios.post(
+    const response = await postWithContentRefs(
       `${CHATBOT_BASE_URL}/chatbot/auto-fill`,
       requestPayload,
       {
@@ -25,6 +25,6 @@ const CanvasSchema = new mongoose.Schema({
       },
     },
   ],
-});
+}, { timestamps: true }); // updatedAt lets the chatbot revalidate its cached copy cheaply
 
 module.exports = mongoose.model("Canvas", CanvasSchema);
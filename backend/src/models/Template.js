@@ -11,7 +11,7 @@ const TemplateSchema = new mongoose.Schema({
   checklistStep: { type: String, required: true },
   content: { type: Object, default: {} }, // Dynamic content storage
   completed: { type: Boolean, default: false },
-});
+}, { timestamps: true }); // updatedAt lets the chatbot revalidate its cached copy cheaply
 
 module.exports =
   mongoose.models.Template || mongoose.model("Template", TemplateSchema);
@@ -34,6 +34,13 @@ if [ ! -d "parsed_content" ]; then
     exit 1
 fi
 
+# Vendor the embedding model and context tokenizer (skipped once they verify)
+echo "📥 Checking local model artifacts..."
+if ! python model_artifacts.py vendor; then
+    echo "❌ Could not vendor the model artifacts. Run 'python model_artifacts.py vendor' with network access."
+    exit 1
+fi
+
 # Start the FastAPI server
 echo "🌐 Starting FastAPI server on http://localhost:8000"
 echo "📚 API Documentation available at: http://localhost:8000/docs"
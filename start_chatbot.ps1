@@ -38,6 +38,14 @@ if (-not (Test-Path "parsed_content")) {
     exit 1
 }
 
+# Vendor the embedding model and context tokenizer (skipped once they verify)
+Write-Host "📥 Checking local model artifacts..." -ForegroundColor Yellow
+python model_artifacts.py vendor
+if ($LASTEXITCODE -ne 0) {
+    Write-Host "❌ Could not vendor the model artifacts. Run 'python model_artifacts.py vendor' with network access." -ForegroundColor Red
+    exit 1
+}
+
 # Start the FastAPI server
 Write-Host "🌐 Starting FastAPI server on http://localhost:8000" -ForegroundColor Green
 Write-Host "📚 API Documentation available at: http://localhost:8000/docs" -ForegroundColor Cyan